@@ -42,8 +42,9 @@ def encode_state(fs: FluentState, fluent_map: list) -> str:
     :return: str eg. "TFFTFT" string of mapped positive and negative fluents
     """
     state_tf = []
+    pos = set(fs.pos)
     for fluent in fluent_map:
-        if fluent in fs.pos:
+        if fluent in pos:
             state_tf.append('T')
         else:
             state_tf.append('F')
@@ -57,8 +58,11 @@ def decode_state(state: str, fluent_map: list) -> FluentState:
     :param fluent_map: ordered list of possible fluents for the problem
     :return: fs: FluentState object
 
-    lengths of state string and fluent_map list must be the same
+    lengths of state string and fluent_map list must be the same; an integer
+    bitset state (see fluent_mask) is decoded through its T/F string
     """
+    if isinstance(state, int):
+        state = bits_to_string(state, len(fluent_map))
     fs = FluentState([], [])
     for idx, char in enumerate(state):
         if char == 'T':
@@ -66,3 +70,45 @@ def decode_state(state: str, fluent_map: list) -> FluentState:
         else:
             fs.neg.append(fluent_map[idx])
     return fs
+
+
+def fluent_indices(fluent_map: list) -> dict:
+    """ map each fluent to its bit in integer bitset states
+
+    :param fluent_map: ordered list of possible fluents for the problem
+    :return: dict of fluent to index, e.g. fluent_map[i] -> i
+    """
+    return {fluent: idx for idx, fluent in enumerate(fluent_map)}
+
+
+def fluent_mask(fluents: list, fluent_index: dict) -> int:
+    """ encode fluents as an integer bitset using mapping
+
+    :param fluents: list of fluents
+    :param fluent_index: dict of fluent to bit index (see fluent_indices)
+    :return: int with bit fluent_index[f] set for each fluent f; the mask of
+        the positive fluents of a FluentState is its bitset state
+    """
+    mask = 0
+    for fluent in fluents:
+        mask |= 1 << fluent_index[fluent]
+    return mask
+
+
+def bits_to_string(state: int, num_fluents: int) -> str:
+    """ convert an integer bitset state to its string of T/F
+
+    :param state: int bitset state
+    :param num_fluents: number of fluents of the problem
+    :return: str eg. "TFFTFT", 'T' at index i if bit i of the state is set
+    """
+    return "".join('T' if state >> idx & 1 else 'F' for idx in range(num_fluents))
+
+
+def string_to_bits(state: str) -> int:
+    """ convert a string of T/F to an integer bitset state
+
+    :param state: str eg. "TFFTFT"
+    :return: int with bit i set if state[i] is 'T'
+    """
+    return int(state[::-1].replace('T', '1').replace('F', '0'), 2) if state else 0
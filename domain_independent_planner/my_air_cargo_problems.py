@@ -1,15 +1,15 @@
-from aimacode.logic import PropKB
 from aimacode.planning import Action
 from aimacode.search import (
     Node, Problem,
 )
 from aimacode.utils import expr
 from lp_utils import (
-    FluentState, encode_state, decode_state,
+    FluentState, encode_state, fluent_indices, fluent_mask, bits_to_string,
 )
-from my_planning_graph import PlanningGraph
+from my_planning_graph import GraphActions, MatrixPlanningGraph, RelaxedPlanningGraph
 
 from functools import lru_cache
+from operator import itemgetter
 
 
 class AirCargoProblem(Problem):
@@ -25,14 +25,30 @@ class AirCargoProblem(Problem):
             positive and negative literal fluents (as expr) describing initial state
         :param goal: list of expr
             literal fluents required for goal test
+
+        States are integer bitsets: bit i is set when the fluent
+        state_map[i] holds. The fluent indices are fixed here, and every
+        ground action is compiled to bitmasks of its preconditions and
+        effects, so that testing and applying an action are a few bit
+        operations. Use state_string() to display a state as a T/F string.
+
+        actions() only tests the candidate actions of the fluents true in
+        a state (see build_action_index()) instead of every ground action.
         """
         self.state_map = initial.pos + initial.neg
+        self.fluent_index = fluent_indices(self.state_map)
         self.initial_state_TF = encode_state(initial, self.state_map)
-        Problem.__init__(self, self.initial_state_TF, goal=goal)
+        Problem.__init__(self, fluent_mask(initial.pos, self.fluent_index), goal=goal)
         self.cargos = cargos
         self.planes = planes
         self.airports = airports
         self.actions_list = self.get_actions()
+        self.goal_mask = fluent_mask(goal, self.fluent_index)
+        self.action_masks = {action: self.compile_action(action)
+                             for action in self.actions_list}
+        self.action_index, self.unindexed_actions = self.build_action_index()
+        self.graph_actions = GraphActions(self.state_map, self.actions_list)
+        self.relaxed_graph = RelaxedPlanningGraph(self.graph_actions, goal)
 
     def get_actions(self):
         """
@@ -124,37 +140,83 @@ class AirCargoProblem(Problem):
 
         return load_actions() + unload_actions() + fly_actions()
 
-    def actions(self, state: str) -> list:
+    def compile_action(self, action: Action) -> tuple:
+        """ Return the bitmasks of the positive and negative preconditions and
+        of the add and remove effects of a ground action.
+
+        :param action: Action
+        :return: (int, int, int, int) tuple of masks
+        """
+        return (fluent_mask(action.precond_pos, self.fluent_index),
+                fluent_mask(action.precond_neg, self.fluent_index),
+                fluent_mask(action.effect_add, self.fluent_index),
+                fluent_mask(action.effect_rem, self.fluent_index))
+
+    def build_action_index(self) -> tuple:
+        """ Index the ground actions by one of their positive preconditions.
+
+        Each action is keyed on the positive precondition fluent shared by
+        the fewest actions, so an action can only be applicable in a state
+        where its key fluent is true. Candidates are stored with their
+        position in actions_list, which keeps the order of actions()
+        independent of the index.
+
+        :return: (dict, list)
+            fluent index -> list of (position, action, pre_pos, pre_neg),
+            and the candidates of the actions without positive preconditions
+        """
+        precond_counts = {}
+        for action in self.actions_list:
+            for clause in action.precond_pos:
+                index = self.fluent_index[clause]
+                precond_counts[index] = precond_counts.get(index, 0) + 1
+
+        action_index = {}
+        unindexed = []
+        for position, action in enumerate(self.actions_list):
+            pre_pos, pre_neg, _, _ = self.action_masks[action]
+            candidate = (position, action, pre_pos, pre_neg)
+            if not action.precond_pos:
+                unindexed.append(candidate)
+                continue
+            key = min((self.fluent_index[clause] for clause in action.precond_pos),
+                      key=lambda index: (precond_counts[index], index))
+            action_index.setdefault(key, []).append(candidate)
+        return action_index, unindexed
+
+    def state_string(self, state: int) -> str:
+        """ Return a state as a T/F string of mapped fluents, e.g. 'FTTTFF'
+
+        :param state: int bitset state
+        :return: str
+        """
+        return bits_to_string(state, len(self.state_map))
+
+    def actions(self, state: int) -> list:
         """ Return the actions that can be executed in the given state.
 
-        :param state: str
-            state represented as T/F string of mapped fluents (state variables)
-            e.g. 'FTTTFF'
+        :param state: int
+            state represented as a bitset of mapped fluents (state variables)
         
         :return: list of Action objects
         """
+        candidates = list(self.unindexed_actions)
+        action_index = self.action_index
+        remaining = state
+        # collect the candidates keyed on each true fluent
+        while remaining:
+            low_bit = remaining & -remaining
+            remaining ^= low_bit
+            candidates.extend(action_index.get(low_bit.bit_length() - 1, ()))
+
         possible_actions = []
-        kb = PropKB()
-        kb.tell(decode_state(state, self.state_map).pos_sentence())
-        
-        # loop through all possible actions to select ones that can be performed in current state
-        for action in self.actions_list:
-            is_possible = True
-            # loop through positive preconditions for current action
-            for clause in action.precond_pos:
-                if clause not in kb.clauses:
-                    # action should be in positive precondition but is not
-                    is_possible = False
-            # loop through negative preconditions for current action
-            for clause in action.precond_neg:
-                if clause in kb.clauses:
-                    # action should not be in negative precondition
-                    is_possible = False
-            if is_possible:
+        for position, action, pre_pos, pre_neg in sorted(candidates, key=itemgetter(0)):
+            # every positive precondition holds and no negative one does
+            if state & pre_pos == pre_pos and not state & pre_neg:
                 possible_actions.append(action)
         return possible_actions
 
-    def result(self, state: str, action: Action):
+    def result(self, state: int, action: Action):
         """ Return the state that results from executing the given
         action in the given state. The action must be one of
         self.actions(state).
@@ -163,43 +225,19 @@ class AirCargoProblem(Problem):
         :param action: Action applied
         :return: resulting state after action
         """
-        new_state = FluentState([], [])
-        old_state = decode_state(state, self.state_map)
-        
-        # for each fluent check if pos in old states
-        for fluent in old_state.pos:
-            if fluent not in action.effect_rem:
-                new_state.pos.append(fluent)
-        
-        # if action has an add effect, add fluent to positive list for new state
-        for fluent in action.effect_add:
-            if fluent not in new_state.pos:
-                new_state.pos.append(fluent)
-        
-        # for each fluent check if neg in old states
-        for fluent in old_state.neg:
-            if fluent not in action.effect_add:
-                new_state.neg.append(fluent)
-        
-        # if action has remove effect, add fluent to negative list for new state
-        for fluent in action.effect_rem:
-            if fluent not in new_state.neg:
-                new_state.neg.append(fluent)
-
-        return encode_state(new_state, self.state_map)
+        masks = self.action_masks.get(action)
+        if masks is None:
+            masks = self.compile_action(action)
+        _, _, effect_add, effect_rem = masks
+        return (state & ~effect_rem) | effect_add
 
-    def goal_test(self, state: str) -> bool:
+    def goal_test(self, state: int) -> bool:
         """ Test the state to see if goal is reached
 
-        :param state: str representing state
+        :param state: int representing state
         :return: bool
         """
-        kb = PropKB()
-        kb.tell(decode_state(state, self.state_map).pos_sentence())
-        for clause in self.goal:
-            if clause not in kb.clauses:
-                return False
-        return True
+        return state & self.goal_mask == self.goal_mask
 
     def h_1(self, node: Node):
         # note that this is not a true heuristic
@@ -212,11 +250,24 @@ class AirCargoProblem(Problem):
         state space to estimate the sum of all actions that must be carried
         out from the current state in order to satisfy each individual goal
         condition.
+
+        The level of each goal is the same in the relaxed graph, which is
+        compiled once per problem and only expanded from the node state.
         """
-        # requires implemented PlanningGraph class
-        pg = PlanningGraph(self, node.state)
-        pg_levelsum = pg.h_levelsum()
-        return pg_levelsum
+        return self.relaxed_graph.h_levelsum(node.state)
+
+    @lru_cache(maxsize=8192)
+    def h_pg_setlevel(self, node: Node):
+        """This heuristic estimates the number of steps needed to satisfy all
+        of the goal conditions together as the first level of the planning
+        graph of the node state where the goals are present and no two of
+        them are mutex. It is admissible.
+
+        Unlike the level sum it depends on the mutexes, so it uses a
+        MatrixPlanningGraph built from the actions compiled for the problem.
+        """
+        return MatrixPlanningGraph(self, node.state,
+                                   graph_actions=self.graph_actions).h_setlevel()
 
     @lru_cache(maxsize=8192)
     def h_ignore_preconditions(self, node: Node):
@@ -227,17 +278,47 @@ class AirCargoProblem(Problem):
         
         Based on Russell-Norvig Ed-3 10.2.3 or Russell-Norvig Ed-2 11.2
         """
-        # step counter
-        count = 0
-        kb = PropKB()
-        # add positive state to logical sentences 
-        kb.tell(decode_state(node.state, self.state_map).pos_sentence())
-        count = len([clause for clause in self.goal if clause not in kb.clauses])
-        # for clause in self.goal:
-        #     # if goal not found in positive states increase counter
-        #     if clause not in kb.clauses:
-        #         count += 1
-        return count
+        # count the goal fluents missing from the state
+        return bin(self.goal_mask & ~node.state).count('1')
+
+    @lru_cache(maxsize=8192)
+    def h_max(self, node: Node):
+        """This heuristic estimates the cost of reaching the goal as the cost
+        of its most expensive fluent in the delete relaxation of the problem,
+        where the cost of an action is 1 plus the largest cost of its
+        preconditions. It is admissible.
+        """
+        return self.relaxed_graph.h_max(node.state)
+
+    @lru_cache(maxsize=8192)
+    def h_add(self, node: Node):
+        """This heuristic estimates the cost of reaching the goal as the sum of
+        the costs of its fluents in the delete relaxation of the problem,
+        where the cost of an action is 1 plus the sum of the costs of its
+        preconditions. It ignores positive interactions between goals and is
+        not admissible.
+        """
+        return self.relaxed_graph.h_add(node.state)
+
+    @lru_cache(maxsize=8192)
+    def h_ff(self, node: Node):
+        """This heuristic estimates the number of actions needed to reach the
+        goal as the length of a relaxed plan (the FF heuristic), extracted
+        from the relaxed planning graph of the node state. It counts actions
+        shared by several goals once and is not admissible.
+        """
+        return self.relaxed_graph.h_ff(node.state)
+
+    def helpful_actions(self, state: int) -> list:
+        """ Return the FF helpful actions of a state: the actions applicable
+        in the state that achieve a fluent needed at the first level of its
+        relaxed plan.
+
+        :param state: int bitset state
+        :return: list of Action objects
+        """
+        _, helpful = self.relaxed_graph.relaxed_plan(state)
+        return helpful
 
 
 def air_cargo_p1() -> AirCargoProblem:
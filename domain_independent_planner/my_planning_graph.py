@@ -1,7 +1,9 @@
+import numpy as np
+
 from aimacode.planning import Action
 from aimacode.search import Problem
 from aimacode.utils import expr
-from lp_utils import decode_state
+from lp_utils import decode_state, fluent_indices, string_to_bits
 
 
 class PgNode():
@@ -198,6 +200,34 @@ def mutexify(node1: PgNode, node2: PgNode):
     node2.mutex.add(node1)
 
 
+def noop_actions(literal_list):
+    """create persistent action for each possible fluent
+
+    "No-Op" actions are virtual actions (i.e., actions that only exist in
+    the planning graph, not in the planning problem domain) that operate
+    on each fluent (literal expression) from the problem domain. No op
+    actions "pass through" the literal expressions from one level of the
+    planning graph to the next.
+
+    The no-op action list requires both a positive and a negative action
+    for each literal expression. Positive no-op actions require the literal
+    as a positive precondition and add the literal expression as an effect
+    in the output, and negative no-op actions require the literal as a
+    negative precondition and remove the literal expression as an effect in
+    the output.
+
+    :param literal_list:
+    :return: list of Action
+    """
+    action_list = []
+    for fluent in literal_list:
+        act1 = Action(expr("Noop_pos({})".format(fluent)), ([fluent], []), ([fluent], []))
+        action_list.append(act1)
+        act2 = Action(expr("Noop_neg({})".format(fluent)), ([], [fluent]), ([], [fluent]))
+        action_list.append(act2)
+    return action_list
+
+
 class PlanningGraph():
     """
     A planning graph as described in chapter 10 of the AIMA text. The planning
@@ -228,33 +258,14 @@ class PlanningGraph():
         self.create_graph()
 
     def noop_actions(self, literal_list):
-        """create persistent action for each possible fluent
-
-        "No-Op" actions are virtual actions (i.e., actions that only exist in
-        the planning graph, not in the planning problem domain) that operate
-        on each fluent (literal expression) from the problem domain. No op
-        actions "pass through" the literal expressions from one level of the
-        planning graph to the next.
-
-        The no-op action list requires both a positive and a negative action
-        for each literal expression. Positive no-op actions require the literal
-        as a positive precondition and add the literal expression as an effect
-        in the output, and negative no-op actions require the literal as a
-        negative precondition and remove the literal expression as an effect in
-        the output.
+        """create persistent action for each possible fluent (see noop_actions())
 
         This function should only be called by the class constructor.
 
         :param literal_list:
         :return: list of Action
         """
-        action_list = []
-        for fluent in literal_list:
-            act1 = Action(expr("Noop_pos({})".format(fluent)), ([fluent], []), ([fluent], []))
-            action_list.append(act1)
-            act2 = Action(expr("Noop_neg({})".format(fluent)), ([], [fluent]), ([], [fluent]))
-            action_list.append(act2)
-        return action_list
+        return noop_actions(literal_list)
 
     def create_graph(self):
         """ build a Planning Graph as described in Russell-Norvig 3rd Ed 10.3 or 2nd Ed 11.4
@@ -552,3 +563,399 @@ class PlanningGraph():
                     level_sum += level
                     break        
         return level_sum
+
+
+class GraphActions():
+    """
+    The ground actions of a planning problem and the no-op actions of its
+    fluents compiled to boolean matrices, for MatrixPlanningGraph.
+
+    Literals are indexed by fluent: literal i is the positive literal of
+    fluent state_map[i] and literal n + i its negative literal, where n is the
+    number of fluents. Compile the actions once per problem and share them
+    between the graphs of every state.
+
+    Args:
+    ----------
+    state_map : list of expr
+        the fluents of the problem, in the order of the state bits
+
+    actions_list : list of Action
+        the ground actions of the problem
+
+    serial_planning : bool
+        whether or not to assume that only one action can occur at a time
+    """
+
+    def __init__(self, state_map: list, actions_list: list, serial_planning=True):
+        """
+        Instance variables calculated:
+            fluent_index: dict of the index of each fluent in state_map
+            actions: list of Action, the problem actions followed by the no-op actions
+            precond: bool array (actions x literals) of the action preconditions
+            effect: bool array (actions x literals) of the action effects
+            persistent: bool array of the no-op (persistence) actions
+            static_mutex: bool array (actions x actions) of the action pairs that are mutex
+                at every level: serial, inconsistent effects or interference mutex
+            negation: bool array (literals x literals) of the negation mutex literal pairs
+        """
+        self.state_map = state_map
+        self.num_fluents = len(state_map)
+        self.serial = serial_planning
+        self.actions = list(actions_list) + noop_actions(state_map)
+        self.fluent_index = fluent_index = fluent_indices(state_map)
+        n = self.num_fluents
+        self.precond = np.zeros((len(self.actions), 2 * n), dtype=bool)
+        self.effect = np.zeros((len(self.actions), 2 * n), dtype=bool)
+        for i, action in enumerate(self.actions):
+            self.precond[i, [fluent_index[f] for f in action.precond_pos]] = True
+            self.precond[i, [n + fluent_index[f] for f in action.precond_neg]] = True
+            self.effect[i, [fluent_index[f] for f in action.effect_add]] = True
+            self.effect[i, [n + fluent_index[f] for f in action.effect_rem]] = True
+        self.persistent = (self.precond == self.effect).all(axis=1)
+
+        # the negation of every literal column: positive <-> negative
+        negated_precond = np.roll(self.precond, n, axis=1)
+        negated_effect = np.roll(self.effect, n, axis=1)
+        # an effect of one action negates an effect of the other
+        inconsistent_effects = self.effect @ negated_effect.T
+        # an effect of one action negates a precondition of the other
+        interference = self.effect @ negated_precond.T
+        interference |= interference.T
+        self.static_mutex = inconsistent_effects | interference
+        if self.serial:
+            self.static_mutex |= np.outer(~self.persistent, ~self.persistent)
+        np.fill_diagonal(self.static_mutex, False)
+
+        self.negation = np.roll(np.eye(2 * n, dtype=bool), n, axis=1)
+
+    def state_literals(self, state) -> np.ndarray:
+        """ Return the literals of a state as a bool array
+
+        :param state: int bitset (or T/F string) of the fluents
+        :return: bool array of the literals true in the state
+        """
+        if isinstance(state, str):
+            state = string_to_bits(state)
+        bits = format(state, 'b').zfill(self.num_fluents)[::-1] if self.num_fluents else ''
+        pos = np.frombuffer(bits.encode(), dtype=np.uint8) == ord('1')
+        return np.concatenate((pos, ~pos))
+
+    def literal(self, index: int) -> PgNode_s:
+        """ Return a literal as a planning graph node
+
+        :param index: int literal index
+        :return: PgNode_s
+        """
+        if index < self.num_fluents:
+            return PgNode_s(self.state_map[index], True)
+        return PgNode_s(self.state_map[index - self.num_fluents], False)
+
+
+class MatrixPlanningGraph():
+    """
+    A planning graph with the same levels and mutex rules as PlanningGraph,
+    where each S level is a bool array of literals, each A level an array of
+    action indices in GraphActions.actions, and the mutex relations of a level
+    are bool matrices computed with matrix products instead of pairwise tests.
+
+    This is the engine to use when the mutex relations are needed (e.g., to
+    test whether goals are pairwise reachable, or for GRAPHPLAN-style plan
+    extraction); its mutexes also follow every parent of a literal, unlike the
+    node sets of PlanningGraph. AirCargoProblem.h_pg_setlevel uses it for the
+    set-level heuristic, which depends on the goal mutexes; the level sum only
+    needs the level of each literal, which mutexes never change, so
+    AirCargoProblem.h_pg_levelsum uses the cheaper RelaxedPlanningGraph.
+    """
+
+    def __init__(self, problem: Problem, state, serial_planning=True, graph_actions=None):
+        """
+        :param problem: PlanningProblem (or subclass such as AirCargoProblem or HaveCakeProblem)
+        :param state: int bitset (or T/F string) of the fluents
+        :param serial_planning: bool (whether or not to assume that only one action can occur at a time)
+        :param graph_actions: GraphActions compiled for the problem (compiled here if None)
+        Instance variable calculated:
+            s_levels: list of bool arrays of the literals of each S level
+            a_levels: list of int arrays of the actions of each A level
+            s_mutex: list of bool arrays (literals x literals) of the mutex literals of each S level
+            a_mutex: list of bool arrays (level actions x level actions) of the mutex actions of
+                each A level, indexed like the A level
+            literal_levels: int array of the first level of each literal, -1 if never reached
+        """
+        self.problem = problem
+        if graph_actions is None:
+            graph_actions = GraphActions(problem.state_map, problem.actions_list, serial_planning)
+        self.graph_actions = graph_actions
+        self.s_levels = []
+        self.a_levels = []
+        self.s_mutex = []
+        self.a_mutex = []
+        self.literal_levels = None
+        self.create_graph(graph_actions.state_literals(state))
+
+    def create_graph(self, literals: np.ndarray):
+        """ build the levels until the last two S levels contain the same literals
+
+        :param literals: bool array of the literals of S0
+        """
+        self.s_levels.append(literals)
+        # no mutexes at the first level
+        self.s_mutex.append(np.zeros((len(literals), len(literals)), dtype=bool))
+        self.literal_levels = np.where(literals, 0, -1)
+        while not self.add_level():
+            pass
+
+    def add_level(self) -> bool:
+        """ add the next A level and S level to the graph
+
+        :return: bool (True if the new S level contains the same literals as the previous one)
+        """
+        ga = self.graph_actions
+        level_literals, level_mutex = self.s_levels[-1], self.s_mutex[-1]
+        # actions whose preconditions all hold in the S level
+        actions = np.flatnonzero(~(ga.precond & ~level_literals).any(axis=1))
+        precond = ga.precond[actions]
+        effect = ga.effect[actions]
+
+        # competing needs: a precondition of one action is mutex with one of the other
+        a_mutex = ga.static_mutex[np.ix_(actions, actions)]
+        a_mutex |= (precond @ level_mutex) @ precond.T
+        self.a_levels.append(actions)
+        self.a_mutex.append(a_mutex)
+
+        literals = effect.any(axis=0)
+        # inconsistent support: no pair of non-mutex actions achieves both literals
+        support = (effect.T @ ~a_mutex) @ effect
+        s_mutex = (ga.negation | ~support) & np.outer(literals, literals)
+        self.s_levels.append(literals)
+        self.s_mutex.append(s_mutex)
+        self.literal_levels[literals & (self.literal_levels < 0)] = len(self.s_levels) - 1
+        return bool((literals == level_literals).all())
+
+    def literals(self, level: int) -> set:
+        """ Return the literals of an S level as a set of PgNode_s
+
+        :param level: int
+        :return: set of PgNode_s
+        """
+        return {self.graph_actions.literal(i) for i in np.flatnonzero(self.s_levels[level])}
+
+    def actions(self, level: int) -> list:
+        """ Return the actions of an A level
+
+        :param level: int
+        :return: list of Action
+        """
+        return [self.graph_actions.actions[i] for i in self.a_levels[level]]
+
+    def h_levelsum(self) -> int:
+        """The sum of the level costs of the individual goals (admissible if goals independent)
+
+        :return: int
+        """
+        fluent_index = self.graph_actions.fluent_index
+        levels = self.literal_levels[[fluent_index[goal] for goal in self.problem.goal]]
+        # goals that are never reached add nothing, as in PlanningGraph
+        return int(levels[levels >= 0].sum())
+
+    def h_setlevel(self) -> float:
+        """The first level at which all the goals are present and no two of them are mutex
+        (admissible)
+
+        The literals of the graph level off before its mutexes, so levels are added until the
+        goals hold together or the mutexes no longer change either.
+
+        :return: int level, inf if the goals never hold together
+        """
+        fluent_index = self.graph_actions.fluent_index
+        goals = [fluent_index[goal] for goal in self.problem.goal]
+        goal_pairs = np.ix_(goals, goals)
+        level = 0
+        while True:
+            if level == len(self.s_levels):
+                if (self.s_mutex[-1] == self.s_mutex[-2]).all():
+                    return float('inf')
+                self.add_level()
+            if self.s_levels[level][goals].all() and not self.s_mutex[level][goal_pairs].any():
+                return level
+            level += 1
+
+
+class RelaxedPlanningGraph():
+    """
+    The delete relaxation of the planning graph of a problem: literals are
+    never removed and there are no mutexes, so a literal enters the graph at
+    the first level where an action achieving it has all of its preconditions.
+    Mutexes never keep a literal or an action out of a level of PlanningGraph,
+    so the level of every literal (and with it h_levelsum) is the same as in
+    the full graph.
+
+    The action tables are compiled once per problem; expand() only runs the
+    level expansion from a state, so the graph can be reused for every node
+    of a search. The delete-relaxation heuristics h_max, h_add and h_ff (the
+    length of the relaxed plan of FF) are computed from the same tables.
+
+    Args:
+    ----------
+    graph_actions : GraphActions
+        the compiled actions of the problem (the no-ops are not needed, since
+        relaxed literals persist)
+
+    goal : list of expr
+        the goal fluents of the problem
+    """
+
+    def __init__(self, graph_actions: GraphActions, goal: list):
+        """
+        Instance variables calculated:
+            actions: list of Action, the problem actions (without the no-ops)
+            precond_mask: bool array (actions x literals) of the action preconditions
+            precond: float array of precond_mask, for the precondition counts and cost sums
+            effect: bool array (actions x literals) of the action effects
+            num_precond: float array of the number of preconditions of each action
+            goal: int array of the literal indices of the goal fluents
+            achievers: list of the int arrays of the actions achieving each literal
+        """
+        self.graph_actions = graph_actions
+        actions = np.flatnonzero(~graph_actions.persistent)
+        self.actions = [graph_actions.actions[i] for i in actions]
+        self.precond_mask = graph_actions.precond[actions]
+        # float matrices make the precondition counts a single BLAS product
+        self.precond = self.precond_mask.astype(np.float32)
+        self.effect = graph_actions.effect[actions]
+        self.num_precond = self.precond.sum(axis=1)
+        self.goal = np.array([graph_actions.fluent_index[fluent] for fluent in goal], dtype=int)
+        self.achievers = [np.flatnonzero(column) for column in self.effect.T]
+
+    def expand(self, state) -> tuple:
+        """ Expand the levels from a state until no new literal is reached
+
+        :param state: int bitset (or T/F string) of the fluents
+        :return: (literal_levels, action_levels)
+            int arrays of the first level of each literal and of each action, -1 if never
+            reached
+        """
+        reached = self.graph_actions.state_literals(state)
+        literal_levels = np.where(reached, 0, -1)
+        action_levels = np.full(len(self.actions), -1)
+        level = 0
+        while True:
+            applicable = self.precond @ reached == self.num_precond
+            action_levels[applicable & (action_levels < 0)] = level
+            new = reached | self.effect[applicable].any(axis=0)
+            if (new == reached).all():
+                return literal_levels, action_levels
+            level += 1
+            literal_levels[new & ~reached] = level
+            reached = new
+
+    def h_levelsum(self, state) -> int:
+        """The sum of the level costs of the individual goals (admissible if goals independent)
+
+        :param state: int bitset (or T/F string) of the fluents
+        :return: int
+        """
+        literal_levels, _ = self.expand(state)
+        levels = literal_levels[self.goal]
+        # goals that are never reached add nothing, as in PlanningGraph
+        return int(levels[levels >= 0].sum())
+
+    def relaxed_costs(self, state, additive=True) -> np.ndarray:
+        """ The cost of reaching each literal from a state when every action costs 1
+
+        The cost of an action is 1 plus the sum (h_add) or the maximum (h_max) of the costs
+        of its preconditions, and the cost of a literal the cheapest cost of its achievers;
+        the costs are updated until they no longer change.
+
+        :param state: int bitset (or T/F string) of the fluents
+        :param additive: bool (sum the precondition costs if True, else take their maximum)
+        :return: float array of the cost of each literal, inf if never reached
+        """
+        costs = np.where(self.graph_actions.state_literals(state), 0., np.inf)
+        while True:
+            reached = np.isfinite(costs)
+            applicable = self.precond @ reached == self.num_precond
+            # unreached literals are zeroed so that they add no nan to the products
+            finite_costs = np.where(reached, costs, 0.)
+            if additive:
+                action_costs = 1. + self.precond @ finite_costs
+            else:
+                action_costs = 1. + np.where(self.precond_mask, finite_costs, 0.).max(axis=1)
+            action_costs[~applicable] = np.inf
+            new_costs = np.minimum(costs, np.where(self.effect, action_costs[:, None], np.inf).min(axis=0))
+            if (new_costs == costs).all():
+                return costs
+            costs = new_costs
+
+    def h_max(self, state) -> float:
+        """The largest cost of the individual goals (admissible)
+
+        :param state: int bitset (or T/F string) of the fluents
+        :return: float, inf if a goal cannot be reached
+        """
+        costs = self.relaxed_costs(state, additive=False)[self.goal]
+        return float(costs.max()) if len(costs) else 0.
+
+    def h_add(self, state) -> float:
+        """The sum of the costs of the individual goals (not admissible)
+
+        :param state: int bitset (or T/F string) of the fluents
+        :return: float, inf if a goal cannot be reached
+        """
+        return float(self.relaxed_costs(state, additive=True)[self.goal].sum())
+
+    def relaxed_plan(self, state) -> tuple:
+        """ Extract a relaxed plan from the levels of a state as in FF
+
+        The goals are achieved from the last level down: each goal not already achieved by a
+        chosen action is achieved by the action of the previous level with the easiest
+        preconditions (the smallest sum of precondition levels), whose preconditions become
+        goals at their own levels.
+
+        :param state: int bitset (or T/F string) of the fluents
+        :return: (plan, helpful)
+            list of Action of the relaxed plan in level order (None if a goal cannot be
+            reached), and the helpful actions: the actions applicable in the state that
+            achieve a goal of level 1 of the relaxed plan
+        """
+        literal_levels, action_levels = self.expand(state)
+        goal_levels = literal_levels[self.goal]
+        if (goal_levels < 0).any():
+            return None, []
+        depth = int(goal_levels.max()) if len(goal_levels) else 0
+        goals = [set() for _ in range(depth + 1)]
+        achieved = [set() for _ in range(depth + 1)]
+        for literal in self.goal:
+            goals[literal_levels[literal]].add(literal)
+        difficulty = self.precond @ np.maximum(literal_levels, 0)
+
+        plan = []
+        for level in range(depth, 0, -1):
+            for literal in sorted(goals[level]):
+                # skip the goals achieved by an action chosen at this level
+                if literal in achieved[level]:
+                    continue
+                candidates = [a for a in self.achievers[literal] if action_levels[a] == level - 1]
+                action = min(candidates, key=lambda a: (difficulty[a], a))
+                plan.append(action)
+                for precond in np.flatnonzero(self.precond_mask[action]):
+                    precond_level = literal_levels[precond]
+                    if precond_level > 0 and precond not in achieved[level - 1]:
+                        goals[precond_level].add(precond)
+                for effect in np.flatnonzero(self.effect[action]):
+                    achieved[level].add(effect)
+                    achieved[level - 1].add(effect)
+
+        level_one = list(goals[1]) if depth else []
+        helpful = np.flatnonzero((action_levels == 0) & self.effect[:, level_one].any(axis=1))
+        return ([self.actions[a] for a in reversed(plan)],
+                [self.actions[a] for a in helpful])
+
+    def h_ff(self, state) -> float:
+        """The number of actions of the FF relaxed plan (not admissible)
+
+        :param state: int bitset (or T/F string) of the fluents
+        :return: float, inf if a goal cannot be reached
+        """
+        plan, _ = self.relaxed_plan(state)
+        return float('inf') if plan is None else float(len(plan))
@@ -36,6 +36,11 @@ SEARCHES = [["breadth_first_search", breadth_first_search, ""],
             ['astar_search', astar_search, 'h_1'],
             ['astar_search', astar_search, 'h_ignore_preconditions'],
             ['astar_search', astar_search, 'h_pg_levelsum'],
+            ['astar_search', astar_search, 'h_max'],
+            ['astar_search', astar_search, 'h_add'],
+            ['astar_search', astar_search, 'h_ff'],
+            ['greedy_best_first_graph_search', greedy_best_first_graph_search, 'h_ff'],
+            ['astar_search', astar_search, 'h_pg_setlevel'],
             ]
 
 
@@ -85,13 +90,17 @@ def manual():
                                                " ".join(s_choices)))
 
 
-def main(p_choices, s_choices):
+def main(p_choices, s_choices, helpful=False):
 
     problems = [PROBLEMS[i-1] for i in map(int, p_choices)]
     searches = [SEARCHES[i-1] for i in map(int, s_choices)]
 
     for pname, p in problems:
 
+        if helpful:
+            print("\nRelaxed plan of the initial state of {}...".format(pname))
+            show_relaxed_plan(p())
+
         for sname, s, h in searches:
             hstring = h if not h else " with {}".format(h)
             print("\nSolving {} using {}{}...".format(pname, sname, hstring))
@@ -101,6 +110,19 @@ def main(p_choices, s_choices):
             run_search(_p, s, _h)
 
 
+def show_relaxed_plan(problem):
+    plan, helpful = problem.relaxed_graph.relaxed_plan(problem.initial)
+    if plan is None:
+        print("The goal cannot be reached in the relaxed problem.")
+        return
+    print("Relaxed plan length: {}".format(len(plan)))
+    for action in plan:
+        print("{}{}".format(action.name, action.args))
+    print("Helpful actions:")
+    for action in helpful:
+        print("{}{}".format(action.name, action.args))
+
+
 def show_solution(node, elapsed_time):
     if node is None:
         print("The selected planner did not find a solution for this problem. " +
@@ -121,12 +143,14 @@ if __name__=="__main__":
                         help="Specify the indices of the problems to solve as a list of space separated values. Choose from: {!s}".format(list(range(1, len(PROBLEMS)+1))))
     parser.add_argument('-s', '--searches', nargs="+", choices=range(1, len(SEARCHES)+1), type=int, metavar='',
                         help="Specify the indices of the search algorithms to use as a list of space separated values. Choose from: {!s}".format(list(range(1, len(SEARCHES)+1))))
+    parser.add_argument('--helpful', action="store_true",
+                        help="Show the FF relaxed plan and helpful actions of the initial state of each problem.")
     args = parser.parse_args()
 
     if args.manual:
         manual()
     elif args.problems and args.searches:
-        main(list(sorted(set(args.problems))), list(sorted(set((args.searches)))))
+        main(list(sorted(set(args.problems))), list(sorted(set((args.searches)))), args.helpful)
     else:
         print()
         parser.print_help()
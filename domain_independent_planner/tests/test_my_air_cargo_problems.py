@@ -6,10 +6,14 @@ from aimacode.planning import Action
 from aimacode.utils import expr
 from aimacode.search import Node
 import unittest
+import numpy as np
 from lp_utils import decode_state
 from my_air_cargo_problems import (
     air_cargo_p1, air_cargo_p2, air_cargo_p3,
 )
+from my_planning_graph import (
+    PlanningGraph, MatrixPlanningGraph, PgNode_a, RelaxedPlanningGraph,
+)
 
 class TestAirCargoProb1(unittest.TestCase):
 
@@ -17,7 +21,7 @@ class TestAirCargoProb1(unittest.TestCase):
         self.p1 = air_cargo_p1()
 
     def test_ACP1_num_fluents(self):
-        self.assertEqual(len(self.p1.initial), 12)
+        self.assertEqual(len(self.p1.state_string(self.p1.initial)), 12)
 
     def test_ACP1_num_requirements(self):
         self.assertEqual(len(self.p1.goal),2)
@@ -29,7 +33,7 @@ class TestAirCargoProb2(unittest.TestCase):
         self.p2 = air_cargo_p2()
 
     def test_ACP2_num_fluents(self):
-        self.assertEqual(len(self.p2.initial), 27)
+        self.assertEqual(len(self.p2.state_string(self.p2.initial)), 27)
 
     def test_ACP2_num_requirements(self):
         self.assertEqual(len(self.p2.goal),3)
@@ -41,7 +45,7 @@ class TestAirCargoProb3(unittest.TestCase):
         self.p3 = air_cargo_p3()
 
     def test_ACP3_num_fluents(self):
-        self.assertEqual(len(self.p3.initial), 32)
+        self.assertEqual(len(self.p3.state_string(self.p3.initial)), 32)
 
     def test_ACP3_num_requirements(self):
         self.assertEqual(len(self.p3.goal),4)
@@ -76,9 +80,169 @@ class TestAirCargoMethods(unittest.TestCase):
         self.assertTrue(expr('In(C1, P1)') in fs.pos)
         self.assertTrue(expr('At(C1, SFO)') in fs.neg)
 
+    def test_AC_state_string(self):
+        self.assertEqual(self.p1.state_string(self.p1.initial),
+                         self.p1.initial_state_TF)
+        fs = decode_state(self.p1.initial, self.p1.state_map)
+        self.assertEqual(fs.pos, self.p1.state_map[:4])
+
+    def test_AC_goal_test(self):
+        self.assertFalse(self.p1.goal_test(self.p1.initial))
+        plan = ['Load(C1, P1, SFO)', 'Fly(P1, SFO, JFK)', 'Unload(C1, P1, JFK)',
+                'Load(C2, P2, JFK)', 'Fly(P2, JFK, SFO)', 'Unload(C2, P2, SFO)']
+        state = self.p1.initial
+        for step in plan:
+            action = [a for a in self.p1.actions(state)
+                      if expr(step) == expr("{}{}".format(a.name, a.args))][0]
+            state = self.p1.result(state, action)
+        self.assertTrue(self.p1.goal_test(state))
+
+    def test_AC_action_index(self):
+        def scan(state):
+            return [action for action in self.p1.actions_list
+                    if self.p1.compile_action(action)[0] & ~state == 0
+                    and not self.p1.compile_action(action)[1] & state]
+        states, frontier = {self.p1.initial}, [self.p1.initial]
+        while frontier:
+            state = frontier.pop()
+            actions = self.p1.actions(state)
+            self.assertEqual(actions, scan(state))
+            for action in actions:
+                child = self.p1.result(state, action)
+                if child not in states:
+                    states.add(child)
+                    frontier.append(child)
+        self.assertEqual(sum(map(len, self.p1.action_index.values())),
+                         len(self.p1.actions_list))
+
     def test_h_ignore_preconditions(self):
         n = Node(self.p1.initial)
         self.assertEqual(self.p1.h_ignore_preconditions(n),2)
 
+    def test_h_ff(self):
+        n = Node(self.p1.initial)
+        self.assertEqual(self.p1.h_max(n), 2)
+        self.assertEqual(self.p1.h_add(n), 6)
+        self.assertEqual(self.p1.h_ff(n), 6)
+        self.assertEqual(len(self.p1.helpful_actions(self.p1.initial)), 4)
+
+    def test_h_pg_levelsum(self):
+        n = Node(self.p1.initial)
+        self.assertEqual(self.p1.h_pg_levelsum(n), 4)
+
+
+class TestMatrixPlanningGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.p1 = air_cargo_p1()
+        self.pg = MatrixPlanningGraph(self.p1, self.p1.initial,
+                                      graph_actions=self.p1.graph_actions)
+
+    def test_levels(self):
+        state = self.p1.initial
+        for action in self.p1.actions_list[:6]:
+            if action in self.p1.actions(state):
+                state = self.p1.result(state, action)
+            pg = PlanningGraph(self.p1, state)
+            mpg = MatrixPlanningGraph(self.p1, state, graph_actions=self.p1.graph_actions)
+            self.assertEqual(len(pg.s_levels), len(mpg.s_levels))
+            for level, nodes in enumerate(pg.s_levels):
+                self.assertEqual(nodes, mpg.literals(level))
+            for level, nodes in enumerate(pg.a_levels):
+                self.assertEqual({(n.action.name, n.action.args) for n in nodes},
+                                 {(a.name, a.args) for a in mpg.actions(level)})
+            self.assertEqual(pg.h_levelsum(), mpg.h_levelsum())
+
+    def test_a_mutex(self):
+        # no S0 mutexes, so the A0 mutexes are the pairwise tests of PlanningGraph
+        ref = PlanningGraph(self.p1, self.p1.initial)
+        nodes = [PgNode_a(action) for action in self.pg.actions(0)]
+        for i, n1 in enumerate(nodes):
+            for j, n2 in enumerate(nodes):
+                expected = i != j and (
+                    ref.serialize_actions(n1, n2) or
+                    ref.inconsistent_effects_mutex(n1, n2) or
+                    ref.interference_mutex(n1, n2))
+                self.assertEqual(self.pg.a_mutex[0][i, j], expected)
+
+    def test_s_mutex(self):
+        nodes = [PgNode_a(action) for action in self.pg.actions(0)]
+        ga = self.pg.graph_actions
+        for i in self.pg.s_levels[1].nonzero()[0]:
+            for j in self.pg.s_levels[1].nonzero()[0]:
+                if i == j:
+                    continue
+                s1, s2 = ga.literal(i), ga.literal(j)
+                parents1 = [k for k, n in enumerate(nodes) if s1 in n.effnodes]
+                parents2 = [k for k, n in enumerate(nodes) if s2 in n.effnodes]
+                expected = s1.symbol == s2.symbol or all(
+                    self.pg.a_mutex[0][k1, k2] for k1 in parents1 for k2 in parents2)
+                self.assertEqual(self.pg.s_mutex[1][i, j], expected)
+
+    def test_h_setlevel(self):
+        state = self.p1.initial
+        for _ in range(6):
+            mpg = MatrixPlanningGraph(self.p1, state, graph_actions=self.p1.graph_actions)
+            level = mpg.h_setlevel()
+            goals = [self.p1.graph_actions.fluent_index[goal] for goal in self.p1.goal]
+            self.assertTrue(mpg.s_levels[level][goals].all())
+            self.assertFalse(mpg.s_mutex[level][np.ix_(goals, goals)].any())
+            # the goals must also be reached one at a time
+            self.assertGreaterEqual(level, self.p1.relaxed_graph.h_max(state))
+            state = self.p1.result(state, self.p1.actions(state)[0])
+        n = Node(self.p1.initial)
+        self.assertEqual(self.p1.h_pg_setlevel(n), 4)
+        self.assertEqual(self.p1.h_pg_setlevel(Node(self.p1.goal_mask)), 0)
+
+
+class TestRelaxedPlanningGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.p2 = air_cargo_p2()
+        self.rpg = RelaxedPlanningGraph(self.p2.graph_actions, self.p2.goal)
+
+    def test_levels(self):
+        state = self.p2.initial
+        for _ in range(10):
+            mpg = MatrixPlanningGraph(self.p2, state, graph_actions=self.p2.graph_actions)
+            literal_levels, action_levels = self.rpg.expand(state)
+            self.assertEqual(literal_levels.tolist(), mpg.literal_levels.tolist())
+            self.assertEqual(self.rpg.h_levelsum(state), mpg.h_levelsum())
+            self.assertEqual(self.rpg.h_levelsum(state),
+                             PlanningGraph(self.p2, state).h_levelsum())
+            # the actions of A0 are those applicable in the state
+            self.assertEqual({a for a, level in zip(self.rpg.actions, action_levels) if level == 0},
+                             set(self.p2.actions(state)))
+            state = self.p2.result(state, self.p2.actions(state)[-1])
+
+    def test_h_max(self):
+        # with unit action costs, h_max is the level of the deepest goal
+        state = self.p2.initial
+        for _ in range(10):
+            literal_levels, _ = self.rpg.expand(state)
+            self.assertEqual(self.rpg.h_max(state), literal_levels[self.rpg.goal].max())
+            self.assertGreaterEqual(self.rpg.h_add(state), self.rpg.h_max(state))
+            state = self.p2.result(state, self.p2.actions(state)[-1])
+
+    def test_relaxed_plan(self):
+        state = self.p2.initial
+        plan, helpful = self.rpg.relaxed_plan(state)
+        self.assertEqual(len(plan), self.rpg.h_ff(state))
+        self.assertLessEqual(self.rpg.h_max(state), len(plan))
+        self.assertLessEqual(len(plan), self.rpg.h_add(state))
+        # the plan reaches the goal when delete effects are ignored
+        for action in plan:
+            self.assertIn(action, self.p2.actions(state))
+            state = self.p2.result(state, action) | state
+        self.assertTrue(self.p2.goal_test(state))
+        self.assertTrue(set(helpful) <= set(self.p2.actions(self.p2.initial)))
+        self.assertEqual(self.rpg.relaxed_plan(self.p2.goal_mask), ([], []))
+
+    def test_reuse(self):
+        # expanding a state leaves the compiled graph unchanged
+        h = self.rpg.h_levelsum(self.p2.initial)
+        self.rpg.expand(self.p2.result(self.p2.initial, self.p2.actions(self.p2.initial)[0]))
+        self.assertEqual(self.rpg.h_levelsum(self.p2.initial), h)
+
 if __name__ == '__main__':
     unittest.main()
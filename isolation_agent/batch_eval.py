@@ -0,0 +1,244 @@
+"""
+This file contains vectorized versions of the isolation heuristics that score
+a whole batch of positions with NumPy at once.
+
+A `PositionBatch` stores N positions as arrays: the blank cells of each board
+as an (N, cells) boolean array and the cell indices of the scoring player and
+their opponent. The batch heuristics compute the same values as the scalar
+heuristics of `sample_players.py` and `game_agent.py` for every position of
+the batch, which makes tuning sweeps over large sets of positions (e.g., the
+leaves of a search frontier or a self-play dataset) fast.
+
+`batch_score()` scores a list of boards with any `score_fn`, using the
+vectorized version when one exists, and `scalar_score()` turns a batch
+heuristic back into an ordinary `score_fn(game, player)`.
+"""
+import numpy as np
+
+from isolation.bitboard import move_tables
+from isolation.symmetry import position
+
+from game_agent import (custom_score_4, custom_score_5,
+                        euclidean_dist_heuristic, manhattan_dist_heuristic)
+from sample_players import center_score, improved_score
+
+NOT_MOVED = -1
+
+_ADJACENCY = {}
+
+
+def adjacency(width, height):
+    """Return the (cells, cells) boolean matrix of knight moves of a board. """
+    key = (width, height)
+    if key not in _ADJACENCY:
+        _, masks, _ = move_tables(width, height)
+        _ADJACENCY[key] = unpack_masks(masks, width * height)
+    return _ADJACENCY[key]
+
+
+def unpack_masks(masks, size):
+    """Return a sequence of cell bitmasks as an (N, size) boolean array. """
+    num_bytes = (size + 7) // 8
+    data = b"".join(mask.to_bytes(num_bytes, "little") for mask in masks)
+    data = np.frombuffer(data, dtype=np.uint8).reshape(-1, num_bytes)
+    bits = np.unpackbits(data, axis=1, bitorder="little")
+    return bits[:, :size].astype(bool)
+
+
+class PositionBatch():
+    """A batch of isolation positions seen by one player each.
+
+    Parameters
+    ----------
+    blank : numpy.ndarray
+        (N, width * height) boolean array of the blank cells, indexed like
+        `Board` (cell `row + column * height`).
+
+    player_loc, opp_loc : numpy.ndarray
+        (N,) integer arrays of the cells of the scoring player and of the
+        opponent, or NOT_MOVED.
+
+    player_active : numpy.ndarray
+        (N,) boolean array, True where the scoring player is to move.
+
+    width, height : int
+        The board size.
+    """
+    def __init__(self, blank, player_loc, opp_loc, player_active, width, height):
+        self.blank = np.asarray(blank, dtype=bool)
+        self.player_loc = np.asarray(player_loc, dtype=np.intp)
+        self.opp_loc = np.asarray(opp_loc, dtype=np.intp)
+        self.player_active = np.asarray(player_active, dtype=bool)
+        self.width = width
+        self.height = height
+
+    def __len__(self):
+        return len(self.player_loc)
+
+    @classmethod
+    def from_games(cls, games, players):
+        """Encode a list of boards of the same size.
+
+        Parameters
+        ----------
+        games : list<`isolation.Board`>
+            The positions to encode.
+
+        players : object or list<object>
+            The player each position is scored for, or a single player for
+            every position.
+        """
+        if not isinstance(players, (list, tuple)):
+            players = [players] * len(games)
+        width, height = games[0].width, games[0].height
+        blocked, player_loc, opp_loc, player_active = [], [], [], []
+        for game, player in zip(games, players):
+            mask, p1, p2 = position(game)
+            # player 1 has the initiative after an even number of moves, so
+            # order the locations as (active, inactive)
+            if game.move_count % 2:
+                p1, p2 = p2, p1
+            is_active = player is game.active_player
+            own, opp = (p1, p2) if is_active else (p2, p1)
+            blocked.append(mask)
+            player_loc.append(NOT_MOVED if own is None else own)
+            opp_loc.append(NOT_MOVED if opp is None else opp)
+            player_active.append(is_active)
+        blank = ~unpack_masks(blocked, width * height)
+        return cls(blank, player_loc, opp_loc, player_active, width, height)
+
+    def num_moves(self, locations):
+        """ Return the number of legal moves from each of the locations. """
+        moves = adjacency(self.width, self.height)[locations] & self.blank
+        counts = moves.sum(axis=1)
+        return np.where(locations == NOT_MOVED, self.blank.sum(axis=1), counts)
+
+    def coordinates(self, locations):
+        """ Return the (row, column) arrays of the locations. """
+        return locations % self.height, locations // self.height
+
+
+def _terminal(batch, own, opp, scores):
+    """Set the scores of positions where the player to move has no moves to
+    -inf (the scoring player lost) or inf (the scoring player won).
+    """
+    active_moves = np.where(batch.player_active, own, opp)
+    lost = active_moves == 0
+    scores = np.asarray(scores, dtype=float)
+    scores[lost] = np.where(batch.player_active[lost], -np.inf, np.inf)
+    return scores
+
+
+def batch_improved_score(batch):
+    """ Vectorized `sample_players.improved_score`. """
+    own = batch.num_moves(batch.player_loc)
+    opp = batch.num_moves(batch.opp_loc)
+    return _terminal(batch, own, opp, own - opp)
+
+
+def batch_center_score(batch):
+    """Vectorized `sample_players.center_score`. The score of a player that
+    has not moved is NaN.
+    """
+    own = batch.num_moves(batch.player_loc)
+    opp = batch.num_moves(batch.opp_loc)
+    y, x = batch.coordinates(batch.player_loc)
+    scores = (batch.height / 2. - y)**2 + (batch.width / 2. - x)**2
+    scores = np.where(batch.player_loc == NOT_MOVED, np.nan, scores)
+    return _terminal(batch, own, opp, scores)
+
+
+def _distance_score(batch, distance_fn):
+    own = batch.num_moves(batch.player_loc)
+    opp = batch.num_moves(batch.opp_loc)
+    move_diff = own - 2 * opp
+    py, px = batch.coordinates(batch.player_loc)
+    oy, ox = batch.coordinates(batch.opp_loc)
+    dist = distance_fn(np.abs(py - oy), np.abs(px - ox)).astype(float)
+    scores = np.divide(move_diff, dist, out=np.zeros(len(batch)), where=dist != 0)
+    unmoved = (batch.player_loc == NOT_MOVED) | (batch.opp_loc == NOT_MOVED)
+    scores = np.where(unmoved, np.nan, scores)
+    return _terminal(batch, own, opp, scores)
+
+
+def batch_manhattan_score(batch):
+    """Vectorized `game_agent.manhattan_dist_heuristic`. The score is NaN
+    unless both players have moved.
+    """
+    return _distance_score(batch, lambda dy, dx: dy + dx)
+
+
+def batch_euclidean_score(batch):
+    """Vectorized `game_agent.euclidean_dist_heuristic`. The score is NaN
+    unless both players have moved.
+    """
+    return _distance_score(batch, lambda dy, dx: np.sqrt(dy**2 + dx**2))
+
+
+# Vectorized versions of the scalar heuristics
+BATCH_SCORES = {
+    improved_score: batch_improved_score,
+    center_score: batch_center_score,
+    manhattan_dist_heuristic: batch_manhattan_score,
+    euclidean_dist_heuristic: batch_euclidean_score,
+    custom_score_4: batch_manhattan_score,
+    custom_score_5: batch_euclidean_score,
+}
+
+
+def batch_score(score_fn, games, players):
+    """Score a list of boards with a heuristic.
+
+    Parameters
+    ----------
+    score_fn : callable
+        A scalar heuristic `score_fn(game, player)`; heuristics with a
+        vectorized version in BATCH_SCORES are computed on a `PositionBatch`,
+        any other function is called once per position.
+
+    games : list<`isolation.Board`>
+        The positions to score.
+
+    players : object or list<object>
+        The player each position is scored for, or a single player for
+        every position.
+
+    Returns
+    -------
+    numpy.ndarray
+        The (N,) array of scores.
+    """
+    if not games:
+        return np.zeros(0)
+    if score_fn in BATCH_SCORES:
+        return BATCH_SCORES[score_fn](PositionBatch.from_games(games, players))
+    if not isinstance(players, (list, tuple)):
+        players = [players] * len(games)
+    return np.array([score_fn(game, player) for game, player in zip(games, players)],
+                    dtype=float)
+
+
+def scalar_score(batch_fn):
+    """Return a `score_fn(game, player)` that evaluates a batch heuristic on
+    a single position, so it can be used by the agents.
+    """
+    def score(game, player):
+        return float(batch_fn(PositionBatch.from_games([game], [player]))[0])
+    return score
+
+
+def frontier(game, depth):
+    """Return the positions reached after `depth` moves from `game`,
+    including games that end earlier.
+    """
+    positions = [game]
+    for _ in range(depth):
+        next_positions = []
+        for position_ in positions:
+            moves = position_.get_legal_moves()
+            if not moves:
+                next_positions.append(position_)
+            for move in moves:
+                next_positions.append(position_.forecast_move(move))
+        positions = next_positions
+    return positions
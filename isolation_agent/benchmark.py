@@ -0,0 +1,284 @@
+"""Benchmark the isolation boards and the search of the agents.
+
+Every benchmark runs on the same seeded set of positions (random games cut
+after a random number of plies), so reports of different versions of the code
+measure the same work:
+
+- `legal_moves`: `get_legal_moves()` calls per second of each board class
+- `forecast_move`: microseconds per `forecast_move()` of each board class
+- `search`: seconds per fixed-depth alpha-beta search of each board class
+- `score_fn`: nodes per second of a fixed-depth alpha-beta search with each
+  heuristic
+
+The boards do not shuffle their legal moves, so every run searches the same
+trees, and each metric is the best of several repetitions. The report is
+written as JSON, and `--compare` checks it against an earlier report and exits
+with status 1 if a metric got worse by more than the tolerance:
+
+    python benchmark.py --out baseline.json
+    python benchmark.py --out new.json --compare baseline.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import timeit
+
+from isolation import Board, BitBoard
+from game_agent import (AlphaBetaPlayer, custom_score, custom_score_2,
+                        custom_score_3, custom_score_4, custom_score_5)
+from sample_players import center_score, improved_score, open_move_score
+from search_stats import SearchStats
+
+BENCHMARK_FILE = "benchmark.json"
+
+BOARDS = {"Board": Board, "BitBoard": BitBoard}
+
+SCORE_FNS = {
+    "open_move_score": open_move_score,
+    "center_score": center_score,
+    "improved_score": improved_score,
+    "custom_score": custom_score,
+    "custom_score_2": custom_score_2,
+    "custom_score_3": custom_score_3,
+    "custom_score_4": custom_score_4,
+    "custom_score_5": custom_score_5,
+}
+
+
+def benchmark_positions(count=20, seed=0, min_plies=2, max_plies=24,
+                        width=7, height=7):
+    """Return the move lists of `count` seeded random positions in which the
+    player to move has legal moves.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Board("p1", "p2", width, height)
+        moves = []
+        for _ in range(rng.randint(min_plies, max_plies)):
+            legal_moves = sorted(board.get_legal_moves())
+            if not legal_moves:
+                break
+            move = rng.choice(legal_moves)
+            board.apply_move(move)
+            moves.append(move)
+        if board.get_legal_moves():
+            positions.append(moves)
+    return positions
+
+
+def make_board(board_cls, player_1, player_2, moves, width=7, height=7):
+    """Return a new board of the given class with `moves` applied and move
+    shuffling disabled.
+    """
+    board = board_cls(player_1, player_2, width, height, shuffle_moves=False)
+    for move in moves:
+        board.apply_move(move)
+    return board
+
+
+def best_time(fn, repeat):
+    """ Return the shortest of `repeat` runs of `fn()` in seconds. """
+    times = []
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        fn()
+        times.append(timeit.default_timer() - start)
+    return min(times)
+
+
+def metric(value, unit, higher_is_better):
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def bench_legal_moves(positions, repeat=5, loops=200):
+    results = {}
+    for name, board_cls in BOARDS.items():
+        boards = [make_board(board_cls, "p1", "p2", moves) for moves in positions]
+
+        def run():
+            for _ in range(loops):
+                for board in boards:
+                    board.get_legal_moves()
+        seconds = best_time(run, repeat)
+        results["legal_moves/" + name] = metric(
+            loops * len(boards) / seconds, "calls/s", True)
+    return results
+
+
+def bench_forecast_move(positions, repeat=5, loops=200):
+    results = {}
+    for name, board_cls in BOARDS.items():
+        pairs = []
+        for moves in positions:
+            board = make_board(board_cls, "p1", "p2", moves)
+            pairs.append((board, sorted(board.get_legal_moves())[0]))
+
+        def run():
+            for _ in range(loops):
+                for board, move in pairs:
+                    board.forecast_move(move)
+        seconds = best_time(run, repeat)
+        results["forecast_move/" + name] = metric(
+            1e6 * seconds / (loops * len(pairs)), "us", False)
+    return results
+
+
+def search_positions(player, board_cls, positions, depth):
+    """Search every position to a fixed depth with alpha-beta and return the
+    number of nodes visited.
+    """
+    player.stats = SearchStats()
+    player.time_left = lambda: float("inf")
+    player.stats.start_move(player.time_left)
+    for moves in positions:
+        # the searching agent is the player to move
+        if len(moves) % 2:
+            game = make_board(board_cls, "opponent", player, moves)
+        else:
+            game = make_board(board_cls, player, "opponent", moves)
+        player.alphabeta(game, depth)
+    return player.stats.nodes
+
+
+def bench_search(positions, depth=4, repeat=5):
+    results = {}
+    for name, board_cls in BOARDS.items():
+        player = AlphaBetaPlayer(score_fn=improved_score)
+        seconds = best_time(
+            lambda: search_positions(player, board_cls, positions, depth), repeat)
+        results["search/depth_{}/{}".format(depth, name)] = metric(
+            seconds / len(positions), "s", False)
+    return results
+
+
+def bench_score_fns(positions, depth=4, repeat=5):
+    results = {}
+    for name, score_fn in SCORE_FNS.items():
+        player = AlphaBetaPlayer(score_fn=score_fn)
+        nodes = search_positions(player, BitBoard, positions, depth)
+        seconds = best_time(
+            lambda: search_positions(player, BitBoard, positions, depth), repeat)
+        results["score_fn/" + name] = metric(nodes / seconds, "nodes/s", True)
+    return results
+
+
+def run_benchmarks(num_positions=50, seed=0, depth=4, repeat=5, loops=200):
+    """Run every benchmark and return the report.
+
+    Parameters
+    ----------
+    num_positions : int (optional)
+        The number of seeded positions.
+
+    seed : int (optional)
+        Seed of the positions.
+
+    depth : int (optional)
+        Depth of the fixed-depth searches.
+
+    repeat : int (optional)
+        Number of repetitions of every measurement; the fastest is reported.
+
+    loops : int (optional)
+        Number of passes over the positions of the move generation benchmarks.
+
+    Returns
+    -------
+    dict
+        The settings and environment of the run under "meta", and the metrics
+        under "results", each a dict with the "value", its "unit" and whether
+        higher values are better.
+    """
+    positions = benchmark_positions(num_positions, seed)
+    results = {}
+    results.update(bench_legal_moves(positions, repeat, loops))
+    results.update(bench_forecast_move(positions, repeat, loops))
+    results.update(bench_search(positions, depth, repeat))
+    results.update(bench_score_fns(positions, depth, repeat))
+    return {
+        "meta": {
+            "positions": num_positions,
+            "seed": seed,
+            "depth": depth,
+            "repeat": repeat,
+            "loops": loops,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, report, tolerance=0.1):
+    """Compare the metrics of two reports.
+
+    Returns
+    -------
+    list<(str, float, float, float, bool)>
+        For every metric of both reports, its name, the baseline and new
+        values, the relative change and whether it is worse than the baseline
+        by more than `tolerance`.
+    """
+    rows = []
+    for name, new in sorted(report["results"].items()):
+        old = baseline["results"].get(name)
+        if old is None or not old["value"]:
+            continue
+        change = new["value"] / old["value"] - 1
+        if new["higher_is_better"]:
+            regressed = change < -tolerance
+        else:
+            regressed = change > tolerance
+        rows.append((name, old["value"], new["value"], change, regressed))
+    return rows
+
+
+def print_report(report):
+    for name, result in sorted(report["results"].items()):
+        print("{:<32}{:>14.4g} {}".format(name, result["value"], result["unit"]))
+
+
+def print_comparison(rows):
+    print("{:<32}{:>12}{:>12}{:>9}".format("Metric", "Baseline", "New", "Change"))
+    for name, old, new, change, regressed in rows:
+        print("{:<32}{:>12.4g}{:>12.4g}{:>+8.1f}%{}".format(
+            name, old, new, 100 * change, "  REGRESSION" if regressed else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark move generation " +
+        "and search on seeded isolation positions.")
+    parser.add_argument('--positions', type=int, default=50,
+                        help="Number of positions. Default: 50")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seed of the positions. Default: 0")
+    parser.add_argument('--depth', type=int, default=4,
+                        help="Depth of the fixed-depth searches. Default: 4")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Repetitions of every measurement. Default: 5")
+    parser.add_argument('--out', default=BENCHMARK_FILE,
+                        help="Report file. Default: {}".format(BENCHMARK_FILE))
+    parser.add_argument('--compare', default=None, metavar='BASELINE',
+                        help="Report to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="Relative change counted as a regression. Default: 0.1")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.positions, args.seed, args.depth, args.repeat)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print_report(report)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, args.tolerance)
+        print()
+        print_comparison(rows)
+        if any(row[-1] for row in rows):
+            sys.exit(1)
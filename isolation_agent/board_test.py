@@ -0,0 +1,170 @@
+"""
+This file contains test cases to verify that the alternative board engines in
+the `isolation` package follow the same rules as `isolation.Board`.
+"""
+import random
+import unittest
+
+import isolation
+
+from isolation.endgame import partition, solve_endgame
+from isolation.symmetry import (canonical_hash, canonical_position,
+                                symmetries, to_canonical, from_canonical)
+
+
+def play_random_game(board_cls, seed, width=7, height=7):
+    """Play a game with uniformly random moves on a new board of the given
+    class and return the list of (board, move) pairs visited.
+    """
+    rng = random.Random(seed)
+    board = board_cls("Player1", "Player2", width=width, height=height)
+    history = []
+    while True:
+        moves = sorted(board.get_legal_moves())
+        if not moves:
+            return history, board
+        move = rng.choice(moves)
+        history.append((board.copy(), move))
+        board.apply_move(move)
+
+
+class BitBoardTest(unittest.TestCase):
+
+    def assertSameState(self, board, bitboard):
+        for player in ("Player1", "Player2"):
+            self.assertEqual(board.get_player_location(player),
+                             bitboard.get_player_location(player))
+            self.assertEqual(sorted(board.get_legal_moves(player)),
+                             sorted(bitboard.get_legal_moves(player)))
+            self.assertEqual(board.is_winner(player), bitboard.is_winner(player))
+            self.assertEqual(board.is_loser(player), bitboard.is_loser(player))
+            self.assertEqual(board.utility(player), bitboard.utility(player))
+        self.assertEqual(board.get_blank_spaces(), bitboard.get_blank_spaces())
+        self.assertEqual(board.active_player, bitboard.active_player)
+        self.assertEqual(board.move_count, bitboard.move_count)
+        self.assertEqual(board.to_string(), bitboard.to_string())
+
+    def test_matches_board(self):
+        """ BitBoard agrees with Board over complete random games """
+        for seed, (w, h) in enumerate([(7, 7), (5, 8), (9, 4)]):
+            history, _ = play_random_game(isolation.Board, seed, w, h)
+            bitboard = isolation.BitBoard("Player1", "Player2", width=w, height=h)
+            for board, move in history:
+                self.assertSameState(board, bitboard)
+                self.assertTrue(bitboard.move_is_legal(move))
+                bitboard = bitboard.forecast_move(move)
+            board.apply_move(move)
+            self.assertSameState(board, bitboard)
+
+    def test_copy_is_independent(self):
+        """ Moves applied to a copy do not change the original board """
+        board = isolation.BitBoard("Player1", "Player2")
+        board.apply_move((3, 3))
+        child = board.forecast_move((0, 0))
+        self.assertEqual(board.get_player_location("Player2"), None)
+        self.assertEqual(child.get_player_location("Player2"), (0, 0))
+        self.assertTrue(board.move_is_legal((0, 0)))
+        self.assertFalse(child.move_is_legal((0, 0)))
+
+    def test_fixed_move_order(self):
+        """ shuffle_moves=False returns moves in the same order every time """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            board = board_cls("Player1", "Player2", shuffle_moves=False)
+            board.apply_move((3, 3))
+            board.apply_move((0, 0))
+            moves = board.get_legal_moves()
+            for _ in range(10):
+                self.assertEqual(board.copy().get_legal_moves(), moves)
+
+
+class PushPopTest(unittest.TestCase):
+
+    def test_pop_restores_state(self):
+        """ pop_move() undoes push_move() on every board engine """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            history, final = play_random_game(board_cls, 7)
+            board = board_cls("Player1", "Player2")
+            for _, move in history:
+                board.push_move(move)
+            self.assertEqual(board.to_string(), final.to_string())
+            for snapshot, _ in reversed(history):
+                board.pop_move()
+                self.assertEqual(board.to_string(), snapshot.to_string())
+                self.assertEqual(board.active_player, snapshot.active_player)
+                self.assertEqual(board.move_count, snapshot.move_count)
+                self.assertEqual(sorted(board.get_legal_moves()),
+                                 sorted(snapshot.get_legal_moves()))
+
+
+def active_wins(board):
+    """Solve a position by exhaustive search; True if the active player
+    wins with perfect play.
+    """
+    return any(not active_wins(board.forecast_move(m))
+               for m in board.get_legal_moves())
+
+
+class EndgameTest(unittest.TestCase):
+
+    def test_solver_matches_exhaustive_search(self):
+        """ The solver agrees with a full game-tree search """
+        solved = 0
+        for seed in range(200):
+            rng = random.Random(seed)
+            board = isolation.BitBoard("Player1", "Player2", width=5, height=5)
+            while board.get_legal_moves() and partition(board) is None:
+                board.apply_move(rng.choice(sorted(board.get_legal_moves())))
+            if partition(board) is None or len(board.get_blank_spaces()) > 12:
+                continue
+            move, wins = solve_endgame(board)
+            self.assertEqual(wins, active_wins(board))
+            if move is not None:
+                self.assertIn(move, board.get_legal_moves())
+                if wins:
+                    self.assertFalse(active_wins(board.forecast_move(move)))
+            solved += 1
+        self.assertGreater(solved, 20)
+
+    def test_connected_players(self):
+        """ No solution while the players can still reach the same cells """
+        board = isolation.Board("Player1", "Player2")
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        self.assertIsNone(partition(board))
+        self.assertIsNone(solve_endgame(board))
+
+
+class SymmetryTest(unittest.TestCase):
+
+    def test_canonical_keys_are_invariant(self):
+        """ Every orientation of a position has the same canonical keys """
+        for width, height in [(7, 7), (6, 5)]:
+            perms, _ = symmetries(width, height)
+            history, _ = play_random_game(isolation.Board, 3, width, height)
+            moves = [move for _, move in history][:12]
+            for t in range(len(perms)):
+                boards = [cls("Player1", "Player2", width, height)
+                          for cls in (isolation.Board, isolation.BitBoard)]
+                for board in boards:
+                    for move in moves:
+                        board.apply_move(to_canonical(move, t, width, height))
+                original = history[len(moves)][0]
+                for board in boards:
+                    self.assertEqual(canonical_hash(board)[0],
+                                     canonical_hash(original)[0])
+                    self.assertEqual(canonical_position(board)[0],
+                                     canonical_position(original)[0])
+
+    def test_move_mapping(self):
+        """ Moves map onto the canonical orientation and back """
+        history, _ = play_random_game(isolation.BitBoard, 5)
+        for board, move in history:
+            key, t = canonical_hash(board)
+            self.assertEqual(from_canonical(to_canonical(move, t, 7, 7), t, 7, 7),
+                             move)
+            if t == 0:
+                self.assertEqual(key, board.hash())
+
+
+if __name__ == '__main__':
+    unittest.main()
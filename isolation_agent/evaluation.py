@@ -0,0 +1,107 @@
+"""
+This file contains a cache of heuristic values used to avoid evaluating the
+same leaf position more than once.
+
+The shallow iterations of a turn reach the leaves of the deep iterations of
+the agent's previous turn, and transpositions reach the same position through
+different move orders, so many leaves are scored repeatedly. `ScoreCache`
+wraps any score function and remembers the most recently used values keyed on
+the position hash returned by `Board.hash()`.
+
+Rotations and reflections of a position only have the same heuristic value
+when the heuristic itself is invariant under them, so canonical keys are
+limited to score functions declared with the `symmetric` decorator.
+"""
+from collections import OrderedDict
+
+from isolation.symmetry import canonical_hash
+
+
+def symmetric(score_fn):
+    """Declare that a score function has the same value on every rotation and
+    reflection of a position, and return it unchanged.
+
+    Only declared functions may be searched with canonical position keys (see
+    `ScoreCache` and `AlphaBetaPlayer`); a heuristic that uses board
+    coordinates, like `custom_score_2`, must not be declared.
+    """
+    score_fn.symmetric = True
+    return score_fn
+
+
+def is_symmetric(score_fn):
+    """ Return True if score_fn was declared with `symmetric`. """
+    return getattr(score_fn, "symmetric", False)
+
+
+class ScoreCache():
+    """A score function that caches the values of another score function.
+
+    Instances are callable with the same `(game, player)` arguments as the
+    wrapped function, so they can be passed as the `score_fn` of any agent.
+    The wrapped function must only depend on the position, which holds for
+    the heuristics in `game_agent.py` and `sample_players.py`. The cache is
+    itself declared symmetric when the wrapped function is.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The heuristic to cache.
+
+    size : int (optional)
+        The maximum number of cached values; the least recently used value is
+        discarded when the cache is full.
+
+    symmetry_plies : int (optional)
+        Positions with fewer than this many moves played are keyed on the hash
+        of their canonical orientation (see `isolation.symmetry`), so that
+        rotations and reflections of a position share one entry. Requires a
+        score function declared with `symmetric`.
+
+    Raises
+    ------
+    ValueError
+        If symmetry_plies is positive and score_fn is not declared symmetric.
+    """
+    def __init__(self, score_fn, size=2**16, symmetry_plies=0):
+        self.symmetric = is_symmetric(score_fn)
+        if symmetry_plies > 0 and not self.symmetric:
+            raise ValueError("symmetry_plies requires a score function "
+                             "declared with evaluation.symmetric")
+        self.score_fn = score_fn
+        self.size = size
+        self.symmetry_plies = symmetry_plies
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+
+    def __len__(self):
+        return len(self._values)
+
+    def __call__(self, game, player):
+        if game.move_count < self.symmetry_plies:
+            key = canonical_hash(game)[0]
+        else:
+            key = game.hash()
+        # the hash includes the initiative, so the perspective is fixed by
+        # whether the player is the one to move
+        key = (key, player is game.active_player)
+
+        values = self._values
+        value = values.get(key)
+        if value is not None:
+            values.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = self.score_fn(game, player)
+        values[key] = value
+        if len(values) > self.size:
+            values.popitem(last=False)
+        return value
+
+    def clear(self):
+        """ Remove every cached value. """
+        self._values.clear()
+        self.hits = self.misses = 0
@@ -1,9 +1,29 @@
+import copy
 import math
+import multiprocessing
+import os
+import random
+import timeit
+
+from isolation.bitboard import move_tables
+from isolation.endgame import board_masks, popcount, solve_endgame, EndgameLimit
+from isolation.symmetry import canonical_hash, to_canonical, from_canonical
+
+from evaluation import ScoreCache, is_symmetric, symmetric
+from move_ordering import MoveOrderer
+from transposition import (TranspositionTable, EXACT, LOWER, UPPER,
+                           PERSPECTIVE_KEY)
+
+# Width of the null windows of the principal variation search; any positive
+# value is correct, since a null-window result above alpha (or below beta)
+# always triggers a full-window re-search
+PVS_EPSILON = 1e-6
 
 class SearchTimeout(Exception):
     """Subclass base exception for code clarity. """
     pass
 
+@symmetric
 def custom_score(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player based on the limit_opp_moves tactic.
@@ -76,6 +96,7 @@ def custom_score_3(game, player):
     """
     return offensive_heuristic(game, player)
 
+@symmetric
 def custom_score_4(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player based on the manhattan distance heuristic.
@@ -100,6 +121,7 @@ def custom_score_4(game, player):
     """
     return manhattan_dist_heuristic(game, player)
 
+@symmetric
 def custom_score_5(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player based on the euclidean distance heuristic.
@@ -124,6 +146,7 @@ def custom_score_5(game, player):
     """
     return euclidean_dist_heuristic(game, player)
 
+@symmetric
 def limit_opp_moves_heuristic(game, player):
     """
     This heuristic prioritizes limiting the opponent's future moves. The
@@ -154,22 +177,49 @@ def limit_opp_moves_heuristic(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    player_legal_moves = game.get_legal_moves(player)
-    player_total_moves = len(player_legal_moves)
+    active_moves, inactive_moves = mobility_masks(game)
+    num_active = popcount(active_moves)
+    num_inactive = popcount(inactive_moves)
+
+    # Each player's total is the number of their legal moves plus the number
+    # of legal moves left after forecasting each of them. forecast_move()
+    # always moves the active player, after which the inactive player is to
+    # move and has lost the target cell if it was one of their moves, so the
+    # totals follow from the move masks without creating any boards: the
+    # inactive player loses exactly one move for each of their own moves.
+    active_total = (num_active + num_active * num_inactive -
+                    popcount(active_moves & inactive_moves))
+    inactive_total = num_inactive * num_inactive
+
+    if player is game.active_player:
+        player_total_moves, opp_total_moves = active_total, inactive_total
+    else:
+        player_total_moves, opp_total_moves = inactive_total, active_total
 
-    for move in player_legal_moves:
-        player_board = game.forecast_move(move)
-        player_total_moves += len(player_board.get_legal_moves())
+    # Multiply opp_total_moves by 2 to penalize when opp has more moves
+    return float(player_total_moves - 2 * opp_total_moves)
 
-    opp_legal_moves = game.get_legal_moves(game.get_opponent(player))
-    opp_total_moves = len(opp_legal_moves)
+def mobility_masks(game):
+    """
+    Return the bitmasks of the legal moves of the active and inactive players
+    without generating move lists or copying the board.
 
-    for move in opp_legal_moves:
-        opp_board = game.forecast_move(move)
-        opp_total_moves += len(opp_board.get_legal_moves())
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
 
-    # Multiply opp_total_moves by 2 to penalize when opp has more moves
-    return float(player_total_moves - 2 * opp_total_moves)
+    Returns
+    -------
+    (int, int)
+        The move masks of the active and inactive players; bit
+        `row + column * height` is set for a legal move to (row, column).
+    """
+    blank, active, inactive = board_masks(game)
+    _, masks, _ = move_tables(game.width, game.height)
+    return (blank if active is None else masks[active] & blank,
+            blank if inactive is None else masks[inactive] & blank)
 
 def dist_heuristic_helper(game, player):
     '''
@@ -213,6 +263,7 @@ def dist_heuristic_helper(game, player):
 
     return(move_diff, player_pos, opp_pos)
 
+@symmetric
 def manhattan_dist_heuristic(game, player):
     '''
     This heuristic focuses on the difference between the number of moves
@@ -257,6 +308,7 @@ def manhattan_dist_heuristic(game, player):
         heuristic_val = 0
     return heuristic_val
 
+@symmetric
 def euclidean_dist_heuristic(game, player):
     '''
     This heuristic focuses on the difference between the number of moves between the players
@@ -369,6 +421,107 @@ def offensive_heuristic(game, player):
 
     return float(-abs(sum(opp_pos) - sum(player_pos)))
 
+def available_cpus():
+    """ Return the number of CPUs the current process may run on. """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return multiprocessing.cpu_count()
+
+
+# Transposition tables, move orderers and score functions of the agents
+# searching in a worker process of the parallel search, kept between turns
+_WORKER_TABLES = {}
+
+
+def search_root_moves(task):
+    """Run iterative deepening on a share of the root moves in a worker
+    process of the parallel search of `AlphaBetaPlayer`.
+
+    Parameters
+    ----------
+    task : (object, AlphaBetaPlayer, `isolation.Board`, list, float)
+        A key identifying the searching agent, a copy of the agent, the game,
+        the root moves to search and the `timeit.default_timer()` time at
+        which the turn ends.
+
+    Returns
+    -------
+    list<((int, int), float)>
+        The best move and its value for every completed depth, starting at 1.
+    """
+    key, agent, game, root_moves, deadline = task
+    if key not in _WORKER_TABLES:
+        tt = TranspositionTable(agent.tt_size) if agent.tt_size else None
+        _WORKER_TABLES[key] = (tt, agent.move_orderer, agent.score)
+    agent.tt, agent.move_orderer, agent.score = _WORKER_TABLES[key]
+    if agent.tt is not None:
+        agent.tt.new_search()
+    if agent.move_orderer is not None:
+        agent.move_orderer.new_search()
+    agent.time_left = lambda: 1000 * (deadline - timeit.default_timer())
+    if agent.time_manager is not None:
+        agent.time_manager.start(agent.time_left, agent.TIMER_THRESHOLD)
+
+    iterations = []
+    try:
+        # deeper iterations cannot find anything once every cell is filled
+        for depth in range(1, len(game.get_blank_spaces()) + 1):
+            move = agent.alphabeta(game, depth, root_moves=root_moves)
+            iterations.append((move, agent.root_value))
+    except SearchTimeout:
+        pass
+    return iterations
+
+
+def ponder_search(conn, agent, game, stop):
+    """Search a position in a background process until `stop` is set and
+    send the result through `conn`.
+
+    Parameters
+    ----------
+    conn : `multiprocessing.connection.Connection`
+        The sending end of a pipe to the agent.
+
+    agent : AlphaBetaPlayer
+        A copy of the pondering agent, including its transposition table.
+
+    game : `isolation.Board`
+        The position expected at the start of the agent's next turn.
+
+    stop : `multiprocessing.Event`
+        Set by the agent when its turn starts.
+
+    The message sent is the hash of the position, the best move of the
+    deepest completed iteration (or None) and the deepest (at most
+    `PONDER_MERGE_MAX`) transposition table entries of the search that are
+    at least `PONDER_MIN_DEPTH` deep.
+    """
+    agent.time_left = lambda: float("-inf") if stop.is_set() else float("inf")
+    if agent.tt is not None:
+        agent.tt.new_search()
+    if agent.move_orderer is not None:
+        agent.move_orderer.new_search()
+    if agent.time_manager is not None:
+        agent.time_manager.start(agent.time_left, agent.TIMER_THRESHOLD)
+
+    best_move = None
+    try:
+        # deeper iterations cannot find anything once every cell is filled
+        for depth in range(1, len(game.get_blank_spaces()) + 1):
+            best_move = agent.alphabeta(game, depth)
+    except SearchTimeout:
+        pass
+
+    entries = []
+    if agent.tt is not None:
+        entries = agent.tt.entries(agent.tt.age, AlphaBetaPlayer.PONDER_MIN_DEPTH)
+        # bound the time the agent spends merging them at the start of its turn
+        entries.sort(key=lambda entry: entry[1], reverse=True)
+        del entries[AlphaBetaPlayer.PONDER_MERGE_MAX:]
+    conn.send((game.hash(), best_move, entries))
+    conn.close()
+
+
 class IsolationPlayer:
     """
     Base class for minimax and alphabeta agents
@@ -388,12 +541,67 @@ class IsolationPlayer:
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    make_unmake : bool (optional)
+        If True, walk the game tree by applying and undoing moves on a single
+        board with `push_move()`/`pop_move()` instead of creating a new board
+        with `forecast_move()` for every node.
+
+    stats : `search_stats.SearchStats` (optional)
+        Records the nodes, leaves, cutoffs, completed depth and time of the
+        search of every move. If None, nothing is recorded.
+
+    score_cache : int (optional)
+        Number of heuristic values kept in an `evaluation.ScoreCache`, so
+        that leaves searched again by the next iteration or reached through
+        a transposition are not scored twice. A value of 0 scores every leaf.
     """
-    def __init__(self, search_depth=4, score_fn=custom_score, timeout=20.):
+    def __init__(self, search_depth=4, score_fn=custom_score, timeout=20.,
+                 make_unmake=False, stats=None, score_cache=0):
         self.search_depth = search_depth
+        if score_cache:
+            score_fn = ScoreCache(score_fn, score_cache)
         self.score = score_fn
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.make_unmake = make_unmake
+        self.stats = stats
+
+    def __getstate__(self):
+        # The time_left callable of the last turn is replaced every turn and
+        # cannot be pickled (e.g., to send the agent to a worker process)
+        state = self.__dict__.copy()
+        state["time_left"] = None
+        return state
+
+    def search_child(self, game, move, value_fn, *args):
+        """
+        Return the value of the state reached by applying `move` to `game`.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        move : (int, int)
+            A legal move for the active player in `game`
+
+        value_fn : callable
+            Search function called with the child state followed by `args`
+
+        Returns
+        -------
+         : float
+            The value returned by `value_fn` for the child state
+        """
+        if self.make_unmake:
+            game.push_move(move)
+            try:
+                return value_fn(game, *args)
+            finally:
+                game.pop_move()
+        return value_fn(game.forecast_move(move), *args)
 
 class MinimaxPlayer(IsolationPlayer):
     """
@@ -430,11 +638,17 @@ class MinimaxPlayer(IsolationPlayer):
         if not legal_moves:
             return best_move
 
+        if self.stats is not None:
+            self.stats.start_move(time_left)
+        depth = self.search_depth
         try:
-            return self.minimax(game, self.search_depth)
+            best_move = self.minimax(game, self.search_depth)
         except SearchTimeout:
             # Return best move found so far when time runs out
-            return best_move
+            depth = 0
+        if self.stats is not None:
+            self.stats.end_move(depth)
+        return best_move
 
     def terminal_test(self, game):
         """
@@ -486,10 +700,15 @@ class MinimaxPlayer(IsolationPlayer):
         best_score : int
             Score assigned to the best move found in the current search
         """
+        if self.stats is not None:
+            self.stats.nodes += 1
+
         if self.terminal_test(game):
             return game.utility(self)
 
         if depth == 0:
+            if self.stats is not None:
+                self.stats.leaves += 1
             return self.score(game, self)
 
         best_score = float("inf")
@@ -497,8 +716,7 @@ class MinimaxPlayer(IsolationPlayer):
 
         for m in legal_moves:
             self.check_time()
-            new_game = game.forecast_move(m)
-            current_score = self.max_value(new_game, depth-1)
+            current_score = self.search_child(game, m, self.max_value, depth-1)
             if current_score < best_score:
                 best_score = current_score
 
@@ -529,10 +747,15 @@ class MinimaxPlayer(IsolationPlayer):
         best_score : int
             Score assigned to the best move found in the current search
         """
+        if self.stats is not None:
+            self.stats.nodes += 1
+
         if self.terminal_test(game):
             return game.utility(self)
 
         if depth == 0:
+            if self.stats is not None:
+                self.stats.leaves += 1
             return self.score(game, self)
 
         best_score = float("-inf")
@@ -540,8 +763,7 @@ class MinimaxPlayer(IsolationPlayer):
 
         for m in legal_moves:
             self.check_time()
-            new_game = game.forecast_move(m)
-            current_score = self.min_value(new_game, depth-1)
+            current_score = self.search_child(game, m, self.min_value, depth-1)
             if current_score > best_score:
                 best_score = current_score
 
@@ -569,6 +791,8 @@ class MinimaxPlayer(IsolationPlayer):
             (-1, -1) if there are no legal moves
         """
         self.check_time()
+        if self.stats is not None:
+            self.stats.nodes += 1
 
         legal_moves = game.get_legal_moves()
 
@@ -580,8 +804,7 @@ class MinimaxPlayer(IsolationPlayer):
 
         for m in legal_moves:
             self.check_time()
-            new_game = game.forecast_move(m)
-            current_score = self.min_value(new_game, depth-1)
+            current_score = self.search_child(game, m, self.min_value, depth-1)
             if current_score > best_score:
                 best_score = current_score
                 self.best_move = m
@@ -592,7 +815,137 @@ class AlphaBetaPlayer(IsolationPlayer):
     """
     Game-playing agent that chooses a move using iterative deepening minimax
     search with alpha-beta pruning.
+
+    Parameters
+    ----------
+    tt_size : int (optional)
+        Number of slots in the transposition table used to reuse search
+        results across iterative deepening iterations and turns. A value of 0
+        disables the table.
+
+    move_orderer : object (optional)
+        A `move_ordering.MoveOrderer` (or an object with the same interface)
+        used to order the moves at every node. If None, moves are searched in
+        sorted order after the hash move.
+
+    endgame_nodes : int (optional)
+        Node budget of the exact endgame solver, which replaces the search
+        once the players are in separate regions of the board. A value of 0
+        disables the solver.
+
+    opening_book : `opening_book.OpeningBook` (optional)
+        Book of precomputed moves played without searching in the positions
+        it covers.
+
+    symmetry_plies : int (optional)
+        Positions with fewer than this many moves played are stored in the
+        transposition table under the hash of their canonical orientation
+        (see `isolation.symmetry`), so that rotations and reflections of a
+        position share one entry. A value of 0 keys every position on
+        `Board.hash()`. The entries hold heuristic values and bounds, so a
+        positive value requires a score function declared with
+        `evaluation.symmetric`.
+
+    processes : int (optional)
+        Number of worker processes of the parallel search. The root moves are
+        split between the workers, which each run iterative deepening on
+        their share with a transposition table kept in the worker between
+        turns. With 1 process, or when fewer than 2 CPUs are available or the
+        agent itself runs in a daemonic worker (e.g., a tournament pool), the
+        agent searches serially.
+
+    pvs : bool (optional)
+        If True, use principal variation search: after the first move of a
+        node, the remaining moves are only tested with a null window and
+        re-searched with the full window if they might be better. The
+        principal variation of the previous iteration is searched first.
+
+    aspiration_window : float (optional)
+        Half-width of the window around the value of the previous iteration
+        used to start each iteration; the iteration is repeated with the full
+        window if its value falls outside. A value of 0 always uses the full
+        window.
+
+    time_manager : `time_manager.TimeManager` (optional)
+        Reads the clock every few nodes instead of at every node, and stops
+        iterative deepening when the next iteration is not expected to finish
+        in time. If None, the clock is read at every node and a new iteration
+        starts whenever time is left.
+
+    ponder : bool (optional)
+        If True, keep searching in a background process during the
+        opponent's turn: the agent predicts the opponent's reply to its move
+        and searches the resulting position, and the next `get_move()` merges
+        the entries of that search into the transposition table and starts
+        from its best move if the prediction was right. Pondering requires at
+        least 2 CPUs and is skipped inside daemonic worker processes.
+
+    See `IsolationPlayer` for the remaining parameters.
+
+    Raises
+    ------
+    ValueError
+        If symmetry_plies is positive and score_fn is not declared symmetric.
     """
+    ENDGAME_MEMO_SIZE = 2**20
+
+    # Seconds to wait for the pondering process to report when a turn starts,
+    # and minimum depth and maximum number of the pondering entries merged
+    # into the table
+    PONDER_WAIT = 0.01
+    PONDER_MIN_DEPTH = 2
+    PONDER_MERGE_MAX = 2**12
+
+    # Milliseconds kept at the end of the search to start pondering, until
+    # the cost of starting the pondering process has been measured
+    PONDER_RESERVE = 5.
+
+    def __init__(self, search_depth=4, score_fn=custom_score, timeout=20.,
+                 make_unmake=False, tt_size=0, move_orderer=None,
+                 endgame_nodes=0, opening_book=None, symmetry_plies=0,
+                 processes=1, pvs=False, aspiration_window=0,
+                 time_manager=None, ponder=False, stats=None, score_cache=0):
+        super().__init__(search_depth, score_fn, timeout, make_unmake, stats,
+                         score_cache)
+        if symmetry_plies > 0 and not is_symmetric(self.score):
+            raise ValueError("symmetry_plies requires a score function "
+                             "declared with evaluation.symmetric")
+        self.tt_size = tt_size
+        self.tt = TranspositionTable(tt_size) if tt_size else None
+        self.tt_salt = 0
+        self.move_orderer = move_orderer
+        self.root_depth = 0
+        self.endgame_nodes = endgame_nodes
+        self.endgame_memo = {}
+        self.endgame_size = None
+        self.opening_book = opening_book
+        self.symmetry_plies = symmetry_plies
+        self.board_size = None
+        self.root_value = None
+        self.processes = processes
+        self.pool = None
+        self.pvs = pvs
+        self.aspiration_window = aspiration_window
+        self.pv = []
+        self.pv_table = []
+        self.on_pv = False
+        self.time_manager = time_manager
+        self.ponder = ponder
+        self.ponder_process = None
+        self.ponder_stop = None
+        self.ponder_conn = None
+        self.ponder_reserve = self.PONDER_RESERVE
+        # depth of the deepest iteration completed by the last get_move()
+        self.completed_depth = 0
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["pool"] = None
+        state["ponder_process"] = None
+        state["ponder_stop"] = None
+        state["ponder_conn"] = None
+        return state
+
     def get_move(self, game, time_left):
         """
         Search for the best move from the available legal moves and return a
@@ -620,34 +973,357 @@ class AlphaBetaPlayer(IsolationPlayer):
             (-1, -1) if there are no available legal moves.
         """
         self.time_left = time_left
+        self.completed_depth = 0
+        if self.stats is None:
+            return self.select_move(game)
+
+        self.stats.start_move(time_left)
+        best_move = self.select_move(game)
+        self.stats.end_move(self.completed_depth)
+        return best_move
 
+    def select_move(self, game):
+        """
+        Return the book move, the endgame solution or the result of the
+        (parallel) search for the position, or (-1, -1) if there are no legal
+        moves.
+        """
         # initialize the best move to return something in case the search fails or times out
         best_move = (-1, -1)
         legal_moves = game.get_legal_moves()
 
+        # the background search must not outlive the opponent's turn, whatever
+        # way this move is chosen (or if there is none)
+        ponder_result = None
+        if self.ponder_process is not None:
+            ponder_result = self.stop_pondering()
+
         if not legal_moves:
             return best_move
 
+        if self.opening_book is not None:
+            book_move = self.opening_book.lookup(game)
+            if book_move in legal_moves:
+                return book_move
+
+        if self.endgame_nodes:
+            endgame_move = self.solve_endgame(game)
+            if endgame_move is not None:
+                return endgame_move
+
+        pool = self.search_pool()
+        if pool is not None and len(legal_moves) > 1:
+            return self.parallel_search(game, legal_moves, pool)
+
+        if self.tt is not None:
+            self.tt.new_search()
+        if self.move_orderer is not None:
+            self.move_orderer.new_search()
+
+        if ponder_result is not None:
+            ponder_move = self.merge_pondering(ponder_result, game)
+            if ponder_move in legal_moves:
+                best_move = ponder_move
+
+        if not self.ponder:
+            return self.iterative_deepening(game, best_move)
+
+        # keep the time needed to start pondering after the search
+        time_left, reserve = self.time_left, self.ponder_reserve
+        self.time_left = lambda: time_left() - reserve
+        try:
+            best_move = self.iterative_deepening(game, best_move)
+        finally:
+            self.time_left = time_left
+        start = timeit.default_timer()
+        self.start_pondering(game, best_move)
+        self.ponder_reserve = max(self.PONDER_RESERVE,
+                                  1000 * (timeit.default_timer() - start))
+        return best_move
+
+    def iterative_deepening(self, game, best_move):
+        """
+        Search the game with increasing depth limits until the time runs out
+        or the depth exceeds the number of blank cells, and return the best
+        move of the deepest completed iteration, or `best_move` if no
+        iteration was completed.
+        """
+        self.pv = []
+        self.root_value = None
+        if self.time_manager is not None:
+            self.time_manager.start(self.time_left, self.TIMER_THRESHOLD)
+        # deeper iterations cannot find anything once every cell is filled
+        max_depth = len(game.get_blank_spaces())
         try:
             current_depth = 1
-            while True:
-                current_move = self.alphabeta(game, current_depth)
+            while current_depth <= max_depth:
+                current_move = self.aspiration_search(game, current_depth)
 
                 if current_move != (-1, -1):
                     best_move = current_move
 
+                self.completed_depth = current_depth
                 current_depth += 1
-                if self.time_left() < self.TIMER_THRESHOLD:
+                if self.time_manager is not None:
+                    self.time_manager.iteration_done()
+                    if not self.time_manager.next_iteration():
+                        return best_move
+                elif self.time_left() < self.TIMER_THRESHOLD:
                     return best_move
         except SearchTimeout:
             # return best move found so far when time runs out
-            return best_move
+            pass
+        return best_move
+
+    def predicted_reply(self, game, move):
+        """
+        Return the opponent's expected reply to `move`: the second move of
+        the principal variation, or the hash move of the position after
+        `move`, or None if neither is known. The table is probed with depth
+        0 only to read the hash move; the stored value is not used.
+        """
+        if len(self.pv) > 1 and self.pv[0] == move:
+            return self.pv[1]
+        if self.tt is None:
+            return None
+        key, symmetry = self.tt_key(game.forecast_move(move))
+        _, reply = self.tt_lookup(key, 0, float("-inf"), float("inf"), symmetry)
+        return reply
+
+    def start_pondering(self, game, move):
+        """
+        Start searching the position after `move` and the opponent's expected
+        reply in a background process while the opponent thinks.
+
+        This runs at the end of the agent's turn; `select_move()` keeps
+        `ponder_reserve` milliseconds for it, the measured cost of the last
+        start (which includes pickling the agent under the spawn start
+        method).
+        """
+        if multiprocessing.current_process().daemon or available_cpus() < 2:
+            return
+        reply = self.predicted_reply(game, move)
+        if reply is None:
+            return
+        position = game.forecast_move(move)
+        if reply not in position.get_legal_moves():
+            return
+        position.apply_move(reply)
+
+        agent, worker_game = self.worker_copy(position)
+        self.ponder_stop = multiprocessing.Event()
+        self.ponder_conn, child_conn = multiprocessing.Pipe(duplex=False)
+        self.ponder_process = multiprocessing.Process(
+            target=ponder_search,
+            args=(child_conn, agent, worker_game, self.ponder_stop))
+        self.ponder_process.daemon = True
+        self.ponder_process.start()
+        child_conn.close()
+
+    def stop_pondering(self):
+        """
+        Stop the background search.
+
+        The process is waited for at most `PONDER_WAIT` seconds and is
+        terminated if it has not reported by then; the time spent is taken
+        from the turn that stops it.
+
+        Returns
+        -------
+        (int, (int, int) or None, list) or None
+            The hash of the position searched, its best move and the
+            transposition table entries of the search (see `ponder_search()`),
+            or None if the process did not report in time.
+        """
+        process, self.ponder_process = self.ponder_process, None
+        self.ponder_stop.set()
+        result = None
+        try:
+            if self.ponder_conn.poll(self.PONDER_WAIT):
+                result = self.ponder_conn.recv()
+        except (EOFError, OSError):
+            pass
+        self.ponder_conn.close()
+        if result is not None:
+            # the process exits right after sending its result
+            process.join(self.PONDER_WAIT)
+        if process.is_alive():
+            process.terminate()
+        return result
+
+    def merge_pondering(self, result, game):
+        """
+        Merge the transposition table entries of a background search into
+        the table of the agent.
+
+        Returns
+        -------
+        (int, int) or None
+            The best move found by the background search if it searched the
+            current position (a ponder hit), None otherwise.
+        """
+        key, move, entries = result
+        if self.tt is not None:
+            for entry in entries:
+                self.tt.store(*entry[:5])
+        if key == game.hash():
+            return move
+        return None
+
+    def close(self):
+        """ Shut down the worker and pondering processes of the agent. """
+        if self.ponder_process is not None:
+            self.stop_pondering()
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def aspiration_search(self, game, depth):
+        """
+        Search the root with a window around the value of the previous
+        iteration, and repeat the search with the full window if the value
+        falls outside of it.
+        """
+        window = self.aspiration_window
+        previous = self.root_value
+        if window and previous is not None and abs(previous) != float("inf"):
+            alpha, beta = previous - window, previous + window
+            move = self.alphabeta(game, depth, alpha, beta)
+            if alpha < self.root_value < beta:
+                return move
+        return self.alphabeta(game, depth)
+
+    def search_pool(self):
+        """
+        Return the process pool of the parallel search, creating it on first
+        use, or None if the agent should search serially.
+        """
+        if self.pool is None and self.processes > 1:
+            processes = min(self.processes, available_cpus())
+            if processes <= 1 or multiprocessing.current_process().daemon:
+                self.processes = 1
+                return None
+            self.processes = processes
+            self.pool = multiprocessing.Pool(processes)
+        return self.pool
+
+    def worker_copy(self, game):
+        """
+        Return a copy of the agent without its process pools and a copy of
+        the game in which the opponent is replaced by a placeholder, to be
+        sent to another process. The opening book, the endgame memo and the
+        cached heuristic values are not needed to search and are left out.
+        """
+        agent = copy.copy(self)
+        agent.pool = None
+        agent.ponder_process = None
+        agent.opening_book = None
+        agent.endgame_memo = {}
+        if isinstance(self.score, ScoreCache):
+            agent.score = ScoreCache(self.score.score_fn, self.score.size,
+                                     self.score.symmetry_plies)
+        worker_game = game.copy()
+        opponent = "opponent"
+        for attr in ("_player_1", "_player_2", "_active_player",
+                     "_inactive_player"):
+            setattr(worker_game, attr,
+                    agent if getattr(game, attr) is self else opponent)
+        return agent, worker_game
+
+    def parallel_search(self, game, legal_moves, pool):
+        """
+        Split the root moves between the worker processes and return the best
+        move of the deepest iteration completed by every worker.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        legal_moves : list<(int, int)>
+            The legal moves of the agent.
+
+        pool : `multiprocessing.Pool`
+            The worker processes.
+
+        Returns
+        -------
+        (int, int)
+            The best move found before the time limit.
+        """
+        agent, worker_game = self.worker_copy(game)
+        # the workers keep their own table and history between turns
+        agent.tt = None
+        if isinstance(self.move_orderer, MoveOrderer):
+            agent.move_orderer = MoveOrderer(self.move_orderer.num_killers)
+
+        deadline = timeit.default_timer() + self.time_left() / 1000.
+        shares = self.processes
+        legal_moves = sorted(legal_moves)
+        results = [pool.apply_async(search_root_moves, (
+            ((os.getpid(), id(self)), agent, worker_game, legal_moves[i::shares],
+             deadline),)) for i in range(min(shares, len(legal_moves)))]
+
+        # keep half of the threshold to receive the results
+        completed = []
+        for result in results:
+            wait = (self.time_left() - self.TIMER_THRESHOLD / 2) / 1000.
+            try:
+                completed.append(result.get(max(wait, 0)))
+            except multiprocessing.TimeoutError:
+                pass
+        completed = [iterations for iterations in completed if iterations]
+        if not completed:
+            return legal_moves[0]
+
+        # values of different depths are not comparable, so only compare the
+        # moves of the deepest iteration every worker completed
+        depth = min(len(iterations) for iterations in completed)
+        self.completed_depth = depth
+        best_move, best_value = max(
+            (iterations[depth - 1] for iterations in completed),
+            key=lambda result: result[1])
+        return best_move
+
+    def solve_endgame(self, game):
+        """
+        Return the move chosen by the exact endgame solver, or None if the
+        players are not separated or the solver ran out of nodes.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        Returns
+        -------
+        (int, int) or None
+            The move that maximizes the number of moves left to the agent
+        """
+        # the memo is only valid for one board size
+        if len(self.endgame_memo) > self.ENDGAME_MEMO_SIZE or \
+                self.endgame_size != (game.width, game.height):
+            self.endgame_memo.clear()
+            self.endgame_size = (game.width, game.height)
+        try:
+            solution = solve_endgame(game, self.endgame_memo, self.endgame_nodes)
+        except EndgameLimit:
+            return None
+        if solution is None:
+            return None
+        return solution[0]
 
     def check_time(self):
         """
-        Check if time left is less than TIMER_THRESHOLD
+        Check if time left is less than TIMER_THRESHOLD, reading the clock
+        through the time manager if the agent has one
         """
-        if self.time_left() < self.TIMER_THRESHOLD:
+        if self.time_manager is not None:
+            if self.time_manager.expired():
+                raise SearchTimeout()
+        elif self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
 
     def terminal_test(self, game):
@@ -668,6 +1344,132 @@ class AlphaBetaPlayer(IsolationPlayer):
         """
         return not bool(game.get_legal_moves())
 
+    def tt_key(self, game):
+        """
+        Return the transposition table key of a position and the symmetry
+        that maps it onto its canonical orientation (None if the position is
+        keyed on `Board.hash()`).
+        """
+        if game.move_count < self.symmetry_plies:
+            key, symmetry = canonical_hash(game)
+            return key ^ self.tt_salt, symmetry
+        return game.hash() ^ self.tt_salt, None
+
+    def tt_lookup(self, key, depth, alpha, beta, symmetry=None):
+        """
+        Look up a position in the transposition table.
+
+        Parameters
+        ----------
+        key : int
+            Key of the position returned by `tt_key()`
+
+        depth : int
+            Remaining search depth at the position
+
+        alpha : float
+            Alpha limits the lower bound of search on minimizing layers
+
+        beta : float
+            Beta limits the upper bound of search on maximizing layers
+
+        symmetry : int or None
+            Symmetry returned by `tt_key()` with the key
+
+        Returns
+        -------
+        (float or None, (int, int) or None)
+            The stored value if it is deep enough to decide the position for
+            the (alpha, beta) window, and the best move stored for it
+        """
+        entry = self.tt.probe(key)
+        if entry is None:
+            return None, None
+        _, entry_depth, flag, value, move, _ = entry
+        if move is not None and symmetry is not None:
+            move = from_canonical(move, symmetry, *self.board_size)
+        if entry_depth >= depth and (flag == EXACT or
+                                     (flag == LOWER and value >= beta) or
+                                     (flag == UPPER and value <= alpha)):
+            return value, move
+        return None, move
+
+    def tt_record(self, key, depth, value, alpha, beta, move, symmetry=None):
+        """
+        Store the value of a position searched with the (alpha, beta) window
+        in the transposition table.
+        """
+        if value <= alpha:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if move is not None and symmetry is not None:
+            move = to_canonical(move, symmetry, *self.board_size)
+        self.tt.store(key, depth, flag, value, move)
+
+    def order_moves(self, legal_moves, hash_move, depth, maximizing):
+        """
+        Order the legal moves with the move orderer, or sort them and search
+        the best move stored in the transposition table (if any) first.
+        """
+        if self.move_orderer is not None:
+            return self.move_orderer.order(legal_moves, self.root_depth - depth,
+                                           hash_move, maximizing)
+        legal_moves.sort()
+        if hash_move is not None and hash_move in legal_moves:
+            legal_moves.remove(hash_move)
+            legal_moves.insert(0, hash_move)
+        return legal_moves
+
+    def search_max_child(self, game, move, depth, alpha, beta, first=True,
+                         on_pv=False):
+        """
+        Search the child of a maximizing node reached by `move`. With PVS,
+        every move but the first is tested with a null window above alpha
+        and only re-searched with the full window if it may raise alpha.
+        """
+        if self.pvs:
+            if not first and float("-inf") < alpha and alpha + PVS_EPSILON < beta:
+                self.on_pv = on_pv
+                score = self.search_child(game, move, self.alphabeta_min_value,
+                                          depth-1, alpha, alpha + PVS_EPSILON)
+                if score <= alpha:
+                    return score
+            self.on_pv = on_pv
+        return self.search_child(game, move, self.alphabeta_min_value,
+                                 depth-1, alpha, beta)
+
+    def search_min_child(self, game, move, depth, alpha, beta, first=True,
+                         on_pv=False):
+        """
+        Search the child of a minimizing node reached by `move`. With PVS,
+        every move but the first is tested with a null window below beta and
+        only re-searched with the full window if it may lower beta.
+        """
+        if self.pvs:
+            if not first and beta < float("inf") and alpha < beta - PVS_EPSILON:
+                self.on_pv = on_pv
+                score = self.search_child(game, move, self.alphabeta_max_value,
+                                          depth-1, beta - PVS_EPSILON, beta)
+                if score >= beta:
+                    return score
+            self.on_pv = on_pv
+        return self.search_child(game, move, self.alphabeta_max_value,
+                                 depth-1, alpha, beta)
+
+    def enter_pv_node(self, ply):
+        """
+        Clear the principal variation of a node and return whether the node
+        is on the principal variation of the previous iteration, and if so
+        the move that continues it.
+        """
+        self.pv_table[ply] = []
+        if self.on_pv and ply < len(self.pv):
+            return True, self.pv[ply]
+        return False, None
+
     def alphabeta_max_value(self, game, depth, alpha=float("-inf"), beta=float("inf")):
         """
         Alphabeta maximizer player. Returns the highest score/move tuple found
@@ -694,23 +1496,53 @@ class AlphaBetaPlayer(IsolationPlayer):
         alpha : float
             Alpha limits the lower bound of search on minimizing layers
         """
+        ply = self.root_depth - depth
+        if self.pvs:
+            on_pv, pv_move = self.enter_pv_node(ply)
+        if self.stats is not None:
+            self.stats.nodes += 1
+
         if depth == 0:
+            if self.stats is not None:
+                self.stats.leaves += 1
             return self.score(game, self)
 
         if self.terminal_test(game):
             return game.utility(self)
 
-        legal_moves = game.get_legal_moves()
-        legal_moves.sort()
+        hash_move = None
+        if self.tt is not None:
+            key, symmetry = self.tt_key(game)
+            value, hash_move = self.tt_lookup(key, depth, alpha, beta, symmetry)
+            if value is not None:
+                return value
+            alpha_orig, best_move = alpha, hash_move
 
-        for m in legal_moves:
+        if self.pvs and hash_move is None:
+            hash_move = pv_move
+        legal_moves = self.order_moves(game.get_legal_moves(), hash_move,
+                                       depth, True)
+
+        for i, m in enumerate(legal_moves):
             self.check_time()
-            new_game = game.forecast_move(m)
-            current_score = self.alphabeta_min_value(new_game, depth-1, alpha, beta)
+            current_score = self.search_max_child(
+                game, m, depth, alpha, beta, i == 0,
+                self.pvs and on_pv and m == pv_move)
             if current_score > alpha:
                 alpha = current_score
+                best_move = m
+                if self.pvs and alpha < beta:
+                    self.pv_table[ply] = [m] + self.pv_table[ply + 1]
                 if alpha >= beta:
+                    if self.move_orderer is not None:
+                        self.move_orderer.record_cutoff(m, ply, depth, True)
+                    if self.stats is not None:
+                        self.stats.cutoffs += 1
                     break
+
+        if self.tt is not None:
+            self.tt_record(key, depth, alpha, alpha_orig, beta, best_move,
+                           symmetry)
         return alpha
 
     def alphabeta_min_value(self, game, depth, alpha=float("-inf"), beta=float("inf")):
@@ -739,27 +1571,57 @@ class AlphaBetaPlayer(IsolationPlayer):
         beta : float
             Beta limits the upper bound of search on maximizing layers
         """
+        ply = self.root_depth - depth
+        if self.pvs:
+            on_pv, pv_move = self.enter_pv_node(ply)
+        if self.stats is not None:
+            self.stats.nodes += 1
+
         if depth == 0:
+            if self.stats is not None:
+                self.stats.leaves += 1
             return self.score(game, self)
 
         if self.terminal_test(game):
             return game.utility(self)
 
-        legal_moves = game.get_legal_moves()
-        legal_moves.sort()
+        hash_move = None
+        if self.tt is not None:
+            key, symmetry = self.tt_key(game)
+            value, hash_move = self.tt_lookup(key, depth, alpha, beta, symmetry)
+            if value is not None:
+                return value
+            beta_orig, best_move = beta, hash_move
 
-        for m in legal_moves:
+        if self.pvs and hash_move is None:
+            hash_move = pv_move
+        legal_moves = self.order_moves(game.get_legal_moves(), hash_move,
+                                       depth, False)
+
+        for i, m in enumerate(legal_moves):
             self.check_time()
-            new_game = game.forecast_move(m)
-            current_score = self.alphabeta_max_value(new_game, depth-1, alpha, beta)
+            current_score = self.search_min_child(
+                game, m, depth, alpha, beta, i == 0,
+                self.pvs and on_pv and m == pv_move)
             if current_score < beta:
                 beta = current_score
+                best_move = m
+                if self.pvs and alpha < beta:
+                    self.pv_table[ply] = [m] + self.pv_table[ply + 1]
                 if beta <= alpha:
+                    if self.move_orderer is not None:
+                        self.move_orderer.record_cutoff(m, ply, depth, False)
+                    if self.stats is not None:
+                        self.stats.cutoffs += 1
                     break
 
+        if self.tt is not None:
+            self.tt_record(key, depth, beta, alpha, beta_orig, best_move,
+                           symmetry)
         return beta
 
-    def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf")):
+    def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf"),
+                  root_moves=None):
         """
         Depth-limited minimax search with alpha-beta pruning based on
         ALPHA-BETA-SEARCH from AIMA
@@ -781,27 +1643,272 @@ class AlphaBetaPlayer(IsolationPlayer):
         beta : float
             Beta limits the upper bound of search on maximizing layers
 
+        root_moves : list<(int, int)> (optional)
+            Only search these root moves instead of every legal move (used by
+            the parallel search to split the root between processes)
+
         Returns
         -------
         best_move : (int, int)
             The board coordinates of the best move found in the current search;
-            (-1, -1) if there are no legal moves
+            (-1, -1) if there are no legal moves. Its value is stored in
+            `self.root_value`.
         """
         self.check_time()
-
-        legal_moves = game.get_legal_moves()
-        legal_moves.sort()
+        if self.stats is not None:
+            self.stats.nodes += 1
+        self.root_depth = depth
+        alpha_orig = alpha
+        if self.pvs:
+            self.pv_table = [[] for _ in range(depth + 1)]
+            self.on_pv = True
+            on_pv, pv_move = self.enter_pv_node(0)
+
+        hash_move = None
+        if self.tt is not None:
+            # values are stored from the point of view of this agent, so keep
+            # the entries written while playing as player 1 and 2 apart
+            self.tt_salt = PERSPECTIVE_KEY if game.move_count % 2 else 0
+            self.board_size = (game.width, game.height)
+            key, symmetry = self.tt_key(game)
+            _, hash_move = self.tt_lookup(key, depth, alpha, beta, symmetry)
+
+        if root_moves is None:
+            legal_moves = game.get_legal_moves()
+        else:
+            legal_moves = list(root_moves)
+        if self.pvs and hash_move is None:
+            hash_move = pv_move
+        legal_moves = self.order_moves(legal_moves, hash_move, depth, True)
 
         if not legal_moves:
             return (-1, -1)
 
         best_move = legal_moves[0]
 
-        for m in legal_moves:
+        for i, m in enumerate(legal_moves):
             self.check_time()
-            new_game = game.forecast_move(m)
-            current_score = self.alphabeta_min_value(new_game, depth-1, alpha, beta)
+            current_score = self.search_max_child(
+                game, m, depth, alpha, beta, i == 0,
+                self.pvs and on_pv and m == pv_move)
             if current_score > alpha:
                 alpha = current_score
                 best_move = m
+                if self.pvs and alpha < beta:
+                    self.pv_table[0] = [m] + self.pv_table[1]
+
+        self.root_value = alpha
+        if self.pvs and alpha_orig < alpha < beta:
+            self.pv = self.pv_table[0]
+        # the best of a subset of the root moves is not the value of the root
+        if self.tt is not None and root_moves is None:
+            self.tt_record(key, depth, alpha, alpha_orig, beta, best_move,
+                           symmetry)
         return best_move
+
+
+class MCTSNode():
+    """
+    A node of the Monte Carlo search tree.
+
+    `wins` counts the playouts through the node won by the player who made
+    `move`, i.e. the player that is not to move at the node.
+    """
+    __slots__ = ("move", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, parent, untried):
+        self.move = move
+        self.parent = parent
+        self.children = {}
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0
+
+
+class MCTSPlayer(IsolationPlayer):
+    """
+    Game-playing agent that chooses a move using Monte Carlo Tree Search with
+    the UCT selection rule and uniformly random playouts.
+
+    The search keeps running playouts until the time limit is reached, so it
+    plays better the more playouts the hardware can run. Positions are
+    represented by a blocked-cell bitmask and two cell indices (see
+    `isolation.bitboard`), so selection and playouts never create boards.
+    The subtree of the position reached after the opponent's reply is kept
+    for the next turn.
+
+    Parameters
+    ----------
+    timeout : float (optional)
+        Time remaining (in milliseconds) when search is aborted.
+
+    exploration : float (optional)
+        The exploration constant of the UCT rule.
+
+    iterations : int (optional)
+        The maximum number of playouts per move; if None, playouts run until
+        the time limit is reached.
+
+    reuse_tree : bool (optional)
+        If True, keep the search tree between turns.
+
+    seed : int (optional)
+        Seed of the random number generator used for playouts.
+    """
+    def __init__(self, timeout=20., exploration=math.sqrt(2), iterations=None,
+                 reuse_tree=True, seed=None):
+        super().__init__(timeout=timeout)
+        self.exploration = exploration
+        self.iterations = iterations
+        self.reuse_tree = reuse_tree
+        self.rng = random.Random(seed)
+        self.playouts = 0
+        self._masks = None
+        self._full = 0
+        self._tree = None
+
+    def get_move(self, game, time_left):
+        """
+        Search for the best move from the available legal moves and return a
+        result before the time limit expires.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        -------
+        (int, int)
+            Board coordinates of the most visited move; (-1, -1) if there are
+            no available legal moves.
+        """
+        self.time_left = time_left
+        legal_moves = game.get_legal_moves()
+        if not legal_moves:
+            return (-1, -1)
+
+        coords, self._masks, _ = move_tables(game.width, game.height)
+        self._full = (1 << (game.width * game.height)) - 1
+        blank, active, inactive = board_masks(game)
+        state = (self._full & ~blank, active, inactive)
+
+        root = self.reuse_subtree(state)
+        if root is None:
+            root = MCTSNode(None, None, self.legal_indices(state[0], active))
+
+        self.playouts = 0
+        while (self.iterations is None or self.playouts < self.iterations) and \
+                self.time_left() > self.TIMER_THRESHOLD:
+            self.run_iteration(root, state)
+            self.playouts += 1
+
+        if not root.children:
+            return legal_moves[0]
+        best = max(root.children.values(), key=lambda node: node.visits)
+        if self.reuse_tree:
+            self._tree = (best, self.apply(state, best.move), self._full)
+        return coords[best.move]
+
+    def reuse_subtree(self, state):
+        """
+        Return the node of the previous tree for `state` (the position after
+        the agent's last move and the opponent's reply), or None.
+        """
+        if self._tree is None:
+            return None
+        node, (blocked, _, location), full = self._tree
+        self._tree = None
+        opp_move = state[2]
+        # states of boards of different sizes are not comparable
+        if opp_move is None or full != self._full or \
+                state != (blocked | 1 << opp_move, location, opp_move):
+            return None
+        child = node.children.get(opp_move)
+        if child is not None:
+            child.parent = None
+        return child
+
+    def legal_indices(self, blocked, location):
+        """ Return the cell indices a player at `location` can move to. """
+        moves = self._full & ~blocked
+        if location is not None:
+            moves &= self._masks[location]
+        indices = []
+        while moves:
+            low = moves & -moves
+            indices.append(low.bit_length() - 1)
+            moves ^= low
+        return indices
+
+    @staticmethod
+    def apply(state, move):
+        """ Return the state after the active player moves to cell `move`. """
+        blocked, _, inactive = state
+        return blocked | 1 << move, inactive, move
+
+    def run_iteration(self, root, state):
+        """
+        Select a leaf of the tree with UCT, expand it by one move, run a
+        random playout from the new node and propagate the result back to the
+        root.
+        """
+        node = root
+        while not node.untried and node.children:
+            node = self.select_child(node)
+            state = self.apply(state, node.move)
+
+        if node.untried:
+            untried = node.untried
+            move = untried.pop(self.rng.randrange(len(untried)))
+            state = self.apply(state, move)
+            child = MCTSNode(move, node, self.legal_indices(state[0], state[1]))
+            node.children[move] = child
+            node = child
+
+        won = self.playout(state)
+        while node is not None:
+            node.visits += 1
+            if won:
+                node.wins += 1
+            won = not won
+            node = node.parent
+
+    def select_child(self, node):
+        """ Return the child of a node with the highest UCT value. """
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        return max(node.children.values(),
+                   key=lambda child: child.wins / child.visits + exploration *
+                   math.sqrt(log_visits / child.visits))
+
+    def playout(self, state):
+        """
+        Play uniformly random moves from `state` until a player has no legal
+        moves, and return True if the player who moved last before `state`
+        (i.e., the player not to move) wins.
+        """
+        blocked, active, inactive = state
+        masks, full, choice = self._masks, self._full, self.rng.choice
+        last_player_wins = True
+        while True:
+            moves = full & ~blocked
+            if active is not None:
+                moves &= masks[active]
+            if not moves:
+                return last_player_wins
+            bits = []
+            while moves:
+                low = moves & -moves
+                bits.append(low)
+                moves ^= low
+            low = choice(bits)
+            blocked |= low
+            active, inactive = inactive, low.bit_length() - 1
+            last_player_wins = not last_player_wins
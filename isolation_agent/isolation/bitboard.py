@@ -0,0 +1,318 @@
+"""
+This file contains the `BitBoard` class, an alternative engine for the game
+Isolation that is API-compatible with `isolation.Board`.
+
+Instead of a list with one entry per cell, the blocked cells are stored in a
+single Python int used as a bitmask and the player locations are stored as
+cell indices. Knight moves for every cell are precomputed once per board size,
+so generating moves, copying the board and testing for the end of the game
+only take a handful of integer operations.
+
+Cells are indexed the same way as in `Board`: the cell at (row, column) has
+index `row + column * height`, and bit `i` of a mask refers to cell `i`.
+"""
+import random
+
+from .isolation import Board
+from .zobrist import zobrist_keys, move_key
+
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1)]
+
+_MOVE_TABLES = {}
+
+
+def move_tables(width, height):
+    """Return the precomputed move tables for a board of the given size.
+
+    The tables are built on first use and shared by every board with the same
+    dimensions.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    -------
+    (tuple, tuple, tuple)
+        `coords[i]` is the (row, column) pair of cell `i`, `masks[i]` is the
+        bitmask of the cells a knight can reach from cell `i`, and `moves[i]`
+        is a tuple of (bit, (row, column)) pairs for the same cells.
+    """
+    key = (width, height)
+    if key not in _MOVE_TABLES:
+        coords = tuple((idx % height, idx // height)
+                       for idx in range(width * height))
+        masks = []
+        moves = []
+        for r, c in coords:
+            targets = [(r + dr, c + dc) for dr, dc in DIRECTIONS
+                       if 0 <= r + dr < height and 0 <= c + dc < width]
+            cell_moves = tuple((1 << (tr + tc * height), (tr, tc))
+                               for tr, tc in targets)
+            masks.append(sum(bit for bit, _ in cell_moves))
+            moves.append(cell_moves)
+        _MOVE_TABLES[key] = (coords, tuple(masks), tuple(moves))
+    return _MOVE_TABLES[key]
+
+
+class BitBoard(Board):
+    """Implement a model for the game Isolation using integer bitmasks.
+
+    `BitBoard` can be used anywhere an `isolation.Board` is expected; the
+    players receive copies of the same class from `play()`, so agents search
+    on the faster representation without any changes.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+
+    shuffle_moves : bool (optional)
+        If True, get_legal_moves() returns the moves in random order;
+        otherwise the order is fixed for a given position.
+    """
+
+    def __init__(self, player_1, player_2, width=7, height=7, shuffle_moves=True):
+        self.width = width
+        self.height = height
+        self.shuffle_moves = shuffle_moves
+        self.move_count = 0
+        self._player_1 = player_1
+        self._player_2 = player_2
+        self._active_player = player_1
+        self._inactive_player = player_2
+
+        # Blocked cells, cell index of each player (or NOT_MOVED) and the
+        # initiative (0 for player 1, 1 for player 2)
+        self._blocked = 0
+        self._p1_loc = Board.NOT_MOVED
+        self._p2_loc = Board.NOT_MOVED
+        self._turn = 0
+        self._undo_stack = []
+        self._coords, self._masks, self._moves = move_tables(width, height)
+        self._zobrist = zobrist_keys(width, height)
+        self._hash = 0
+
+    def hash(self):
+        return self._hash
+
+    def copy(self):
+        """ Return a deep copy of the current board. """
+        # Every attribute other than the undo stack is immutable (or a shared
+        # lookup table), so copying the instance dictionary is enough for an
+        # independent board
+        new_board = object.__new__(self.__class__)
+        new_board.__dict__.update(self.__dict__)
+        new_board._undo_stack = []
+        return new_board
+
+    def move_is_legal(self, move):
+        """Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        -------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        return (0 <= move[0] < self.height and 0 <= move[1] < self.width and
+                not self._blocked >> (move[0] + move[1] * self.height) & 1)
+
+    def get_blank_spaces(self):
+        """Return a list of the locations that are still available on the board.
+        """
+        blocked = self._blocked
+        return [coord for idx, coord in enumerate(self._coords)
+                if not blocked >> idx & 1]
+
+    def get_player_location(self, player):
+        """Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        (int, int) or None
+            The coordinate pair (row, column) of the input player, or None
+            if the player has not moved.
+        """
+        idx = self._location_index(player)
+        if idx == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return self._coords[idx]
+
+    def get_legal_moves(self, player=None):
+        """Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        -------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self._active_player
+        idx = self._location_index(player)
+        if idx == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+
+        blocked = self._blocked
+        valid_moves = [move for bit, move in self._moves[idx]
+                       if not blocked & bit]
+        if self.shuffle_moves:
+            random.shuffle(valid_moves)
+        return valid_moves
+
+    def apply_move(self, move):
+        """Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        idx = move[0] + move[1] * self.height
+        if self._turn:
+            self._hash ^= move_key(self._zobrist, 1, idx, self._p2_loc)
+            self._p2_loc = idx
+        else:
+            self._hash ^= move_key(self._zobrist, 0, idx, self._p1_loc)
+            self._p1_loc = idx
+        self._blocked |= 1 << idx
+        self._turn ^= 1
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count += 1
+
+    def push_move(self, move):
+        """Apply a move in place and record how to undo it with pop_move().
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        self._undo_stack.append(self._p2_loc if self._turn else self._p1_loc)
+        self.apply_move(move)
+
+    def pop_move(self):
+        """Undo the most recent move applied with push_move(). """
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self._turn ^= 1
+        if self._turn:
+            idx, self._p2_loc = self._p2_loc, self._undo_stack.pop()
+            self._hash ^= move_key(self._zobrist, 1, idx, self._p2_loc)
+        else:
+            idx, self._p1_loc = self._p1_loc, self._undo_stack.pop()
+            self._hash ^= move_key(self._zobrist, 0, idx, self._p1_loc)
+        self._blocked ^= 1 << idx
+        self.move_count -= 1
+
+    def is_winner(self, player):
+        """ Test whether the specified player has won the game. """
+        return player == self._inactive_player and not self._active_has_moves()
+
+    def is_loser(self, player):
+        """ Test whether the specified player has lost the game. """
+        return player == self._active_player and not self._active_has_moves()
+
+    def utility(self, player):
+        """Returns the utility of the current game state from the perspective
+        of the specified player.
+
+        See `Board.utility()` for details.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the utility for the active player on the board.
+
+        Returns
+        ----------
+        float
+            The utility value of the current game state for the specified
+            player.
+        """
+        if not self._active_has_moves():
+
+            if player == self._inactive_player:
+                return float("inf")
+
+            if player == self._active_player:
+                return float("-inf")
+
+        return 0.
+
+    def to_string(self, symbols=['1', '2']):
+        """Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+        col_margin = len(str(self.height - 1)) + 1
+        prefix = "{:<" + "{}".format(col_margin) + "}"
+        offset = " " * (col_margin + 3)
+        out = offset + '   '.join(map(str, range(self.width))) + '\n\r'
+        for i in range(self.height):
+            out += prefix.format(i) + ' | '
+            for j in range(self.width):
+                idx = i + j * self.height
+                if not self._blocked >> idx & 1:
+                    out += ' '
+                elif self._p1_loc == idx:
+                    out += symbols[0]
+                elif self._p2_loc == idx:
+                    out += symbols[1]
+                else:
+                    out += '-'
+                out += ' | '
+            out += '\n\r'
+
+        return out
+
+    def _location_index(self, player):
+        """Return the cell index of the specified player, or NOT_MOVED. """
+        if player == self._player_1:
+            return self._p1_loc
+        elif player == self._player_2:
+            return self._p2_loc
+        raise RuntimeError(
+            "Invalid player in get_player_location: {}".format(player))
+
+    def _active_has_moves(self):
+        """Test whether the active player has at least one legal move. """
+        idx = self._p2_loc if self._turn else self._p1_loc
+        if idx == Board.NOT_MOVED:
+            return self._blocked != (1 << (self.width * self.height)) - 1
+        return bool(self._masks[idx] & ~self._blocked)
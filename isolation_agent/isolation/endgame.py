@@ -0,0 +1,212 @@
+"""
+This file contains a partition detector and an exact endgame solver for the
+game Isolation.
+
+Once no cell can be reached by both players the game is decided: each player
+simply makes as many moves as possible inside their own region, and the
+player to move wins if and only if their longest path is strictly longer than
+the opponent's. The solver computes those longest paths exactly with a depth
+first search over knight moves, memoized on (cell, region bitmask).
+
+All masks use the cell indexing of `Board`: bit `row + column * height` is
+set for the cell at (row, column).
+"""
+from .bitboard import BitBoard, move_tables
+
+
+class EndgameLimit(Exception):
+    """Raised when the solver exceeds its node budget. """
+    pass
+
+
+def popcount(mask):
+    """ Return the number of set bits in a mask. """
+    return bin(mask).count("1")
+
+
+def board_masks(game):
+    """Return the blank cells and player locations of a board as indices.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` (or `BitBoard`) encoding the current
+        state of the game.
+
+    Returns
+    -------
+    (int, int or None, int or None)
+        The bitmask of blank cells and the cell indices of the active and
+        inactive players (None if the player has not moved yet).
+    """
+    if isinstance(game, BitBoard):
+        blank = ~game._blocked & ((1 << (game.width * game.height)) - 1)
+    else:
+        blank = 0
+        for r, c in game.get_blank_spaces():
+            blank |= 1 << (r + c * game.height)
+
+    locations = []
+    for player in (game.active_player, game.inactive_player):
+        loc = game.get_player_location(player)
+        locations.append(None if loc is None else loc[0] + loc[1] * game.height)
+    return blank, locations[0], locations[1]
+
+
+def reachable(idx, blank, masks):
+    """Return the mask of blank cells a knight on cell `idx` can reach by
+    any sequence of moves through blank cells (excluding `idx` itself).
+    """
+    seen = frontier = masks[idx] & blank
+    while frontier:
+        step = 0
+        while frontier:
+            low = frontier & -frontier
+            step |= masks[low.bit_length() - 1]
+            frontier ^= low
+        frontier = step & blank & ~seen
+        seen |= frontier
+    return seen
+
+
+def partition(game):
+    """Return the regions of the players if they are separated.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` (or `BitBoard`) encoding the current
+        state of the game.
+
+    Returns
+    -------
+    (int, int) or None
+        The masks of the cells reachable by the active and inactive players if
+        no cell is reachable by both, or None if the players can still
+        interact (or have not both moved yet).
+    """
+    blank, active, inactive = board_masks(game)
+    if active is None or inactive is None:
+        return None
+    _, masks, _ = move_tables(game.width, game.height)
+    active_region = reachable(active, blank, masks)
+    inactive_region = reachable(inactive, blank, masks)
+    if active_region & inactive_region:
+        return None
+    return active_region, inactive_region
+
+
+def longest_path(idx, region, masks, memo, budget=None, target=None):
+    """Return the length of the longest knight path from cell `idx` that only
+    visits cells in `region`.
+
+    Parameters
+    ----------
+    idx : int
+        The cell index of the knight.
+
+    region : int
+        The mask of cells reachable from `idx`, as returned by `reachable()`.
+
+    masks : tuple
+        The knight-move masks of the board (see `bitboard.move_tables()`).
+
+    memo : dict
+        Memoized exact results keyed by (idx, region); may be shared between
+        calls for boards of the same size.
+
+    budget : list<int> (optional)
+        A single-item list holding the number of nodes the search may still
+        expand; EndgameLimit is raised when it runs out.
+
+    target : int (optional)
+        Stop as soon as a path of at least this length is found.
+
+    Returns
+    -------
+    int
+        The number of moves in the longest path. Values of at least `target`
+        are lower bounds; smaller values are exact.
+    """
+    key = (idx, region)
+    if key in memo:
+        return memo[key]
+    if budget is not None:
+        budget[0] -= 1
+        if budget[0] < 0:
+            raise EndgameLimit()
+
+    best = 0
+    bound = popcount(region)
+    moves = masks[idx] & region
+    while moves and best < bound:
+        if target is not None and best >= target:
+            break
+        low = moves & -moves
+        moves ^= low
+        nxt = low.bit_length() - 1
+        rest = reachable(nxt, region ^ low, masks)
+        if popcount(rest) + 1 <= best:
+            continue
+        sub_target = None if target is None else target - 1
+        best = max(best, 1 + longest_path(nxt, rest, masks, memo, budget,
+                                          sub_target))
+
+    # a path that reaches the target may have cut the search short, so only
+    # results below the target are known to be exact
+    if target is None or best < target or best == bound:
+        memo[key] = best
+    return best
+
+
+def solve_endgame(game, memo=None, max_nodes=None):
+    """Solve a position in which the players are separated.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` (or `BitBoard`) encoding the current
+        state of the game.
+
+    memo : dict (optional)
+        Memoized longest paths shared with previous calls (see
+        `longest_path()`).
+
+    max_nodes : int (optional)
+        The maximum number of nodes to expand before raising EndgameLimit.
+
+    Returns
+    -------
+    ((int, int) or None, bool) or None
+        A move for the active player and whether the active player wins with
+        perfect play, or None if the players are not separated. A winning
+        move keeps a path longer than the opponent's; otherwise the move
+        starts the longest path available. The move is None if the active
+        player has no legal moves.
+    """
+    regions = partition(game)
+    if regions is None:
+        return None
+    blank, active, inactive = board_masks(game)
+    coords, masks, _ = move_tables(game.width, game.height)
+    moves = masks[active] & blank
+    if not moves:
+        return None, False
+
+    if memo is None:
+        memo = {}
+    budget = None if max_nodes is None else [max_nodes]
+    opp_length = longest_path(inactive, regions[1], masks, memo, budget)
+
+    best_move, best_length = None, 0
+    while moves:
+        low = moves & -moves
+        moves ^= low
+        nxt = low.bit_length() - 1
+        rest = reachable(nxt, blank & ~low, masks)
+        length = 1 + longest_path(nxt, rest, masks, memo, budget, opp_length)
+        if length > best_length:
+            best_move, best_length = coords[nxt], length
+            if best_length > opp_length:
+                break
+    return best_move, best_length > opp_length
@@ -11,6 +11,8 @@ import random
 import timeit
 from copy import copy
 
+from .zobrist import zobrist_keys, move_key
+
 TIME_LIMIT_MILLIS = 150
 
 
@@ -33,13 +35,19 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    shuffle_moves : bool (optional)
+        If True, get_legal_moves() returns the moves in random order;
+        otherwise the order is fixed for a given position, which makes
+        searches and games reproducible.
     """
     BLANK = 0
     NOT_MOVED = None
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    def __init__(self, player_1, player_2, width=7, height=7, shuffle_moves=True):
         self.width = width
         self.height = height
+        self.shuffle_moves = shuffle_moves
         self.move_count = 0
         self._player_1 = player_1
         self._player_2 = player_2
@@ -52,8 +60,15 @@ class Board(object):
         self._board_state[-1] = Board.NOT_MOVED
         self._board_state[-2] = Board.NOT_MOVED
 
+        # Previous locations of the players moved by push_move()
+        self._undo_stack = []
+
+        # Zobrist hash of the state, updated incrementally by every move
+        self._zobrist = zobrist_keys(width, height)
+        self._hash = 0
+
     def hash(self):
-        return str(self._board_state).__hash__()
+        return self._hash
 
     @property
     def active_player(self):
@@ -92,11 +107,13 @@ class Board(object):
 
     def copy(self):
         """ Return a deep copy of the current board. """
-        new_board = Board(self._player_1, self._player_2, width=self.width, height=self.height)
+        new_board = Board(self._player_1, self._player_2, width=self.width,
+                          height=self.height, shuffle_moves=self.shuffle_moves)
         new_board.move_count = self.move_count
         new_board._active_player = self._active_player
         new_board._inactive_player = self._inactive_player
         new_board._board_state = copy(self._board_state)
+        new_board._hash = self._hash
         return new_board
 
     def forecast_move(self, move):
@@ -201,12 +218,43 @@ class Board(object):
         """
         idx = move[0] + move[1] * self.height
         last_move_idx = int(self.active_player == self._player_2) + 1
+        self._hash ^= move_key(self._zobrist, last_move_idx - 1, idx,
+                               self._board_state[-last_move_idx])
         self._board_state[-last_move_idx] = idx
         self._board_state[idx] = 1
         self._board_state[-3] ^= 1
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
         self.move_count += 1
 
+    def push_move(self, move):
+        """Apply a move in place and record how to undo it with pop_move().
+
+        Unlike forecast_move(), no new board is created, so a search can walk
+        the game tree on a single board by pairing every push_move() with a
+        pop_move().
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        last_move_idx = int(self.active_player == self._player_2) + 1
+        self._undo_stack.append(self._board_state[-last_move_idx])
+        self.apply_move(move)
+
+    def pop_move(self):
+        """Undo the most recent move applied with push_move(). """
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        last_move_idx = int(self.active_player == self._player_2) + 1
+        idx = self._board_state[-last_move_idx]
+        prev_idx = self._undo_stack.pop()
+        self._hash ^= move_key(self._zobrist, last_move_idx - 1, idx, prev_idx)
+        self._board_state[idx] = Board.BLANK
+        self._board_state[-last_move_idx] = prev_idx
+        self._board_state[-3] ^= 1
+        self.move_count -= 1
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
         return player == self._inactive_player and not self.get_legal_moves(self._active_player)
@@ -259,7 +307,8 @@ class Board(object):
                       (1, -2), (1, 2), (2, -1), (2, 1)]
         valid_moves = [(r + dr, c + dc) for dr, dc in directions
                        if self.move_is_legal((r + dr, c + dc))]
-        random.shuffle(valid_moves)
+        if self.shuffle_moves:
+            random.shuffle(valid_moves)
         return valid_moves
 
     def print_board(self):
@@ -295,7 +344,7 @@ class Board(object):
 
         return out
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, move_callback=None):
         """Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
 
@@ -305,6 +354,11 @@ class Board(object):
             The maximum number of milliseconds to allow before timeout
             during each turn.
 
+        move_callback : callable (optional)
+            Called as `move_callback(player, move, duration)` after every
+            legal move, where `duration` is the number of milliseconds the
+            player used to choose the move.
+
         Returns
         ----------
         (player, list<[(int, int),]>, str)
@@ -338,5 +392,7 @@ class Board(object):
                 return self._inactive_player, move_history, "illegal move"
 
             move_history.append(list(curr_move))
+            if move_callback is not None:
+                move_callback(self._active_player, curr_move, time_limit - move_end)
 
             self.apply_move(curr_move)
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+This file contains the canonicalization of Isolation positions under the
+symmetries of the board.
+
+Knight moves look the same after rotating or reflecting the board, so
+positions that are rotations or reflections of each other have the same game
+theoretic value and corresponding best moves. Heuristic values only share
+this property when the heuristic itself is invariant under the symmetries
+(see `evaluation.symmetric`); one that uses board coordinates scores the
+orientations of a position differently. Square boards have the 8 symmetries of the
+square; other boards keep the identity, the 180 degree rotation and the two
+reflections. Caches keyed on the canonical form of a position share one entry
+between all of its orientations, and moves are mapped to and from the
+canonical orientation with the symmetry returned alongside the key.
+
+Symmetries are permutations of cell indices using the indexing of `Board`:
+`perm[i]` is the cell that cell `i` is mapped to.
+"""
+from .bitboard import BitBoard
+from .isolation import Board
+from .zobrist import zobrist_keys
+
+_SYMMETRIES = {}
+_SYMMETRY_KEYS = {}
+
+
+def symmetries(width, height):
+    """Return the symmetries of a board of the given size.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    -------
+    (tuple, tuple)
+        The permutations of cell indices (the identity first) and their
+        inverses.
+    """
+    key = (width, height)
+    if key not in _SYMMETRIES:
+        n = width
+        maps = [lambda r, c: (r, c),
+                lambda r, c: (height - 1 - r, width - 1 - c),
+                lambda r, c: (height - 1 - r, c),
+                lambda r, c: (r, width - 1 - c)]
+        if width == height:
+            maps += [lambda r, c: (c, n - 1 - r),
+                     lambda r, c: (n - 1 - c, r),
+                     lambda r, c: (c, r),
+                     lambda r, c: (n - 1 - c, n - 1 - r)]
+        perms = []
+        for fn in maps:
+            perm = []
+            for idx in range(width * height):
+                r, c = fn(idx % height, idx // height)
+                perm.append(r + c * height)
+            perms.append(tuple(perm))
+        inverses = tuple(tuple(sorted(range(len(p)), key=p.__getitem__))
+                         for p in perms)
+        _SYMMETRIES[key] = (tuple(perms), inverses)
+    return _SYMMETRIES[key]
+
+
+def _symmetry_keys(width, height):
+    """Return the Zobrist keys of the board with the cells of each symmetry
+    permuted, so that XOR-ing the permuted keys of a position's features
+    gives the hash of the transformed position.
+    """
+    key = (width, height)
+    if key not in _SYMMETRY_KEYS:
+        blocked, (p1_keys, p2_keys), _ = zobrist_keys(width, height)
+        perms, _ = symmetries(width, height)
+        _SYMMETRY_KEYS[key] = tuple(
+            (tuple(blocked[i] for i in perm), tuple(p1_keys[i] for i in perm),
+             tuple(p2_keys[i] for i in perm))
+            for perm in perms)
+    return _SYMMETRY_KEYS[key]
+
+
+def position(game):
+    """Return the blocked cells and player locations of a board as indices.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` (or `BitBoard`) encoding the current
+        state of the game.
+
+    Returns
+    -------
+    (int, int or None, int or None)
+        The bitmask of blocked cells and the cell indices of player 1 and
+        player 2 (None if the player has not moved yet).
+    """
+    if isinstance(game, BitBoard):
+        return game._blocked, game._p1_loc, game._p2_loc
+    if type(game) is Board:
+        state = game._board_state
+        blocked = 0
+        for idx in range(game.width * game.height):
+            if state[idx]:
+                blocked |= 1 << idx
+        return blocked, state[-1], state[-2]
+
+    # player 1 has the initiative after an even number of moves
+    players = [game.active_player, game.inactive_player]
+    if game.move_count % 2:
+        players.reverse()
+    locations = []
+    for player in players:
+        loc = game.get_player_location(player)
+        locations.append(None if loc is None else loc[0] + loc[1] * game.height)
+    blocked = (1 << (game.width * game.height)) - 1
+    for r, c in game.get_blank_spaces():
+        blocked ^= 1 << (r + c * game.height)
+    return blocked, locations[0], locations[1]
+
+
+def canonical_position(game):
+    """Return an exact canonical key of a position.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` (or `BitBoard`) encoding the current
+        state of the game.
+
+    Returns
+    -------
+    ((int, int or None, int or None), int)
+        The (blocked mask, player 1 cell, player 2 cell) key of the canonical
+        orientation and the index of the symmetry that maps the position
+        onto it.
+    """
+    blocked, p1, p2 = position(game)
+    cells = []
+    while blocked:
+        low = blocked & -blocked
+        cells.append(low.bit_length() - 1)
+        blocked ^= low
+    perms, _ = symmetries(game.width, game.height)
+    keys = []
+    for t, perm in enumerate(perms):
+        mask = 0
+        for idx in cells:
+            mask |= 1 << perm[idx]
+        keys.append(((mask, None if p1 is None else perm[p1],
+                      None if p2 is None else perm[p2]), t))
+    # a player that has not moved has not moved in every orientation, so None
+    # is only ever compared with None
+    return min(keys)
+
+
+def canonical_hash(game):
+    """Return the Zobrist hash of the canonical orientation of a position.
+
+    The canonical orientation is the one with the smallest hash, so the value
+    is the same for every rotation and reflection of the position. The hashes
+    of the orientations are computed with the keys of `zobrist.zobrist_keys()`,
+    so the hash of the identity orientation is `game.hash()`.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` (or `BitBoard`) encoding the current
+        state of the game.
+
+    Returns
+    -------
+    (int, int)
+        The canonical hash and the index of the symmetry that maps the
+        position onto the canonical orientation.
+    """
+    blocked, p1, p2 = position(game)
+    cells = []
+    while blocked:
+        low = blocked & -blocked
+        cells.append(low.bit_length() - 1)
+        blocked ^= low
+    initiative = zobrist_keys(game.width, game.height)[2] if game.move_count % 2 else 0
+
+    best = None
+    for t, (blocked_keys, p1_keys, p2_keys) in enumerate(
+            _symmetry_keys(game.width, game.height)):
+        value = initiative
+        for idx in cells:
+            value ^= blocked_keys[idx]
+        if p1 is not None:
+            value ^= p1_keys[p1]
+        if p2 is not None:
+            value ^= p2_keys[p2]
+        if best is None or value < best[0]:
+            best = (value, t)
+    return best
+
+
+def to_canonical(move, symmetry, width, height):
+    """Map a move of a position onto the canonical orientation. """
+    idx = symmetries(width, height)[0][symmetry][move[0] + move[1] * height]
+    return (idx % height, idx // height)
+
+
+def from_canonical(move, symmetry, width, height):
+    """Map a move in the canonical orientation back onto the position. """
+    idx = symmetries(width, height)[1][symmetry][move[0] + move[1] * height]
+    return (idx % height, idx // height)
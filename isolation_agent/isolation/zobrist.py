@@ -0,0 +1,56 @@
+"""
+This file contains the Zobrist keys used by `Board` and `BitBoard` to maintain
+an incremental hash of the game state.
+
+Every cell has one random key for being blocked and one random key for holding
+each player, and a single key marks that player 2 has the initiative. The hash
+of a position is the XOR of the keys of its features, so `apply_move()` only
+has to XOR in the keys that change instead of hashing the whole board.
+"""
+import random
+
+ZOBRIST_SEED = 0x15014710
+
+_KEYS = {}
+
+
+def zobrist_keys(width, height):
+    """Return the Zobrist keys for a board of the given size.
+
+    The keys are generated from a fixed seed, so boards of the same size
+    produce the same hash for the same position in every process.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    -------
+    (tuple, (tuple, tuple), int)
+        The blocked-cell keys, the location keys of player 1 and player 2
+        (each indexed by cell index), and the initiative key.
+    """
+    key = (width, height)
+    if key not in _KEYS:
+        rng = random.Random(ZOBRIST_SEED ^ (width << 8) ^ height)
+        size = width * height
+        blocked = tuple(rng.getrandbits(64) for _ in range(size))
+        locations = (tuple(rng.getrandbits(64) for _ in range(size)),
+                     tuple(rng.getrandbits(64) for _ in range(size)))
+        _KEYS[key] = (blocked, locations, rng.getrandbits(64))
+    return _KEYS[key]
+
+
+def move_key(keys, slot, idx, prev_idx):
+    """Return the value to XOR into a hash when player `slot` moves from
+    `prev_idx` (None if the player has not moved) to cell `idx`.
+    """
+    blocked, locations, initiative = keys
+    value = blocked[idx] ^ locations[slot][idx] ^ initiative
+    if prev_idx is not None:
+        value ^= locations[slot][prev_idx]
+    return value
@@ -0,0 +1,97 @@
+"""
+This file contains the move ordering used by `AlphaBetaPlayer` to search the
+moves most likely to cause a cutoff first.
+
+Alpha-beta only prunes when a good move is searched early, so the orderer
+combines three sources of information about which moves are good:
+
+  * the hash move - the best move stored in the transposition table
+  * killer moves  - moves that recently caused a cutoff at the same ply
+  * history       - how often (and how deep) each move caused cutoffs
+"""
+
+
+class MoveOrderer():
+    """Order moves using the hash move, killer moves and the history heuristic.
+
+    An orderer can be passed to `AlphaBetaPlayer` through the `move_orderer`
+    parameter; any object that provides the same `new_search()`, `order()`
+    and `record_cutoff()` methods can be used instead.
+
+    Parameters
+    ----------
+    num_killers : int (optional)
+        The number of killer moves remembered for each ply.
+    """
+    def __init__(self, num_killers=2):
+        self.num_killers = num_killers
+        self.killers = []
+        self.history = {}
+
+    def new_search(self):
+        """Prepare for a new search from a new root position.
+
+        Killer moves are tied to plies of the previous search, so they are
+        discarded; history scores are halved so that recent cutoffs carry more
+        weight than old ones.
+        """
+        self.killers = []
+        self.history = {key: value // 2 for key, value in self.history.items()
+                        if value > 1}
+
+    def order(self, moves, ply, hash_move=None, maximizing=True):
+        """Sort a list of moves in place from most to least promising.
+
+        Parameters
+        ----------
+        moves : list<(int, int)>
+            The legal moves at the current node.
+
+        ply : int
+            The distance of the current node from the root of the search.
+
+        hash_move : (int, int) or None (optional)
+            The best move stored in the transposition table for the node.
+
+        maximizing : bool (optional)
+            True if the searching agent has the initiative at the node.
+
+        Returns
+        -------
+        list<(int, int)>
+            The sorted list of moves.
+        """
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history
+        moves.sort(key=lambda m: (m != hash_move, m not in killers,
+                                  -history.get((maximizing, m), 0), m))
+        return moves
+
+    def record_cutoff(self, move, ply, depth, maximizing=True):
+        """Update the killer moves and history after `move` caused a cutoff.
+
+        Parameters
+        ----------
+        move : (int, int)
+            The move that caused the cutoff.
+
+        ply : int
+            The distance of the node from the root of the search.
+
+        depth : int
+            The remaining search depth at the node; deeper cutoffs prune more
+            of the tree and receive a larger history bonus.
+
+        maximizing : bool (optional)
+            True if the searching agent has the initiative at the node.
+        """
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move in killers:
+            killers.remove(move)
+        killers.insert(0, move)
+        del killers[self.num_killers:]
+
+        key = (maximizing, move)
+        self.history[key] = self.history.get(key, 0) + depth * depth
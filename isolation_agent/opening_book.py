@@ -0,0 +1,227 @@
+"""Build and query an opening book for the isolation agents.
+
+Early in the game the players have up to 49 legal moves, so a timed search
+only reaches a shallow depth. The opening book stores the move found by a
+deep offline search for every position in the first few plies, and
+`AlphaBetaPlayer` plays the stored move instantly when it is given a book
+through its `opening_book` parameter.
+
+Positions that are rotations or reflections of each other have equivalent
+best moves, so the book only stores one canonical orientation per position
+(see `isolation.symmetry`) and maps the stored move back to the orientation
+of the game being played.
+
+Build a book offline with, e.g.,
+
+    python opening_book.py --plies 4 --seconds 0.5 --out opening_book.bin
+"""
+import argparse
+import struct
+import timeit
+
+from isolation import BitBoard
+from isolation.symmetry import canonical_position, to_canonical, from_canonical
+from game_agent import AlphaBetaPlayer, MoveOrderer, SearchTimeout, custom_score
+
+OPENING_BOOK_FILE = "opening_book.bin"
+
+BOOK_MAGIC = b"ISOB"
+HEADER = struct.Struct("<4sHHI")  # magic, width, height, number of records
+NOT_MOVED = 0xFFFF  # location stored for a player that has not moved
+
+
+class OpeningBook():
+    """A table of book moves for early positions on one board size.
+
+    Parameters
+    ----------
+    width : int (optional)
+        The number of columns of the boards the book is used with.
+
+    height : int (optional)
+        The number of rows of the boards the book is used with.
+
+    Attributes
+    ----------
+    max_ply : int
+        The largest number of moves played in a stored position; `lookup()`
+        returns None without canonicalizing any later position.
+    """
+    def __init__(self, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.moves = {}
+        self.max_ply = -1
+
+    def __len__(self):
+        return len(self.moves)
+
+    def canonical(self, game):
+        """Return the canonical key of a position and the symmetry that maps
+        the position onto it.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        Returns
+        -------
+        ((int, int, int), int)
+            The key (blocked mask, player 1 cell, player 2 cell) and the index
+            of the symmetry.
+        """
+        (mask, p1, p2), t = canonical_position(game)
+        return (mask, NOT_MOVED if p1 is None else p1,
+                NOT_MOVED if p2 is None else p2), t
+
+    def add(self, game, move):
+        """ Store the book move for a position. """
+        key, t = self.canonical(game)
+        move = to_canonical(move, t, self.width, self.height)
+        self.moves[key] = move[0] + move[1] * self.height
+        self.max_ply = max(self.max_ply, game.move_count)
+
+    def lookup(self, game):
+        """Return the book move for a position, or None if the position is
+        not in the book.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        Returns
+        -------
+        (int, int) or None
+            The book move for the active player
+        """
+        if game.move_count > self.max_ply or \
+                (game.width, game.height) != (self.width, self.height):
+            return None
+        key, t = self.canonical(game)
+        idx = self.moves.get(key)
+        if idx is None:
+            return None
+        return from_canonical((idx % self.height, idx // self.height), t,
+                              self.width, self.height)
+
+    def _record(self):
+        return struct.Struct("<{}sHHH".format((self.width * self.height + 7) // 8))
+
+    def save(self, path):
+        """ Write the book to a binary file. """
+        record = self._record()
+        num_bytes = record.size - 6
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(BOOK_MAGIC, self.width, self.height, len(self.moves)))
+            for (mask, p1, p2), move in sorted(self.moves.items()):
+                f.write(record.pack(mask.to_bytes(num_bytes, "little"), p1, p2, move))
+
+    @classmethod
+    def load(cls, path):
+        """ Read a book written by save(). """
+        with open(path, "rb") as f:
+            magic, width, height, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != BOOK_MAGIC:
+                raise ValueError("{} is not an opening book".format(path))
+            book = cls(width, height)
+            record = book._record()
+            data = f.read(record.size * count)
+        for mask, p1, p2, move in record.iter_unpack(data):
+            mask = int.from_bytes(mask, "little")
+            book.moves[(mask, p1, p2)] = move
+            # every move played blocks one cell
+            book.max_ply = max(book.max_ply, bin(mask).count("1"))
+        return book
+
+
+def search_position(player, game, max_depth, seconds):
+    """Run iterative deepening alpha-beta on a position for a fixed amount of
+    time and return the best move of the deepest completed iteration.
+    """
+    player.tt.new_search()
+    player.move_orderer.new_search()
+
+    # always complete the first iteration so that there is a move to store
+    player.time_left = lambda: float("inf")
+    best_move = player.alphabeta(game, 1)
+
+    deadline = timeit.default_timer() + seconds
+    player.time_left = lambda: 1000 * (deadline - timeit.default_timer())
+    try:
+        for depth in range(2, max_depth + 1):
+            best_move = player.alphabeta(game, depth)
+    except SearchTimeout:
+        pass
+    return best_move
+
+
+def build_book(plies=4, seconds=0.5, max_depth=20, score_fn=custom_score,
+               width=7, height=7, verbose=False):
+    """Search every distinct position of the first plies of the game.
+
+    Parameters
+    ----------
+    plies : int (optional)
+        Positions with fewer than this many moves played are added.
+
+    seconds : float (optional)
+        Search time for each position.
+
+    max_depth : int (optional)
+        Maximum iterative deepening depth for each position.
+
+    score_fn : callable (optional)
+        Heuristic used by the search.
+
+    width, height : int (optional)
+        The board size.
+
+    Returns
+    -------
+    OpeningBook
+        A book with one move for every position up to symmetry.
+    """
+    book = OpeningBook(width, height)
+    players = [AlphaBetaPlayer(score_fn=score_fn, make_unmake=True,
+                               tt_size=2**18, move_orderer=MoveOrderer())
+               for _ in range(2)]
+
+    frontier = [BitBoard(players[0], players[1], width, height)]
+    for ply in range(plies):
+        next_frontier = {}
+        for game in frontier:
+            player = game.active_player
+            book.add(game, search_position(player, game, max_depth, seconds))
+            if ply + 1 < plies:
+                for move in game.get_legal_moves():
+                    child = game.forecast_move(move)
+                    next_frontier.setdefault(book.canonical(child)[0], child)
+        if verbose:
+            print("ply {}: {} positions".format(ply, len(frontier)))
+        frontier = list(next_frontier.values())
+    return book
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build an opening book " +
+        "for the isolation agents by searching every early position offline.")
+    parser.add_argument('--plies', type=int, default=4,
+                        help="Number of plies covered by the book. Default: 4")
+    parser.add_argument('--seconds', type=float, default=0.5,
+                        help="Search time per position in seconds. Default: 0.5")
+    parser.add_argument('--depth', type=int, default=20,
+                        help="Maximum search depth per position. Default: 20")
+    parser.add_argument('--size', type=int, nargs=2, default=[7, 7], metavar=('WIDTH', 'HEIGHT'),
+                        help="Board size. Default: 7 7")
+    parser.add_argument('--out', default=OPENING_BOOK_FILE,
+                        help="Output file. Default: {}".format(OPENING_BOOK_FILE))
+    args = parser.parse_args()
+
+    book = build_book(args.plies, args.seconds, args.depth,
+                      width=args.size[0], height=args.size[1], verbose=True)
+    book.save(args.out)
+    print("Wrote {} positions to {}".format(len(book), args.out))
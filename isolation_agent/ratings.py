@@ -0,0 +1,137 @@
+"""
+This file contains the rating engine and the early stopping test used by
+`tournament.py` to compare agents from the results of their games.
+
+`Glicko` keeps a Glicko-1 rating and rating deviation for every player and
+updates them after every game, so the ratings and their confidence intervals
+are available while the tournament runs. `elo_difference()` and
+`elo_interval()` estimate the Elo difference of a single pairing from its
+score.
+
+`SPRT` is a sequential probability ratio test between two hypotheses about
+the Elo difference of a pairing. It decides as soon as the results are
+conclusive, which usually takes far fewer games than a fixed number of
+matches when the agents are of clearly different strength.
+"""
+import math
+
+Q = math.log(10) / 400
+
+
+def expected_score(elo_diff):
+    """ Return the expected score of a player rated `elo_diff` above the other. """
+    return 1 / (1 + 10 ** (-elo_diff / 400))
+
+
+def elo_difference(score):
+    """Return the Elo difference that gives the expected `score` (fraction of
+    games won), clipped to +/- 1000 for scores of 0 and 1.
+    """
+    score = min(max(score, 1e-3), 1 - 1e-3)
+    return max(-1000., min(1000., -400 * math.log10(1 / score - 1)))
+
+
+def elo_interval(wins, games, z=1.96):
+    """Return the Elo difference estimated from `wins` out of `games` and the
+    bounds of its confidence interval (a normal approximation of the score).
+    """
+    if not games:
+        return 0., -1000., 1000.
+    score = wins / games
+    margin = z * math.sqrt(score * (1 - score) / games)
+    return (elo_difference(score), elo_difference(score - margin),
+            elo_difference(score + margin))
+
+
+class Glicko():
+    """Glicko-1 ratings updated after every game.
+
+    Parameters
+    ----------
+    rating : float (optional)
+        Initial rating of every player.
+
+    deviation : float (optional)
+        Initial rating deviation of every player.
+
+    min_deviation : float (optional)
+        Lower bound of the rating deviation, which keeps the ratings
+        responsive after many games.
+    """
+    def __init__(self, rating=1500., deviation=350., min_deviation=30.):
+        self.initial = (rating, deviation)
+        self.min_deviation = min_deviation
+        self.ratings = {}
+
+    def __contains__(self, player):
+        return player in self.ratings
+
+    def rating(self, player):
+        """ Return the (rating, deviation) pair of a player. """
+        return self.ratings.get(player, self.initial)
+
+    def interval(self, player, z=1.96):
+        """ Return the bounds of the confidence interval of a rating. """
+        rating, deviation = self.rating(player)
+        return rating - z * deviation, rating + z * deviation
+
+    def record(self, winner, loser):
+        """ Update the ratings of two players after `winner` beat `loser`. """
+        winner_rating, loser_rating = self.rating(winner), self.rating(loser)
+        self.ratings[winner] = self._update(winner_rating, loser_rating, 1.)
+        self.ratings[loser] = self._update(loser_rating, winner_rating, 0.)
+
+    def _update(self, player, opponent, score):
+        rating, deviation = player
+        opp_rating, opp_deviation = opponent
+        g = 1 / math.sqrt(1 + 3 * (Q * opp_deviation / math.pi) ** 2)
+        expected = 1 / (1 + 10 ** (-g * (rating - opp_rating) / 400))
+        d_squared = 1 / (Q ** 2 * g ** 2 * expected * (1 - expected))
+        precision = 1 / deviation ** 2 + 1 / d_squared
+        rating += Q / precision * g * (score - expected)
+        deviation = max(math.sqrt(1 / precision), self.min_deviation)
+        return rating, deviation
+
+
+class SPRT():
+    """A sequential probability ratio test of the Elo difference of a player
+    against an opponent, from the results of their games (no draws).
+
+    Parameters
+    ----------
+    elo0, elo1 : float (optional)
+        The Elo differences of the null and alternative hypotheses.
+
+    alpha, beta : float (optional)
+        The probabilities of accepting H1 when H0 is true and of accepting H0
+        when H1 is true.
+    """
+    def __init__(self, elo0=-50., elo1=50., alpha=0.05, beta=0.05):
+        p0, p1 = expected_score(elo0), expected_score(elo1)
+        self.win_llr = math.log(p1 / p0)
+        self.loss_llr = math.log((1 - p1) / (1 - p0))
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.llr = 0.
+        self.games = 0
+
+    def record(self, won):
+        """Add the result of a game and return the decision (see `status()`).
+        Results arriving after the decision (e.g., from games that were
+        already running) are ignored.
+        """
+        if self.status() is None:
+            self.llr += self.win_llr if won else self.loss_llr
+            self.games += 1
+        return self.status()
+
+    def status(self):
+        """Return "H1" if the player is accepted as the stronger one at elo1,
+        "H0" if it is accepted as the weaker one at elo0, or None if the test
+        needs more games.
+        """
+        if self.llr >= self.upper:
+            return "H1"
+        if self.llr <= self.lower:
+            return "H0"
+        return None
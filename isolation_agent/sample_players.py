@@ -8,7 +8,10 @@ own agent and example heuristic functions.
 
 from random import randint
 
+from evaluation import symmetric
 
+
+@symmetric
 def null_score(game, player):
     """This heuristic presumes no knowledge for non-terminal states, and
     returns the same uninformative value for all other states.
@@ -39,6 +42,7 @@ def null_score(game, player):
     return 0.
 
 
+@symmetric
 def open_move_score(game, player):
     """The basic evaluation function described in lecture that outputs a score
     equal to the number of moves open for your computer player on the board.
@@ -68,6 +72,7 @@ def open_move_score(game, player):
     return float(len(game.get_legal_moves(player)))
 
 
+@symmetric
 def improved_score(game, player):
     """The "Improved" evaluation function discussed in lecture that outputs a
     score equal to the difference in the number of moves available to the
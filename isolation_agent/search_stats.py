@@ -0,0 +1,92 @@
+"""
+This file contains the search statistics recorded by the agents in
+`game_agent.py` to explain their play: how many nodes they search per move,
+how deep they get and how well alpha-beta pruning works.
+
+Pass a `SearchStats` as the `stats` of `MinimaxPlayer` or `AlphaBetaPlayer`
+and the agent counts, for every move it makes, the nodes it visits, the
+leaves it evaluates with its heuristic, the beta cutoffs, the depth of the
+deepest completed search and the time spent. Without one, the only cost is a
+`None` check per node.
+
+The counters are kept by the process that searches, so the moves chosen by
+the parallel search of `AlphaBetaPlayer` only record their depth and time.
+"""
+from collections import namedtuple
+
+MoveStats = namedtuple("MoveStats", ["nodes", "leaves", "cutoffs", "depth", "time"])
+
+
+class SearchStats():
+    """Count the work done by an agent's search for every move.
+
+    Attributes
+    ----------
+    nodes, leaves, cutoffs : int
+        Counters of the move being searched: the nodes visited (including the
+        leaves), the positions scored by the heuristic and the nodes where the
+        search of the remaining moves was cut off.
+
+    moves : list<MoveStats>
+        The counters, completed depth and time (in milliseconds) of every
+        move made since the last `clear()`.
+    """
+    def __init__(self):
+        self.nodes = 0
+        self.leaves = 0
+        self.cutoffs = 0
+        self.moves = []
+        self._time_left = None
+        self._start = 0.
+
+    def start_move(self, time_left):
+        """ Reset the counters at the start of a turn. """
+        self.nodes = self.leaves = self.cutoffs = 0
+        self._time_left = time_left
+        self._start = time_left()
+
+    def end_move(self, depth):
+        """ Record the counters of a turn that reached `depth`. """
+        elapsed = self._start - self._time_left()
+        # the timer of the turn cannot be pickled with the agent
+        self._time_left = None
+        self.moves.append(MoveStats(self.nodes, self.leaves, self.cutoffs,
+                                    depth, elapsed))
+
+    def clear(self):
+        """ Forget the recorded moves. """
+        self.moves = []
+
+    def summary(self):
+        """Return the totals and averages over the recorded moves.
+
+        Returns
+        -------
+        dict
+            The number of moves, the total nodes, leaves and cutoffs, the mean
+            and median completed depth, the mean time per move (in
+            milliseconds), the nodes searched per second and the fraction of
+            the interior nodes that were cut off.
+        """
+        return summarize(self.moves)
+
+
+def summarize(moves):
+    """ Summarize a list of `MoveStats` (see `SearchStats.summary()`). """
+    count = len(moves)
+    nodes = sum(move.nodes for move in moves)
+    leaves = sum(move.leaves for move in moves)
+    cutoffs = sum(move.cutoffs for move in moves)
+    time = sum(move.time for move in moves)
+    depths = sorted(move.depth for move in moves)
+    return {
+        "moves": count,
+        "nodes": nodes,
+        "leaves": leaves,
+        "cutoffs": cutoffs,
+        "depth": sum(depths) / count if count else 0.,
+        "median_depth": depths[count // 2] if count else 0,
+        "time": time / count if count else 0.,
+        "nodes_per_second": 1000. * nodes / time if time > 0 else 0.,
+        "cutoff_rate": cutoffs / (nodes - leaves) if nodes > leaves else 0.,
+    }
@@ -0,0 +1,765 @@
+"""
+This file contains test cases for the search extensions of the agents in
+`game_agent.py`. The tests compare the extended searches against the plain
+alpha-beta search on fixed positions.
+"""
+import json
+import multiprocessing
+import os
+import tempfile
+import timeit
+import unittest
+from unittest import mock
+
+import isolation
+import numpy as np
+
+import batch_eval
+import benchmark
+import game_agent
+import opening_book
+import ratings
+import selfplay
+import tournament
+
+from board_test import play_random_game
+from evaluation import ScoreCache
+from move_ordering import MoveOrderer
+from search_stats import SearchStats
+from time_manager import TimeManager
+
+from sample_players import RandomPlayer, center_score, improved_score
+
+
+def make_game(board_cls, player_1, player_2, moves):
+    """Return a new board of the given class with `moves` applied. """
+    game = board_cls(player_1, player_2)
+    for move in moves:
+        game.apply_move(move)
+    return game
+
+
+OPENINGS = [[(3, 3), (0, 0)], [(2, 3), (4, 4), (0, 2), (6, 5)],
+            [(1, 1), (5, 5), (3, 2), (4, 3), (5, 3), (2, 4)]]
+
+
+class MakeUnmakeTest(unittest.TestCase):
+
+    def test_same_move_as_forecast(self):
+        """ make/unmake search returns the same moves as forecast_move """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            for moves in OPENINGS:
+                player = game_agent.AlphaBetaPlayer(score_fn=improved_score)
+                fast = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                                  make_unmake=True)
+                player.time_left = fast.time_left = lambda: 1e6
+                game = make_game(board_cls, player, "null_agent", moves)
+                fast_game = make_game(board_cls, fast, "null_agent", moves)
+                for depth in range(1, 5):
+                    self.assertEqual(player.alphabeta(game, depth),
+                                     fast.alphabeta(fast_game, depth))
+                self.assertEqual(fast_game.to_string(), game.to_string())
+                self.assertEqual(fast_game.move_count, len(moves))
+
+
+def counting_score(calls):
+    """Return improved_score wrapped to count its calls in `calls`. """
+    def score(game, player):
+        calls.append(1)
+        return improved_score(game, player)
+    return score
+
+
+def move_value(player, game, move, depth):
+    """Return the value of `move` searched to `depth` by plain alpha-beta. """
+    tt, player.tt = player.tt, None
+    try:
+        return player.alphabeta_min_value(game.forecast_move(move), depth - 1)
+    finally:
+        player.tt = tt
+
+
+class TranspositionTableTest(unittest.TestCase):
+
+    def test_iterative_deepening_reuse(self):
+        """ The table keeps move values and reduces evaluations """
+        for moves in OPENINGS:
+            plain_calls, tt_calls = [], []
+            plain = game_agent.AlphaBetaPlayer(score_fn=counting_score(plain_calls))
+            cached = game_agent.AlphaBetaPlayer(score_fn=counting_score(tt_calls),
+                                                tt_size=2**14)
+            plain.time_left = cached.time_left = lambda: 1e6
+            game = make_game(isolation.BitBoard, plain, "null_agent", moves)
+            tt_game = make_game(isolation.BitBoard, cached, "null_agent", moves)
+            for depth in range(1, 6):
+                plain_move = plain.alphabeta(game, depth)
+                tt_move = cached.alphabeta(tt_game, depth)
+            self.assertEqual(move_value(plain, game, plain_move, 5),
+                             move_value(cached, tt_game, tt_move, 5))
+            self.assertLess(len(tt_calls), len(plain_calls))
+
+    def test_replacement_policy(self):
+        """ Shallow results from the current search do not evict deep ones """
+        table = game_agent.TranspositionTable(size=4)
+        table.store(1, 5, game_agent.EXACT, 1., (0, 0))
+        table.store(5, 2, game_agent.EXACT, 2., (1, 1))
+        self.assertEqual(table.probe(1)[3], 1.)
+        self.assertIsNone(table.probe(5))
+        table.new_search()
+        table.store(5, 2, game_agent.EXACT, 2., (1, 1))
+        self.assertEqual(table.probe(5)[3], 2.)
+        self.assertIsNone(table.probe(1))
+
+
+class MoveOrderingTest(unittest.TestCase):
+
+    def test_order(self):
+        """ Hash move, then killers, then history, then coordinates """
+        orderer = game_agent.MoveOrderer()
+        orderer.record_cutoff((4, 4), 1, 3)
+        orderer.record_cutoff((0, 1), 2, 5)
+        moves = [(0, 1), (2, 2), (4, 4), (5, 0), (1, 1)]
+        self.assertEqual(orderer.order(moves, 1, hash_move=(5, 0)),
+                         [(5, 0), (4, 4), (0, 1), (1, 1), (2, 2)])
+        self.assertEqual(orderer.order(moves, 1, maximizing=False),
+                         [(4, 4), (0, 1), (1, 1), (2, 2), (5, 0)])
+
+    def test_same_value_with_ordering(self):
+        """ Ordered search finds moves of the same value """
+        for moves in OPENINGS:
+            plain = game_agent.AlphaBetaPlayer(score_fn=improved_score)
+            ordered = game_agent.AlphaBetaPlayer(
+                score_fn=improved_score, tt_size=2**14,
+                move_orderer=game_agent.MoveOrderer())
+            plain.time_left = ordered.time_left = lambda: 1e6
+            game = make_game(isolation.BitBoard, plain, "null_agent", moves)
+            ordered_game = make_game(isolation.BitBoard, ordered, "null_agent", moves)
+            ordered.move_orderer.new_search()
+            for depth in range(1, 6):
+                plain_move = plain.alphabeta(game, depth)
+                ordered_move = ordered.alphabeta(ordered_game, depth)
+            self.assertEqual(move_value(plain, game, plain_move, 5),
+                             move_value(ordered, ordered_game, ordered_move, 5))
+
+
+class SymmetryTest(unittest.TestCase):
+
+    def test_same_value_with_symmetric_table(self):
+        """ Canonical table keys find moves of the same value """
+        for moves in OPENINGS:
+            plain = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                               tt_size=2**14)
+            symmetric = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                                   tt_size=2**14,
+                                                   symmetry_plies=49)
+            plain.time_left = symmetric.time_left = lambda: 1e6
+            game = make_game(isolation.BitBoard, plain, "null_agent", moves)
+            symmetric_game = make_game(isolation.BitBoard, symmetric,
+                                       "null_agent", moves)
+            for depth in range(1, 5):
+                plain_move = plain.alphabeta(game, depth)
+                symmetric_move = symmetric.alphabeta(symmetric_game, depth)
+                self.assertIn(symmetric_move, symmetric_game.get_legal_moves())
+            self.assertEqual(move_value(plain, game, plain_move, 4),
+                             move_value(symmetric, symmetric_game,
+                                        symmetric_move, 4))
+
+    def test_symmetric_table_requires_symmetric_heuristic(self):
+        """ Canonical table keys are refused with a coordinate heuristic """
+        for score_fn in (game_agent.custom_score_2, game_agent.custom_score_3):
+            for score_cache in (0, 2**8):
+                self.assertRaises(ValueError, game_agent.AlphaBetaPlayer,
+                                  score_fn=score_fn, tt_size=2**8,
+                                  symmetry_plies=4, score_cache=score_cache)
+        for score_cache in (0, 2**8):
+            player = game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score,
+                                                tt_size=2**8, symmetry_plies=4,
+                                                score_cache=score_cache)
+            self.assertEqual(player.symmetry_plies, 4)
+
+
+
+def forecast_limit_opp_moves(game, player):
+    """Return limit_opp_moves_heuristic computed with forecast_move(). """
+    if game.is_loser(player):
+        return float("-inf")
+    if game.is_winner(player):
+        return float("inf")
+    totals = []
+    for p in (player, game.get_opponent(player)):
+        moves = game.get_legal_moves(p)
+        totals.append(len(moves) + sum(len(game.forecast_move(m).get_legal_moves())
+                                       for m in moves))
+    return float(totals[0] - 2 * totals[1])
+
+
+class EvaluationTest(unittest.TestCase):
+
+    def test_mobility_matches_forecast(self):
+        """ Mask-based limit_opp_moves matches the forecast_move version """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            for seed in range(5):
+                history, final = play_random_game(board_cls, seed)
+                for board in [b for b, _ in history] + [final]:
+                    for player in ("Player1", "Player2"):
+                        self.assertEqual(
+                            game_agent.limit_opp_moves_heuristic(board, player),
+                            forecast_limit_opp_moves(board, player))
+
+    def test_score_cache(self):
+        """ Cached values match the heuristic and are bounded by size """
+        cache = ScoreCache(game_agent.custom_score, size=8, symmetry_plies=4)
+        history, _ = play_random_game(isolation.BitBoard, 1)
+        for board, _ in history + history:
+            for player in ("Player1", "Player2"):
+                self.assertEqual(cache(board, player),
+                                 game_agent.custom_score(board, player))
+        self.assertEqual(len(cache), 8)
+        self.assertGreater(cache.misses, 0)
+
+        mirrored = make_game(isolation.BitBoard, "Player1", "Player2", [(0, 1)])
+        cache(make_game(isolation.BitBoard, "Player1", "Player2", [(1, 0)]),
+              "Player1")
+        hits = cache.hits
+        cache(mirrored, "Player1")
+        self.assertEqual(cache.hits, hits + 1)
+
+    def test_score_cache_asymmetric_heuristic(self):
+        """ Reflections have their own values under a coordinate heuristic """
+        score_fn = game_agent.custom_score_2
+        self.assertRaises(ValueError, ScoreCache, score_fn, symmetry_plies=4)
+        cache = ScoreCache(score_fn)
+        self.assertFalse(cache.symmetric)
+        game = make_game(isolation.BitBoard, "Player1", "Player2",
+                         [(0, 0), (1, 2)])
+        reflected = make_game(isolation.BitBoard, "Player1", "Player2",
+                              [(0, 6), (1, 4)])
+        self.assertNotEqual(score_fn(game, "Player1"),
+                            score_fn(reflected, "Player1"))
+        for board in (game, reflected):
+            self.assertEqual(cache(board, "Player1"), score_fn(board, "Player1"))
+        self.assertEqual(cache.hits, 0)
+
+
+    def test_agent_score_cache(self):
+        """ Agents with a score cache search the same values and reuse them """
+        for player_cls in (game_agent.MinimaxPlayer, game_agent.AlphaBetaPlayer):
+            for moves in OPENINGS:
+                plain = player_cls(score_fn=improved_score)
+                cached = player_cls(score_fn=improved_score, score_cache=2**12)
+                self.assertIsInstance(cached.score, ScoreCache)
+                results = []
+                for player in (plain, cached):
+                    player.time_left = lambda: 1e6
+                    search = (player.minimax if player_cls is game_agent.MinimaxPlayer
+                              else player.alphabeta)
+                    game = isolation.BitBoard(player, "null_agent", shuffle_moves=False)
+                    for move in moves:
+                        game.apply_move(move)
+                    result = [search(game, 3)]
+                    # two plies later, the leaves of depth 1 were the leaves
+                    # of depth 3 on the previous turn
+                    for _ in range(2):
+                        game.apply_move(sorted(game.get_legal_moves())[0])
+                    result += [search(game, depth) for depth in (1, 2)]
+                    results.append(result)
+                self.assertEqual(results[0], results[1])
+                self.assertGreater(cached.score.hits, 0)
+
+class PrincipalVariationTest(unittest.TestCase):
+
+    def test_same_value_as_alphabeta(self):
+        """ PVS and aspiration windows find the alpha-beta root values """
+        for moves in OPENINGS:
+            plain = game_agent.AlphaBetaPlayer(score_fn=improved_score)
+            plain.time_left = lambda: 1e6
+            game = make_game(isolation.BitBoard, plain, "null_agent", moves)
+            for options in ({"pvs": True},
+                            {"pvs": True, "aspiration_window": 1.},
+                            {"pvs": True, "tt_size": 2**14,
+                             "move_orderer": game_agent.MoveOrderer()}):
+                player = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                                    **options)
+                player.time_left = lambda: 1e6
+                pvs_game = make_game(isolation.BitBoard, player, "null_agent",
+                                     moves)
+                for depth in range(1, 6):
+                    plain.alphabeta(game, depth)
+                    player.aspiration_search(pvs_game, depth)
+                    self.assertEqual(player.root_value, plain.root_value)
+                    self.assertEqual(len(player.pv), depth)
+                    self.assertIn(player.pv[0], pvs_game.get_legal_moves())
+
+
+class TimeManagerTest(unittest.TestCase):
+
+    def test_clock_reads(self):
+        """ The clock is only read every check_interval nodes """
+        reads = []
+        manager = TimeManager(check_interval=10)
+        manager.start(lambda: reads.append(1) or 100., 20.)
+        for _ in range(95):
+            self.assertFalse(manager.expired())
+        self.assertEqual(len(reads), 1 + 9)
+
+    def test_next_iteration(self):
+        """ An iteration is only started if it is predicted to finish """
+        clock = [1000.]
+        manager = TimeManager(check_interval=1)
+        manager.start(lambda: clock[0], 20.)
+        for nodes, elapsed in [(10, 10.), (40, 40.), (160, 160.)]:
+            for _ in range(nodes):
+                manager.expired()
+            clock[0] -= elapsed
+            manager.iteration_done()
+            self.assertEqual(manager.branching_factor(),
+                             4. if nodes > 10 else manager.default_branching)
+        # 790 ms are left and the next iteration should take 640 ms
+        self.assertTrue(manager.next_iteration())
+        clock[0] = 600.
+        self.assertFalse(manager.next_iteration())
+
+    def test_agent_move_in_time(self):
+        """ The agent returns a legal move before the threshold """
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                            time_manager=TimeManager())
+        game = make_game(isolation.BitBoard, player, "null_agent", OPENINGS[0])
+        start = timeit.default_timer()
+        move = player.get_move(
+            game, lambda: 150 - 1000 * (timeit.default_timer() - start))
+        self.assertIn(move, game.get_legal_moves())
+        self.assertLess(timeit.default_timer() - start, 0.13)
+
+
+class ParallelSearchTest(unittest.TestCase):
+
+    def test_split_root_values(self):
+        """ The best of the root shares is the value of the whole root """
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                            tt_size=2**14)
+        player.time_left = lambda: 1e6
+        game = make_game(isolation.BitBoard, player, "null_agent", OPENINGS[1])
+        moves = sorted(game.get_legal_moves())
+        deadline = timeit.default_timer() + 0.2
+        shares = [game_agent.search_root_moves((i, player, game, moves[i::2],
+                                                deadline)) for i in range(2)]
+        for depth in range(1, min(map(len, shares)) + 1):
+            player.alphabeta(game, depth)
+            self.assertEqual(max(share[depth - 1][1] for share in shares),
+                             player.root_value)
+
+    def test_parallel_get_move(self):
+        """ The parallel search returns a legal move in time """
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                            tt_size=2**14)
+        player.processes, player.pool = 2, multiprocessing.Pool(2)
+        try:
+            game = make_game(isolation.BitBoard, player, "null_agent", OPENINGS[1])
+            start = timeit.default_timer()
+            move = player.get_move(
+                game, lambda: 100 - 1000 * (timeit.default_timer() - start))
+            self.assertLess(timeit.default_timer() - start, 0.1)
+            self.assertIn(move, game.get_legal_moves())
+        finally:
+            player.close()
+
+    def test_worker_copy(self):
+        """ Workers get a lean agent and keep their own tables between turns """
+        player = game_agent.AlphaBetaPlayer(
+            score_fn=improved_score, tt_size=2**12, move_orderer=MoveOrderer(),
+            endgame_nodes=100, opening_book=opening_book.OpeningBook(),
+            score_cache=2**10)
+        game = make_game(isolation.BitBoard, player, "null_agent", OPENINGS[1])
+        player.endgame_memo[0] = 0
+        player.score(game, player)
+        player.move_orderer.history[(True, (0, 0))] = 4
+
+        key = ("worker_copy_test", id(player))
+        moves = sorted(game.get_legal_moves())
+        agents = []
+        try:
+            for _ in range(2):
+                agent, worker_game = player.worker_copy(game)
+                self.assertIsNone(agent.opening_book)
+                self.assertEqual(agent.endgame_memo, {})
+                self.assertEqual(len(agent.score), 0)
+                deadline = timeit.default_timer() + 0.05
+                game_agent.search_root_moves((key, agent, worker_game, moves, deadline))
+                agents.append(agent)
+            # the second turn reuses the values cached by the first
+            self.assertIs(agents[1].score, agents[0].score)
+            self.assertIs(agents[1].move_orderer, agents[0].move_orderer)
+            self.assertIs(agents[1].tt, agents[0].tt)
+            self.assertGreater(len(agents[1].score), 0)
+        finally:
+            game_agent._WORKER_TABLES.pop(key, None)
+        self.assertEqual(len(player.score), 1)
+        self.assertEqual(player.endgame_memo, {0: 0})
+
+    def test_serial_fallback(self):
+        """ Without spare CPUs the agent searches serially """
+        player = game_agent.AlphaBetaPlayer(processes=4)
+        with mock.patch.object(game_agent, "available_cpus", lambda: 1):
+            self.assertIsNone(player.search_pool())
+        self.assertEqual(player.processes, 1)
+        player.close()
+
+    def test_pool_on_spare_cpus(self):
+        """ With spare CPUs the agent creates a pool no larger than the CPUs """
+        player = game_agent.AlphaBetaPlayer(processes=4)
+        with mock.patch.object(game_agent, "available_cpus", lambda: 2):
+            pool = player.search_pool()
+        try:
+            self.assertIsNotNone(pool)
+            self.assertIs(player.pool, pool)
+            self.assertEqual(player.processes, 2)
+        finally:
+            player.close()
+        self.assertIsNone(player.pool)
+
+
+class PonderTest(unittest.TestCase):
+
+    def test_ponder_hit(self):
+        """ Pondering searches the predicted reply and fills the table """
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                            tt_size=2**16, pvs=True, ponder=True)
+        game = make_game(isolation.BitBoard, player, "null_agent", OPENINGS[0])
+        with mock.patch.object(game_agent, "available_cpus", lambda: 2):
+            try:
+                start = timeit.default_timer()
+                move = player.get_move(
+                    game, lambda: 100 - 1000 * (timeit.default_timer() - start))
+                self.assertIsNotNone(player.ponder_process)
+                reply = player.pv[1]
+                game.apply_move(move)
+                game.apply_move(reply)
+                process = player.ponder_process
+                process.join(0.2)  # the opponent thinks while the agent ponders
+                size = len(player.tt)
+                player.tt.new_search()
+                result = player.stop_pondering()
+                self.assertIn(player.merge_pondering(result, game),
+                              game.get_legal_moves())
+                self.assertLessEqual(len(result[2]), player.PONDER_MERGE_MAX)
+                self.assertGreater(len(player.tt), size)
+                self.assertFalse(process.is_alive())
+            finally:
+                player.close()
+
+    def test_no_ponder_after_game(self):
+        """ No pondering process outlives the game, whatever ends the turns """
+        players = [game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                              tt_size=2**12, ponder=True,
+                                              endgame_nodes=20000)
+                   for _ in range(2)]
+        with mock.patch.object(game_agent, "available_cpus", lambda: 2):
+            try:
+                game = isolation.BitBoard(players[0], players[1], 5, 5)
+                game.play(time_limit=100)
+                for player in players:
+                    self.assertIsNone(player.ponder_process)
+            finally:
+                for player in players:
+                    player.close()
+
+    def test_ponder_reserve(self):
+        """ The serial search stops early enough to start pondering """
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                            tt_size=2**12, ponder=True)
+        player.ponder_reserve = 40.
+        game = make_game(isolation.BitBoard, player, "null_agent", OPENINGS[0])
+        with mock.patch.object(game_agent, "available_cpus", lambda: 2):
+            try:
+                start = timeit.default_timer()
+                with mock.patch.object(player, "start_pondering") as start_pondering:
+                    player.get_move(game,
+                                    lambda: 100 - 1000 * (timeit.default_timer() - start))
+                # the search stopped the reserve before the threshold
+                elapsed = 1000 * (timeit.default_timer() - start)
+                self.assertLess(elapsed, 100 - player.TIMER_THRESHOLD - 30)
+                start_pondering.assert_called_once()
+            finally:
+                player.close()
+
+    def test_no_ponder_on_single_cpu(self):
+        """ Pondering is skipped without a spare CPU """
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                            tt_size=2**12, ponder=True)
+        game = make_game(isolation.BitBoard, player, "null_agent", OPENINGS[0])
+        with mock.patch.object(game_agent, "available_cpus", lambda: 1):
+            start = timeit.default_timer()
+            player.get_move(game,
+                            lambda: 50 - 1000 * (timeit.default_timer() - start))
+        self.assertIsNone(player.ponder_process)
+
+
+class MCTSTest(unittest.TestCase):
+
+    def test_plays_legal_games(self):
+        """ MCTS plays complete games with legal moves """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            player = game_agent.MCTSPlayer(iterations=50, seed=0)
+            game = board_cls(player, game_agent.MCTSPlayer(iterations=50, seed=1),
+                             width=5, height=5)
+            winner, history, termination = game.play(time_limit=10**6)
+            self.assertEqual(termination, "illegal move")
+            self.assertIn(winner, (game._player_1, game._player_2))
+
+    def test_tree_reuse(self):
+        """ The subtree after the opponent's reply is kept between turns """
+        player = game_agent.MCTSPlayer(iterations=2000, seed=0)
+        game = make_game(isolation.BitBoard, player, "null_agent", OPENINGS[1])
+        game.apply_move(player.get_move(game, lambda: 1e6))
+        node = player._tree[0]
+        reply = max(node.children.values(), key=lambda child: child.visits)
+        game.apply_move((reply.move % 7, reply.move // 7))
+        self.assertIs(player.reuse_subtree(
+            (game._blocked, game._p1_loc, game._p2_loc)), reply)
+
+
+class BoardSizeTest(unittest.TestCase):
+
+    def test_search_stops_at_full_board(self):
+        """ Iterative deepening stops once the depth covers every blank cell """
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score)
+        history, _ = play_random_game(isolation.BitBoard, 3, width=5, height=5)
+        moves = [move for _, move in history[:-6]]
+        game = make_game(lambda p1, p2: isolation.BitBoard(p1, p2, 5, 5),
+                         player, "null_agent", moves)
+        if len(moves) % 2:
+            game = make_game(lambda p1, p2: isolation.BitBoard(p1, p2, 5, 5),
+                             "null_agent", player, moves)
+        move = player.get_move(game, lambda: float("inf"))
+        self.assertIn(move, game.get_legal_moves())
+        self.assertEqual(player.completed_depth, len(game.get_blank_spaces()))
+
+    def test_agents_change_board_size(self):
+        """ Agents reused on boards of different sizes play legal games """
+        alphabeta = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                               timeout=5., endgame_nodes=10**4)
+        mcts = game_agent.MCTSPlayer(iterations=30, seed=0)
+        for size in (5, 7, 5):
+            for player in (alphabeta, mcts):
+                game = isolation.BitBoard(player, RandomPlayer(), size, size)
+                winner, history, termination = game.play(time_limit=25)
+                self.assertEqual(termination, "illegal move")
+            self.assertEqual(alphabeta.endgame_size, (size, size))
+
+
+class BatchEvaluationTest(unittest.TestCase):
+
+    def test_matches_scalar_heuristics(self):
+        """ Batch heuristics match the scalar heuristics """
+        games = []
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            for seed in range(3):
+                history, final = play_random_game(board_cls, seed)
+                games += [board for board, _ in history[2:]] + [final]
+        for score_fn in (improved_score, center_score,
+                         game_agent.manhattan_dist_heuristic,
+                         game_agent.euclidean_dist_heuristic):
+            for player in ("Player1", "Player2"):
+                expected = [score_fn(game, player) for game in games]
+                np.testing.assert_allclose(
+                    batch_eval.batch_score(score_fn, games, player), expected)
+
+    def test_adapters(self):
+        """ Other heuristics fall back to scalar calls, and batch heuristics
+        can be used as score functions """
+        game = make_game(isolation.BitBoard, "Player1", "Player2", OPENINGS[2])
+        leaves = batch_eval.frontier(game, 2)
+        np.testing.assert_array_equal(
+            batch_eval.batch_score(game_agent.custom_score, leaves, "Player1"),
+            [game_agent.custom_score(leaf, "Player1") for leaf in leaves])
+        score = batch_eval.scalar_score(batch_eval.batch_improved_score)
+        for leaf in leaves:
+            self.assertEqual(score(leaf, "Player2"), improved_score(leaf, "Player2"))
+
+
+class OpeningBookTest(unittest.TestCase):
+
+    def test_symmetric_lookup(self):
+        """ Book moves are mapped onto rotated and reflected positions """
+        book = opening_book.OpeningBook()
+        book.add(make_game(isolation.Board, "p1", "p2", [(0, 1)]), (2, 3))
+        for first, move in [((0, 1), (2, 3)), ((1, 0), (3, 2)),
+                            ((6, 5), (4, 3)), ((0, 5), (2, 3))]:
+            game = make_game(isolation.Board, "p1", "p2", [first])
+            self.assertEqual(book.lookup(game), move)
+        self.assertIsNone(book.lookup(make_game(isolation.Board, "p1", "p2",
+                                                [(1, 1)])))
+        self.assertEqual(book.max_ply, 1)
+        self.assertIsNone(book.lookup(make_game(isolation.Board, "p1", "p2",
+                                                [(0, 1), (2, 3)])))
+
+    def test_save_load(self):
+        """ A saved book loads with the same moves """
+        book = opening_book.build_book(plies=2, seconds=0.01, max_depth=2,
+                                       width=5, height=5)
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            book.save(path)
+            loaded = opening_book.OpeningBook.load(path)
+        finally:
+            os.remove(path)
+        self.assertEqual((loaded.width, loaded.height), (5, 5))
+        self.assertEqual(loaded.moves, book.moves)
+        self.assertEqual(loaded.max_ply, book.max_ply)
+        self.assertEqual(loaded.max_ply, 1)
+
+
+class SearchStatsTest(unittest.TestCase):
+
+    def test_counts(self):
+        """ The statistics count the nodes, leaves and cutoffs of a search """
+        for moves in OPENINGS:
+            calls = []
+            plain = game_agent.AlphaBetaPlayer(score_fn=improved_score)
+            player = game_agent.AlphaBetaPlayer(score_fn=counting_score(calls),
+                                                stats=SearchStats())
+            plain.time_left = player.time_left = lambda: 1e6
+            game = make_game(isolation.BitBoard, plain, "null_agent", moves)
+            stats_game = make_game(isolation.BitBoard, player, "null_agent",
+                                   moves)
+            player.stats.start_move(player.time_left)
+            self.assertEqual(player.alphabeta(stats_game, 4),
+                             plain.alphabeta(game, 4))
+            self.assertEqual(player.stats.leaves, len(calls))
+            self.assertGreater(player.stats.nodes, player.stats.leaves)
+            self.assertGreater(player.stats.cutoffs, 0)
+
+    def test_minimax_move(self):
+        """ A fixed-depth minimax move visits the root and every child """
+        player = game_agent.MinimaxPlayer(search_depth=1, score_fn=improved_score,
+                                          stats=SearchStats())
+        game = make_game(isolation.Board, player, "null_agent", OPENINGS[1])
+        player.get_move(game, lambda: 1e6)
+        num_moves = len(game.get_legal_moves())
+        self.assertEqual(len(player.stats.moves), 1)
+        move = player.stats.moves[0]
+        self.assertEqual((move.nodes, move.leaves, move.cutoffs, move.depth),
+                         (num_moves + 1, num_moves, 0, 1))
+        summary = player.stats.summary()
+        self.assertEqual(summary["moves"], 1)
+        self.assertEqual(summary["cutoff_rate"], 0.)
+
+    def test_timed_moves(self):
+        """ Every move of a timed game records its depth and time """
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score,
+                                            stats=SearchStats())
+        game = isolation.BitBoard(player, "null_agent", 5, 5)
+        game.apply_move((2, 2))
+        game.apply_move((0, 0))
+        time_limit = 30
+        start = timeit.default_timer()
+        time_left = lambda: time_limit - 1000 * (timeit.default_timer() - start)
+        player.get_move(game, time_left)
+        move = player.stats.moves[-1]
+        self.assertEqual(move.depth, player.completed_depth)
+        self.assertGreater(move.depth, 0)
+        self.assertGreater(move.time, 0)
+        self.assertLess(move.time, time_limit)
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_report(self):
+        """ The benchmark report is valid JSON and detects regressions """
+        self.assertEqual(benchmark.benchmark_positions(5, seed=1),
+                         benchmark.benchmark_positions(5, seed=1))
+        report = benchmark.run_benchmarks(num_positions=3, depth=2, repeat=1,
+                                          loops=2)
+        report = json.loads(json.dumps(report))
+        self.assertIn("legal_moves/BitBoard", report["results"])
+        self.assertIn("score_fn/custom_score", report["results"])
+        self.assertFalse(any(row[-1] for row in benchmark.compare(report, report)))
+
+        slower = json.loads(json.dumps(report))
+        slower["results"]["legal_moves/Board"]["value"] /= 2
+        slower["results"]["forecast_move/Board"]["value"] *= 2
+        regressions = [row[0] for row in benchmark.compare(report, slower)
+                       if row[-1]]
+        self.assertEqual(regressions, ["forecast_move/Board", "legal_moves/Board"])
+
+
+class RatingsTest(unittest.TestCase):
+
+    def test_glicko(self):
+        """ Glicko ratings move towards the results and gain confidence """
+        glicko = ratings.Glicko()
+        for _ in range(10):
+            glicko.record("strong", "weak")
+        strong, weak = glicko.rating("strong"), glicko.rating("weak")
+        self.assertGreater(strong[0], 1500)
+        self.assertLess(weak[0], 1500)
+        self.assertAlmostEqual(strong[0] + weak[0], 3000)
+        self.assertLess(strong[1], 350)
+        low, high = glicko.interval("strong")
+        self.assertLess(low, strong[0])
+        self.assertGreater(high, strong[0])
+
+    def test_elo_interval(self):
+        """ An even score is an Elo difference of 0 """
+        diff, low, high = ratings.elo_interval(50, 100)
+        self.assertAlmostEqual(diff, 0)
+        self.assertAlmostEqual(low, -high)
+        self.assertGreater(ratings.elo_difference(0.75), 0)
+
+    def test_sprt(self):
+        """ The SPRT accepts the hypothesis the results support """
+        winning, losing, even = ratings.SPRT(), ratings.SPRT(), ratings.SPRT()
+        for _ in range(100):
+            winning.record(True)
+            losing.record(False)
+            even.record(even.games % 2 == 0)
+        self.assertEqual(winning.status(), "H1")
+        self.assertEqual(losing.status(), "H0")
+        self.assertIsNone(even.status())
+
+    def test_early_stopping(self):
+        """ A decided pairing stops playing matches """
+        cpu_agent = tournament.Agent(RandomPlayer(), "cpu")
+        test_agent = tournament.Agent(RandomPlayer(), "test")
+        wins = {cpu_agent.player: 0, test_agent.player: 0}
+        games = {test_agent.player: 0}
+        glicko = ratings.Glicko()
+        tournament.play_round(
+            cpu_agent, [test_agent], wins, 10, width=5, height=5,
+            game_counts=games, ratings=glicko,
+            sprt=lambda: ratings.SPRT(-400, 400, alpha=0.2, beta=0.2))
+        self.assertEqual(games[test_agent.player], 2 * tournament.SPRT_BATCH)
+        self.assertEqual(sum(wins.values()), 2 * tournament.SPRT_BATCH)
+        self.assertIn(test_agent.player, glicko)
+
+
+class SelfPlayTest(unittest.TestCase):
+
+    def test_write_and_replay(self):
+        """ Self-play records load from the file and replay as legal games """
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            count = selfplay.generate(path, 2, seed=3, width=5, height=5,
+                                      time_limit=50)
+            width, height, games = selfplay.load_games(path)
+            self.assertEqual((count, width, height, len(games)), (2, 5, 5, 2))
+            for record in games:
+                game = isolation.Board("p1", "p2", width, height)
+                for move in selfplay.game_moves(record, height):
+                    self.assertIn(move, game.get_legal_moves())
+                    game.apply_move(move)
+                if selfplay.TERMINATIONS[record["termination"]] == "illegal move":
+                    self.assertFalse(game.get_legal_moves())
+                # the player to move (without moves or out of time) lost
+                self.assertEqual(record["winner"], int(game.active_player == "p1"))
+                self.assertTrue(all(record["depth"][2:record["num_moves"]] > 0))
+                self.assertTrue(all(record["nodes"][2:record["num_moves"]] > 0))
+            del games
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,257 @@
+"""Generate self-play games for the isolation agents and store them in a
+compact binary file.
+
+Each game is stored as one fixed-size record of a NumPy structured array:
+the number of moves, the winner (0 for player 1, 1 for player 2), the
+termination reason, the cell index of every move and, for every move, the
+deepest completed search depth, the time used by the agent and the number of
+nodes it searched (when the agent records `search_stats.SearchStats`). Files start
+with a small header giving the board size, and `load_games()` memory-maps
+the records, so millions of games can be analyzed without reading them into
+memory.
+
+Generate games with, e.g.,
+
+    python selfplay.py --games 1000 -j 4 --out selfplay.bin
+"""
+import argparse
+import os
+import random
+import struct
+
+import numpy as np
+
+from isolation import BitBoard
+from game_agent import AlphaBetaPlayer, MoveOrderer, custom_score
+from search_stats import SearchStats
+from tournament import TIME_LIMIT, make_pool
+
+SELFPLAY_FILE = "selfplay.bin"
+
+GAME_MAGIC = b"ISOG"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<4sHHH")  # magic, format version, width, height
+
+TERMINATIONS = ("illegal move", "timeout", "forfeit")
+NO_MOVE = 255  # cell index stored after the last move of a game
+
+
+def record_dtype(width, height):
+    """Return the structured dtype of the game records of a board size. """
+    cells = width * height
+    if cells >= NO_MOVE:
+        raise ValueError("boards with more than {} cells are not supported"
+                         .format(NO_MOVE - 1))
+    return np.dtype([("num_moves", "<u2"),
+                     ("winner", "u1"),
+                     ("termination", "u1"),
+                     ("moves", "u1", (cells,)),
+                     ("depth", "u1", (cells,)),
+                     ("time_ms", "<f4", (cells,)),
+                     ("nodes", "<u4", (cells,))])
+
+
+def play_selfplay_game(task):
+    """Play one game and return it as a record.
+
+    Parameters
+    ----------
+    task : (object, object, int, int, int, int, float)
+        Player 1, player 2, the seed of the game, the board width and height,
+        the number of random opening moves and the time limit per move.
+
+    Returns
+    -------
+    numpy.ndarray
+        A record array of length 1 with the dtype `record_dtype()`.
+    """
+    player_1, player_2, seed, width, height, opening_plies, time_limit = task
+    rng = random.Random(seed)
+    random.seed(seed)
+    record = np.zeros(1, dtype=record_dtype(width, height))
+    record["moves"] = NO_MOVE
+
+    for player in (player_1, player_2):
+        if getattr(player, "stats", None) is not None:
+            player.stats.clear()
+
+    game = BitBoard(player_1, player_2, width, height)
+    moves, depths, times, nodes = [], [], [], []
+    for _ in range(opening_plies):
+        move = rng.choice(sorted(game.get_legal_moves()))
+        game.apply_move(move)
+        moves.append(move)
+        depths.append(0)
+        times.append(0.)
+        nodes.append(0)
+
+    def on_move(player, move, duration):
+        moves.append(move)
+        depths.append(min(getattr(player, "completed_depth", 0), 255))
+        times.append(duration)
+        stats = getattr(player, "stats", None)
+        nodes.append(0 if stats is None else stats.nodes)
+
+    winner, _, termination = game.play(time_limit, move_callback=on_move)
+
+    num_moves = len(moves)
+    record["num_moves"] = num_moves
+    record["winner"] = 0 if winner is player_1 else 1
+    record["termination"] = TERMINATIONS.index(termination)
+    record["moves"][0, :num_moves] = [r + c * height for r, c in moves]
+    record["depth"][0, :num_moves] = depths
+    record["time_ms"][0, :num_moves] = times
+    record["nodes"][0, :num_moves] = nodes
+    return record
+
+
+class GameWriter():
+    """Append game records to a file.
+
+    Parameters
+    ----------
+    path : str
+        The file to create.
+
+    width, height : int
+        The board size of the games.
+    """
+    def __init__(self, path, width, height):
+        self.dtype = record_dtype(width, height)
+        self.count = 0
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(GAME_MAGIC, FORMAT_VERSION, width, height))
+
+    def write(self, records):
+        """ Append an array of records to the file. """
+        self._file.write(np.ascontiguousarray(records, dtype=self.dtype).tobytes())
+        self.count += len(records)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def load_games(path):
+    """Memory-map the game records of a file written by `GameWriter`.
+
+    Returns
+    -------
+    (int, int, numpy.memmap)
+        The board width and height and the read-only array of records. A
+        partially written last record is ignored.
+    """
+    with open(path, "rb") as f:
+        magic, version, width, height = HEADER.unpack(f.read(HEADER.size))
+    if magic != GAME_MAGIC:
+        raise ValueError("{} is not a self-play game file".format(path))
+    if version != FORMAT_VERSION:
+        raise ValueError("unsupported game file version {}".format(version))
+    dtype = record_dtype(width, height)
+    count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+    if not count:
+        return width, height, np.zeros(0, dtype=dtype)
+    return width, height, np.memmap(path, dtype=dtype, mode="r",
+                                    offset=HEADER.size, shape=(count,))
+
+
+def game_moves(record, height):
+    """ Return the moves of a record as a list of (row, column) pairs. """
+    return [(int(idx) % height, int(idx) // height)
+            for idx in record["moves"][:record["num_moves"]]]
+
+
+def generate(path, num_games, player_1=None, player_2=None, processes=1,
+             seed=None, width=7, height=7, opening_plies=2,
+             time_limit=TIME_LIMIT, verbose=False):
+    """Play self-play games in parallel and stream them to a file.
+
+    Parameters
+    ----------
+    path : str
+        The output file.
+
+    num_games : int
+        The number of games to play.
+
+    player_1, player_2 : object (optional)
+        The agents (two distinct objects); by default two alpha-beta agents
+        with the custom heuristic, a transposition table, move ordering and
+        search statistics.
+
+    processes : int (optional)
+        The number of worker processes.
+
+    seed : int (optional)
+        Seed of the random opening moves.
+
+    width, height : int (optional)
+        The board size.
+
+    opening_plies : int (optional)
+        The number of random moves played before the agents take over.
+
+    time_limit : float (optional)
+        The time limit per move in milliseconds.
+
+    Returns
+    -------
+    int
+        The number of games written.
+    """
+    if player_1 is None:
+        player_1 = AlphaBetaPlayer(score_fn=custom_score, tt_size=2**16,
+                                   move_orderer=MoveOrderer(),
+                                   stats=SearchStats())
+    if player_2 is None:
+        player_2 = AlphaBetaPlayer(score_fn=custom_score, tt_size=2**16,
+                                   move_orderer=MoveOrderer(),
+                                   stats=SearchStats())
+    rng = random.Random(seed)
+    tasks = [(player_1, player_2, rng.getrandbits(32), width, height,
+              opening_plies, time_limit) for _ in range(num_games)]
+
+    pool = make_pool(processes)
+    try:
+        if pool is None:
+            records = map(play_selfplay_game, tasks)
+        else:
+            records = pool.imap_unordered(play_selfplay_game, tasks)
+        with GameWriter(path, width, height) as writer:
+            for record in records:
+                writer.write(record)
+                if verbose and writer.count % 100 == 0:
+                    print("{} games".format(writer.count))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return writer.count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate self-play games " +
+        "of the isolation agents.")
+    parser.add_argument('--games', type=int, default=100,
+                        help="Number of games. Default: 100")
+    parser.add_argument('-j', '--processes', type=int, default=1,
+                        help="Number of worker processes. Default: 1")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Seed of the random opening moves.")
+    parser.add_argument('--size', type=int, nargs=2, default=[7, 7], metavar=('WIDTH', 'HEIGHT'),
+                        help="Board size. Default: 7 7")
+    parser.add_argument('--time-limit', type=float, default=TIME_LIMIT,
+                        help="Time limit per move in ms. Default: {}".format(TIME_LIMIT))
+    parser.add_argument('--out', default=SELFPLAY_FILE,
+                        help="Output file. Default: {}".format(SELFPLAY_FILE))
+    args = parser.parse_args()
+
+    count = generate(args.out, args.games, processes=args.processes, seed=args.seed,
+                     width=args.size[0], height=args.size[1],
+                     time_limit=args.time_limit, verbose=True)
+    print("Wrote {} games to {}".format(count, args.out))
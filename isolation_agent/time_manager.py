@@ -0,0 +1,93 @@
+"""
+This file contains the time manager used by `AlphaBetaPlayer` to decide how
+deep to search within the time limit of a turn.
+
+Without a time manager the agent reads the clock at every node and starts
+iterations it has no chance to finish, only to abandon them when the clock
+runs out. The time manager reads the clock every `check_interval` nodes and,
+after each completed iteration, predicts the cost of the next one from the
+growth of the node count between iterations (the effective branching
+factor). A new iteration is only started if it is expected to finish.
+"""
+
+
+class TimeManager():
+    """Track the time and node counts of an iterative deepening search.
+
+    Parameters
+    ----------
+    check_interval : int (optional)
+        Number of nodes between two reads of the clock.
+
+    default_branching : float (optional)
+        Effective branching factor assumed until two iterations have been
+        completed.
+    """
+    def __init__(self, check_interval=32, default_branching=4.):
+        self.check_interval = check_interval
+        self.default_branching = default_branching
+        self.time_left = None
+        self.threshold = 0.
+        self.nodes = 0
+        self.iterations = []
+        self._countdown = check_interval
+        self._iteration_start = (0., 0)
+
+    def start(self, time_left, threshold):
+        """Start managing the search of a new turn.
+
+        Parameters
+        ----------
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn.
+
+        threshold : float
+            Time remaining (in milliseconds) when the search must stop.
+        """
+        self.time_left = time_left
+        self.threshold = threshold
+        self.nodes = 0
+        self.iterations = []
+        self._countdown = self.check_interval
+        self._iteration_start = (time_left(), 0)
+
+    def expired(self):
+        """Count a node and return True if the search must stop.
+
+        The clock is only read once every `check_interval` calls.
+        """
+        self.nodes += 1
+        self._countdown -= 1
+        if self._countdown > 0:
+            return False
+        self._countdown = self.check_interval
+        return self.time_left() < self.threshold
+
+    def iteration_done(self):
+        """ Record the time and nodes used by the iteration that just ended. """
+        now = self.time_left()
+        start, start_nodes = self._iteration_start
+        self.iterations.append((start - now, self.nodes - start_nodes))
+        self._iteration_start = (now, self.nodes)
+
+    def branching_factor(self):
+        """Return the ratio of the node counts of the last two iterations, or
+        `default_branching` if it is not known yet.
+        """
+        if len(self.iterations) < 2 or not self.iterations[-2][1]:
+            return self.default_branching
+        return max(1., self.iterations[-1][1] / self.iterations[-2][1])
+
+    def predicted_time(self):
+        """ Return the predicted duration of the next iteration in ms. """
+        if not self.iterations:
+            return 0.
+        return self.iterations[-1][0] * self.branching_factor()
+
+    def next_iteration(self):
+        """Return True if the next iteration is expected to finish before
+        the time remaining falls below the threshold.
+        """
+        self._iteration_start = (self.time_left(), self.nodes)
+        return self._iteration_start[0] - self.threshold > self.predicted_time()
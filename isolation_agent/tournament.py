@@ -10,20 +10,49 @@ The matches are fair because the board is initialized randomly for both
 players, and the players play each match twice -- once as the first player and
 once as the second player.  Randomizing the openings and switching the player
 order corrects for imbalances due to both starting position and initiative.
+
+Fair matches are independent of each other, so they can be distributed over a
+pool of worker processes (see the --processes flag). Each worker plays one game
+at a time on its own CPU, and every match is seeded so that the openings are
+reproducible and identical for all of the test agents.
+
+With the --stats flag, the test agents record their search statistics (see
+`search_stats.py`) and the tournament prints the nodes searched per move and
+per second, the depth reached and the cutoff rate of every test agent.
+
+Every game updates the Glicko ratings of both agents (see `ratings.py`), and
+the tournament ends with a table of the ratings and their 95% confidence
+intervals. With the --sprt flag, the matches of a test agent against a cpu agent
+stop as soon as a sequential probability ratio test decides which of the two
+is stronger, instead of always playing NUM_MATCHES matches.
+
+The tournament is played on 7x7 boards unless another size is given with
+--size. The --scaling flag instead plays the alpha-beta test agents against
+AB_Improved on every board size from 5x5 to 15x15 (or the sizes given with
+--sizes) and reports their win rate, nodes per second and depth reached at
+each size.
 """
+import argparse
 import itertools
+import multiprocessing
+import os
 import random
 import warnings
 
 from collections import namedtuple
 
-from isolation import Board
+from isolation import BitBoard
 from sample_players import (RandomPlayer, open_move_score,
                             improved_score, center_score)
 from game_agent import *
+from ratings import Glicko, SPRT
+from search_stats import SearchStats, summarize
 
 NUM_MATCHES = 50  # number of matches against each opponent
 TIME_LIMIT = 200  # number of milliseconds before timeout
+SCALING_MATCHES = 5  # number of matches per agent and board size
+SCALING_SIZES = (5, 7, 9, 11, 13, 15)
+SPRT_BATCH = 2  # matches per pairing played between two SPRT decisions
 
 DESCRIPTION = """
 This script evaluates the performance of the custom_score evaluation
@@ -36,36 +65,135 @@ game_agent.py.
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_round(cpu_agent, test_agents, win_counts, num_matches):
+def play_fair_match(task):
+    """Play one "fair" match between a cpu agent and a test agent.
+
+    The board is initialized with a random move and response drawn from the
+    match seed, and the agents then play one game as each player.
+
+    Parameters
+    ----------
+    task : (Agent, Agent, int, int, int)
+        The cpu agent, the test agent, the seed of the match and the width
+        and height of the board.
+
+    Returns
+    -------
+    (list<(bool, str)>, list<`search_stats.MoveStats`>)
+        For each game, whether the test agent won and the termination reason,
+        and the search statistics of the test agent's moves (empty if the
+        agent does not record them).
+    """
+    cpu_agent, test_agent, seed, width, height = task
+    rng = random.Random(seed)
+    random.seed(seed)
+    stats = getattr(test_agent.player, "stats", None)
+    if stats is not None:
+        stats.clear()
+
+    games = [BitBoard(cpu_agent.player, test_agent.player, width, height),
+             BitBoard(test_agent.player, cpu_agent.player, width, height)]
+
+    # initialize both games with a random move and response
+    for _ in range(2):
+        move = rng.choice(sorted(games[0].get_legal_moves()))
+        for game in games:
+            game.apply_move(move)
+
+    results = []
+    for game in games:
+        winner, _, termination = game.play(time_limit=TIME_LIMIT)
+        results.append((winner is test_agent.player, termination))
+    return results, ([] if stats is None else stats.moves)
+
+
+def pin_worker(cpus):
+    """Pool initializer that pins each worker process to its own CPU so that
+    concurrent games do not compete for the same core.
+    """
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cpus.get()})
+
+
+def make_pool(processes):
+    """Return a pool of `processes` workers pinned to distinct CPUs, or None
+    to play every game in the current process.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(multiprocessing.cpu_count()))
+    processes = min(processes, len(cpus))
+    if processes <= 1:
+        return None
+    cpu_queue = multiprocessing.Queue()
+    for cpu in cpus[:processes]:
+        cpu_queue.put(cpu)
+    return multiprocessing.Pool(processes, initializer=pin_worker,
+                                initargs=(cpu_queue,))
+
+
+def play_round(cpu_agent, test_agents, win_counts, num_matches, pool=None,
+               move_stats=None, width=7, height=7, game_counts=None,
+               ratings=None, sprt=None):
     """Compare the test agents to the cpu agent in "fair" matches.
 
     "Fair" matches use random starting locations and force the agents to
     play as both first and second player to control for advantages resulting
     from choosing better opening moves or having first initiative to move.
+
+    If a process pool is given, the matches are played in parallel and the
+    results are merged as they complete. The search statistics of the test
+    agents' moves are appended to the lists of `move_stats`, keyed by agent,
+    the number of games of each test agent is added to `game_counts`, and
+    every game is recorded in the `ratings.Glicko` ratings.
+
+    If `sprt` is given, it is called to create a `ratings.SPRT` for each test
+    agent, and the matches are played in batches of SPRT_BATCH until the test
+    of every test agent is decided or `num_matches` matches are played.
     """
     timeout_count = 0
     forfeit_count = 0
-    for _ in range(num_matches):
-
-        games = sum([[Board(cpu_agent.player, agent.player),
-                      Board(agent.player, cpu_agent.player)]
-                    for agent in test_agents], [])
-
-        # initialize all games with a random move and response
-        for _ in range(2):
-            move = random.choice(games[0].get_legal_moves())
-            for game in games:
-                game.apply_move(move)
-
-        # play all games and tally the results
-        for game in games:
-            winner, _, termination = game.play(time_limit=TIME_LIMIT)
-            win_counts[winner] += 1
 
-            if termination == "timeout":
-                timeout_count += 1
-            elif termination == "forfeit":
-                forfeit_count += 1
+    # every test agent plays the same openings against the cpu agent
+    seeds = [random.getrandbits(32) for _ in range(num_matches)]
+    if sprt is None:
+        batches = [seeds]
+    else:
+        batches = [seeds[i:i + SPRT_BATCH] for i in range(0, num_matches, SPRT_BATCH)]
+    tests = {agent.player: sprt() for agent in test_agents} if sprt else {}
+
+    for batch in batches:
+        agents = [agent for agent in test_agents
+                  if agent.player not in tests or tests[agent.player].status() is None]
+        if not agents:
+            break
+        tasks = [(cpu_agent, agent, seed, width, height)
+                 for seed in batch for agent in agents]
+        if pool is None:
+            results = map(play_fair_match, tasks)
+        else:
+            results = pool.imap(play_fair_match, tasks)
+
+        # tally the results
+        for (_, agent, _, _, _), (games, moves) in zip(tasks, results):
+            if move_stats is not None:
+                move_stats.setdefault(agent.player, []).extend(moves)
+            if game_counts is not None:
+                game_counts[agent.player] += len(games)
+            for test_agent_won, termination in games:
+                winner = agent.player if test_agent_won else cpu_agent.player
+                loser = cpu_agent.player if test_agent_won else agent.player
+                win_counts[winner] += 1
+                if ratings is not None:
+                    ratings.record(winner, loser)
+                if agent.player in tests:
+                    tests[agent.player].record(test_agent_won)
+
+                if termination == "timeout":
+                    timeout_count += 1
+                elif termination == "forfeit":
+                    forfeit_count += 1
 
     return timeout_count, forfeit_count
 
@@ -76,12 +204,19 @@ def update(total_wins, wins):
     return total_wins
 
 
-def play_matches(cpu_agents, test_agents, num_matches):
-    """Play matches between the test agent and each cpu_agent individually. """
+def play_matches(cpu_agents, test_agents, num_matches, pool=None, width=7,
+                 height=7, sprt=None):
+    """Play matches between the test agent and each cpu_agent individually.
+
+    If `sprt` is given, each pairing stops early once its test is decided
+    (see `play_round()`).
+    """
     total_wins = {agent.player: 0 for agent in test_agents}
+    total_games = {agent.player: 0 for agent in test_agents}
     total_timeouts = 0.
     total_forfeits = 0.
-    total_matches = 2 * num_matches * len(cpu_agents)
+    move_stats = {}
+    ratings = Glicko()
 
     print("\n{:^9}{:^13}".format("Match #", "Opponent") + ''.join(['{:^13}'.format(x[1].name) for x in enumerate(test_agents)]))
     print("{:^9}{:^13} ".format("", "") +  ' '.join(['{:^5}| {:^5}'.format("Won", "Lost") for x in enumerate(test_agents)]))
@@ -89,15 +224,17 @@ def play_matches(cpu_agents, test_agents, num_matches):
     for idx, agent in enumerate(cpu_agents):
         wins = {key: 0 for (key, value) in test_agents}
         wins[agent.player] = 0
+        games = {key: 0 for (key, value) in test_agents}
 
         print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="", flush=True)
 
-        counts = play_round(agent, test_agents, wins, num_matches)
+        counts = play_round(agent, test_agents, wins, num_matches, pool,
+                            move_stats, width, height, games, ratings, sprt)
         total_timeouts += counts[0]
         total_forfeits += counts[1]
         total_wins = update(total_wins, wins)
-        _total = 2 * num_matches
-        round_totals = sum([[wins[agent.player], _total - wins[agent.player]]
+        total_games = update(total_games, games)
+        round_totals = sum([[wins[agent.player], games[agent.player] - wins[agent.player]]
                             for agent in test_agents], [])
         print(' ' + ' '.join([
             '{:^5}| {:^5}'.format(
@@ -109,10 +246,16 @@ def play_matches(cpu_agents, test_agents, num_matches):
     print('{:^9}{:^13}'.format("", "Win Rate:") +
         ''.join([
             '{:^13}'.format(
-                "{:.1f}%".format(100 * total_wins[x[1].player] / total_matches)
+                "{:.1f}%".format(100 * total_wins[x[1].player] /
+                                 max(total_games[x[1].player], 1))
             ) for x in enumerate(test_agents)
     ]))
 
+    print_ratings(cpu_agents, test_agents, ratings)
+
+    if any(move_stats.values()):
+        print_search_stats(test_agents, move_stats)
+
     if total_timeouts:
         print(("\nThere were {} timeouts during the tournament -- make sure " +
                "your agent handles search timeout correctly, and consider " +
@@ -123,23 +266,132 @@ def play_matches(cpu_agents, test_agents, num_matches):
                "legal moves available to play.\n").format(total_forfeits))
 
 
-def main():
+def print_ratings(cpu_agents, test_agents, ratings):
+    """ Print the Glicko ratings of the agents from best to worst. """
+    print("\n{:^13}{:^9}{:>8}{:>16}".format("Agent", "Role", "Rating",
+                                           "95% Interval"))
+    rated = [(ratings.rating(player)[0], name, role, ratings.interval(player))
+             for role, agents in (("cpu", cpu_agents), ("test", test_agents))
+             for player, name in agents if player in ratings]
+    for rating, name, role, (low, high) in sorted(rated, key=lambda r: -r[0]):
+        print("{:^13}{:^9}{:>8.0f}{:>16}".format(
+            name, role, rating, "[{:.0f}, {:.0f}]".format(low, high)))
+
+
+def print_search_stats(test_agents, move_stats):
+    """ Print the search statistics of every test agent that recorded them. """
+    print("\n{:^13}{:>9}{:>12}{:>12}{:>8}{:>10}{:>10}".format(
+        "Agent", "Moves", "Nodes/move", "Nodes/sec", "Depth", "Time(ms)",
+        "Cutoffs"))
+    for player, name in test_agents:
+        moves = move_stats.get(player)
+        if not moves:
+            continue
+        summary = summarize(moves)
+        print("{:^13}{:>9}{:>12.0f}{:>12.0f}{:>8.2f}{:>10.1f}{:>9.1f}%".format(
+            name, summary["moves"], summary["nodes"] / summary["moves"],
+            summary["nodes_per_second"], summary["depth"], summary["time"],
+            100 * summary["cutoff_rate"]))
+
+
+def scaling_study(cpu_agent, test_agents, sizes=SCALING_SIZES,
+                  num_matches=SCALING_MATCHES, pool=None):
+    """Play the test agents against the cpu agent on boards of every size and
+    print how their strength and search scale with the board size.
+
+    The test agents must record their search statistics.
+
+    Returns
+    -------
+    dict
+        The win rate and search summary (see `search_stats.summarize()`) of
+        every test agent, keyed by board size and agent name.
+    """
+    results = {}
+    print("\n{:>7}{:^13}{:>9}{:>12}{:>12}{:>8}{:>8}{:>10}".format(
+        "Size", "Agent", "Win Rate", "Nodes/move", "Nodes/sec", "Depth",
+        "Median", "Time(ms)"))
+    for size in sizes:
+        wins = {agent.player: 0 for agent in test_agents}
+        wins[cpu_agent.player] = 0
+        move_stats = {}
+        play_round(cpu_agent, test_agents, wins, num_matches, pool, move_stats,
+                   size, size)
+        for player, name in test_agents:
+            summary = summarize(move_stats.get(player, []))
+            summary["win_rate"] = wins[player] / (2. * num_matches)
+            results.setdefault(size, {})[name] = summary
+            print("{:>7}{:^13}{:>8.1f}%{:>12.0f}{:>12.0f}{:>8.2f}{:>8}{:>10.1f}".format(
+                "{0}x{0}".format(size), name, 100 * summary["win_rate"],
+                summary["nodes"] / max(summary["moves"], 1),
+                summary["nodes_per_second"], summary["depth"],
+                summary["median_depth"], summary["time"]), flush=True)
+    return results
+
+
+def scaling(processes=1, seed=None, sizes=SCALING_SIZES,
+            num_matches=SCALING_MATCHES):
+
+    random.seed(seed)
+
+    test_agents = [
+        Agent(AlphaBetaPlayer(score_fn=improved_score, stats=SearchStats()), "AB_Improved"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score, stats=SearchStats()), "AB_Custom"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_2, stats=SearchStats()), "AB_Custom_2"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_3, stats=SearchStats()), "AB_Custom_3"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_4, stats=SearchStats()), "AB_Custom_4"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_5, stats=SearchStats()), "AB_Custom_5")
+    ]
+    cpu_agent = Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved")
+
+    print("{:^74}".format("*************************"))
+    print("{:^74}".format("Scaling Study"))
+    print("{:^74}".format("*************************"))
+
+    pool = make_pool(processes)
+    try:
+        scaling_study(cpu_agent, test_agents, sizes, num_matches, pool)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def main(processes=1, seed=None, stats=False, width=7, height=7, sprt=False,
+         score_cache=0):
+
+    random.seed(seed)
+
+    def make_stats():
+        return SearchStats() if stats else None
 
     # Define two agents to compare -- these agents will play from the same
     # starting position against the same adversaries in the tournament
     test_agents = [
-        Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score), "AB_Custom"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_2), "AB_Custom_2"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_4), "AB_Custom_4"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_5), "AB_Custom_5"),
-        Agent(MinimaxPlayer(score_fn=improved_score), "MM_Improved"),
-        Agent(MinimaxPlayer(score_fn=custom_score), "MM_Custom"),
-        Agent(MinimaxPlayer(score_fn=custom_score_2), "MM_Custom_2"),
-        Agent(MinimaxPlayer(score_fn=custom_score_3), "MM_Custom_3"),
-        Agent(MinimaxPlayer(score_fn=custom_score_4), "MM_Custom_4"),
-        Agent(MinimaxPlayer(score_fn=custom_score_5), "MM_Custom_5")
+        Agent(AlphaBetaPlayer(score_fn=improved_score, stats=make_stats(),
+                              score_cache=score_cache), "AB_Improved"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score, stats=make_stats(),
+                              score_cache=score_cache), "AB_Custom"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_2, stats=make_stats(),
+                              score_cache=score_cache), "AB_Custom_2"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_3, stats=make_stats(),
+                              score_cache=score_cache), "AB_Custom_3"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_4, stats=make_stats(),
+                              score_cache=score_cache), "AB_Custom_4"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_5, stats=make_stats(),
+                              score_cache=score_cache), "AB_Custom_5"),
+        Agent(MinimaxPlayer(score_fn=improved_score, stats=make_stats(),
+                            score_cache=score_cache), "MM_Improved"),
+        Agent(MinimaxPlayer(score_fn=custom_score, stats=make_stats(),
+                            score_cache=score_cache), "MM_Custom"),
+        Agent(MinimaxPlayer(score_fn=custom_score_2, stats=make_stats(),
+                            score_cache=score_cache), "MM_Custom_2"),
+        Agent(MinimaxPlayer(score_fn=custom_score_3, stats=make_stats(),
+                            score_cache=score_cache), "MM_Custom_3"),
+        Agent(MinimaxPlayer(score_fn=custom_score_4, stats=make_stats(),
+                            score_cache=score_cache), "MM_Custom_4"),
+        Agent(MinimaxPlayer(score_fn=custom_score_5, stats=make_stats(),
+                            score_cache=score_cache), "MM_Custom_5")
     ]
 
     # Define a collection of agents to compete against the test agents
@@ -157,8 +409,45 @@ def main():
     print("{:^74}".format("*************************"))
     print("{:^74}".format("Playing Matches"))
     print("{:^74}".format("*************************"))
-    play_matches(cpu_agents, test_agents, NUM_MATCHES)
+
+    pool = make_pool(processes)
+    try:
+        play_matches(cpu_agents, test_agents, NUM_MATCHES, pool, width, height,
+                     SPRT if sprt else None)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Play a round-robin " +
+        "tournament between the test agents and the cpu agents.")
+    parser.add_argument('-j', '--processes', type=int, default=1,
+                        help="Number of worker processes used to play matches in parallel " +
+                        "(at most one per CPU). Default: 1")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Seed for the random openings of every match.")
+    parser.add_argument('--stats', action='store_true',
+                        help="Record and print the search statistics of the test agents.")
+    parser.add_argument('--sprt', action='store_true',
+                        help="Stop the matches of a pairing once an SPRT decides " +
+                        "which agent is stronger.")
+    parser.add_argument('--score-cache', type=int, default=0, metavar='SIZE',
+                        help="Cache up to SIZE heuristic values per test agent. Default: 0 (no cache)")
+    parser.add_argument('--size', type=int, nargs=2, default=[7, 7], metavar=('WIDTH', 'HEIGHT'),
+                        help="Board size. Default: 7 7")
+    parser.add_argument('--scaling', action='store_true',
+                        help="Compare the alpha-beta agents on several board sizes.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SCALING_SIZES),
+                        help="Board sizes of the scaling study. Default: {}".format(
+                            " ".join(map(str, SCALING_SIZES))))
+    parser.add_argument('--matches', type=int, default=SCALING_MATCHES,
+                        help="Matches per agent and size in the scaling study. " +
+                        "Default: {}".format(SCALING_MATCHES))
+    args = parser.parse_args()
+    if args.scaling:
+        scaling(args.processes, args.seed, args.sizes, args.matches)
+    else:
+        main(args.processes, args.seed, args.stats, *args.size, sprt=args.sprt,
+             score_cache=args.score_cache)
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""
+This file contains the transposition table used by `AlphaBetaPlayer` to reuse
+search results for positions that are reached more than once, either through
+different move orders or in successive iterations of iterative deepening.
+
+Positions are identified by the Zobrist hash returned by `Board.hash()`.
+"""
+
+# Bound types of a stored value: the exact minimax value, a lower bound (the
+# search failed high) or an upper bound (the search failed low)
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Mixed into the position key when the searching agent is player 2, since
+# search values are stored from the point of view of the searching agent
+PERSPECTIVE_KEY = 0x5851f42d4c957f2d
+
+
+class TranspositionTable():
+    """A fixed-size hash table of search results keyed on position hashes.
+
+    Each slot holds a single entry `(key, depth, flag, value, move, age)`.
+    When two positions map to the same slot, the new result replaces the
+    stored one if it is for the same position, if the stored entry was
+    written during an earlier search, or if the new result was searched at
+    least as deep; otherwise the deeper, current entry is kept.
+
+    Parameters
+    ----------
+    size : int (optional)
+        The number of slots in the table.
+    """
+    def __init__(self, size=2**16):
+        self.size = size
+        self.age = 0
+        self._table = [None] * size
+
+    def __len__(self):
+        return sum(1 for entry in self._table if entry is not None)
+
+    def new_search(self):
+        """Mark the start of a new search so that entries written by previous
+        searches become preferred candidates for replacement.
+        """
+        self.age += 1
+
+    def clear(self):
+        """ Remove every entry from the table. """
+        self._table = [None] * self.size
+
+    def probe(self, key):
+        """Return the entry stored for a position, or None.
+
+        Parameters
+        ----------
+        key : int
+            The hash of the position.
+
+        Returns
+        -------
+        (int, int, int, float, (int, int), int) or None
+            The stored (key, depth, flag, value, move, age) entry.
+        """
+        entry = self._table[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        """Store a search result subject to the replacement policy.
+
+        Parameters
+        ----------
+        key : int
+            The hash of the position.
+
+        depth : int
+            The remaining search depth used to compute the value.
+
+        flag : int
+            One of EXACT, LOWER or UPPER.
+
+        value : float
+            The value (or bound) found by the search.
+
+        move : (int, int) or None
+            The best move found in the position, if any.
+        """
+        idx = key % self.size
+        entry = self._table[idx]
+        if (entry is None or entry[0] == key or entry[5] != self.age or
+                depth >= entry[1]):
+            self._table[idx] = (key, depth, flag, value, move, self.age)
+
+    def entries(self, age=None, min_depth=0):
+        """Return the stored entries, optionally only those written during the
+        search of the given age and searched to at least `min_depth`.
+        """
+        return [entry for entry in self._table if entry is not None and
+                (age is None or entry[5] == age) and entry[1] >= min_depth]